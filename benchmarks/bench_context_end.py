@@ -0,0 +1,69 @@
+"""Benchmark of finding the end of a context, i.e.
+PlotIs._get_last_lineno_of_context(), in large generated modules.
+
+Cold timings include reading the file and indexing the ends of all its
+contexts, warm ones are lookups in the cached index.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_context_end -o context_end.json
+"""
+
+# Standard lib imports
+import random
+import tempfile
+
+# Specified imports
+from typing import Any, Dict, List
+
+# Package imports
+from benchmarks.common import main_for, measure
+from benchmarks.modules import write_module
+from src.plotis.plotis import PlotIs
+from src.plotis.source_cache import SOURCE_CACHE
+
+FILE_LENGTHS = [1000, 10000, 100000, 1000000]
+QUICK_FILE_LENGTHS = [1000, 100000]
+
+# Number of lookups per timed call
+N_LOOKUPS = 1000
+
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    repeats = 3 if quick else 10
+    records = []
+    plotis = PlotIs("", None)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_lines in QUICK_FILE_LENGTHS if quick else FILE_LENGTHS:
+            filename = write_module(tmp_dir, n_lines).__file__
+            line_nos = random.Random(0).choices(range(1, n_lines), k=N_LOOKUPS)
+
+            def lookup_one() -> None:
+                plotis._get_last_lineno_of_context(filename, line_nos[0])
+
+            def lookup_all() -> None:
+                for line_no in line_nos:
+                    plotis._get_last_lineno_of_context(filename, line_no)
+
+            cases = [
+                ("cold", lookup_one, SOURCE_CACHE.clear, 1),
+                ("warm", lookup_all, None, N_LOOKUPS),
+            ]
+            for cache, func, setup, n_lookups in cases:
+                records.append({
+                    "benchmark": "context_end",
+                    "n_lines": n_lines,
+                    "cache": cache,
+                    "n_lookups": n_lookups,
+                    **measure(func, repeats, setup),
+                })
+
+    return records
+
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
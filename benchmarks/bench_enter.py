@@ -0,0 +1,59 @@
+"""Benchmark of the PlotIs enter overhead as a function of the length of
+the calling file, with the source cache cold, i.e. the file is read and
+parsed, and warm.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_enter -o enter.json
+"""
+
+# Standard lib imports
+import tempfile
+
+# Dependencies imports
+import pandas as pd
+
+# Specified imports
+from typing import Any, Dict, List
+
+# Package imports
+from benchmarks.common import main_for, summarize
+from benchmarks.modules import write_module
+from src.plotis.source_cache import SOURCE_CACHE
+
+FILE_LENGTHS = [100, 1000, 10000, 100000]
+QUICK_FILE_LENGTHS = [100, 10000]
+
+bench_data = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    repeats = 3 if quick else 10
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_lines in QUICK_FILE_LENGTHS if quick else FILE_LENGTHS:
+            module = write_module(tmp_dir, n_lines)
+            for cache in ["cold", "warm"]:
+                enter_times = []
+                for _ in range(repeats):
+                    if cache == "cold":
+                        SOURCE_CACHE.clear()
+                    pi = module.run(tmp_dir + "/fig", bench_data)
+                    enter_times.append(pi.stats.timings["enter"])
+
+                records.append({
+                    "benchmark": "enter_vs_file_length",
+                    "n_lines": n_lines,
+                    "cache": cache,
+                    **summarize(enter_times),
+                })
+
+    return records
+
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark of the PlotIs export, i.e. __exit__, throughput for each
+serializer as a function of the number of rows, columns and the dtypes.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_export -o export.json
+"""
+
+# Standard lib imports
+import tempfile
+
+# Dependencies imports
+import numpy as np
+import pandas as pd
+
+# Specified imports
+from typing import Any, Dict, List, Tuple
+
+# Package imports
+from benchmarks.common import main_for, summarize
+from src.plotis.plotis import PlotIs
+from src.plotis.serializers import SERIALIZERS, get_serializer
+
+DTYPES = ["float", "int", "str", "datetime", "category", "mixed"]
+
+
+def make_frame(n_rows: int, n_cols: int, dtype: str) -> pd.DataFrame:
+    """Returns a DataFrame of random data with `n_cols` columns of `dtype`,
+    or of all dtypes in turn for "mixed".
+    """
+    rng = np.random.default_rng(0)
+    columns = {}
+    for ix in range(n_cols):
+        column_dtype = DTYPES[ix % (len(DTYPES) - 1)] if dtype == "mixed" else dtype
+        if column_dtype == "float":
+            values = rng.normal(size=n_rows)
+        elif column_dtype == "int":
+            values = rng.integers(0, 1 << 30, size=n_rows)
+        elif column_dtype == "str":
+            values = rng.integers(0, 1 << 30, size=n_rows).astype(str)
+        elif column_dtype == "datetime":
+            values = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1 << 30, size=n_rows), unit="s")
+        else:
+            values = pd.Categorical.from_codes(rng.integers(0, 10, size=n_rows), [f"c{ix}" for ix in range(10)])
+        columns[f"col_{ix}"] = values
+
+    return pd.DataFrame(columns)
+
+
+def export(figpath: str, bench_df: pd.DataFrame, serializer: str) -> PlotIs:
+    with PlotIs(figpath, bench_df, serializer=serializer) as pi:
+        bench_df.shape
+
+    return pi
+
+
+def get_cases(quick: bool) -> List[Tuple[int, int, str]]:
+    """Returns the (n_rows, n_cols, dtype) cases, sweeping the rows, the
+    columns and the dtypes one at a time.
+    """
+    if quick:
+        return [(1000, 8, "float"), (100000, 8, "float"), (100000, 8, "str")]
+
+    cases = [(n_rows, 8, "float") for n_rows in [1000, 10000, 100000, 1000000]]
+    cases += [(100000, n_cols, "float") for n_cols in [2, 32, 128]]
+    cases += [(100000, 8, dtype) for dtype in DTYPES if dtype != "float"]
+    return cases
+
+
+def get_available_serializers() -> List[str]:
+    available = []
+    for name in SERIALIZERS:
+        try:
+            get_serializer(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    repeats = 2 if quick else 5
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows, n_cols, dtype in get_cases(quick):
+            bench_df = make_frame(n_rows, n_cols, dtype)
+            n_bytes = int(bench_df.memory_usage(deep=True).sum())
+            for serializer in get_available_serializers():
+                exit_times = []
+                serialize_times = []
+                for _ in range(repeats):
+                    pi = export(tmp_dir + "/fig", bench_df, serializer)
+                    exit_times.append(pi.stats.timings["exit"])
+                    serialize_times.append(pi.stats.timings["serialize"])
+
+                timings = summarize(exit_times)
+                records.append({
+                    "benchmark": "export",
+                    "serializer": serializer,
+                    "n_rows": n_rows,
+                    "n_cols": n_cols,
+                    "dtype": dtype,
+                    **timings,
+                    "serialize_min": min(serialize_times),
+                    "bytes": pi.stats.bytes_written,
+                    "rows_per_s": n_rows / timings["min"],
+                    "mb_per_s": n_bytes / 1e6 / timings["min"],
+                })
+
+    return records
+
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
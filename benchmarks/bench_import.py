@@ -0,0 +1,67 @@
+"""Benchmark of the time to import PlotIs in a new interpreter, which
+short lived processes pay on every start, against importing pandas.
+
+Each case runs a new interpreter, the time of an empty one is given as
+the baseline. Whether pandas was imported is recorded with each case.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_import -o import.json
+"""
+
+# Standard lib imports
+import sys
+import time
+import subprocess
+
+# Specified imports
+from typing import Any, Dict, List, Tuple
+
+# Package imports
+from benchmarks.common import main_for, summarize
+
+STATEMENTS = [
+    ("baseline", "pass"),
+    ("package", "import src.plotis"),
+    ("plotis", "from src.plotis import PlotIs"),
+    ("cli", "import src.plotis.cli"),
+    ("pandas", "import pandas"),
+]
+
+
+def import_once(statement: str) -> Tuple[float, bool]:
+    """Returns the time to run `statement` in a new interpreter, and
+    whether pandas was imported.
+    """
+    code = f"{statement}\nimport sys\nprint('pandas' in sys.modules)"
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stdout.strip() == "True"
+
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    repeats = 5 if quick else 20
+    records = []
+    for name, statement in STATEMENTS:
+        # Warms up the bytecode caches
+        import_once(statement)
+        times = []
+        for _ in range(repeats):
+            elapsed, imports_pandas = import_once(statement)
+            times.append(elapsed)
+        records.append({
+            "benchmark": "import",
+            "case": name,
+            "imports_pandas": imports_pandas,
+            **summarize(times),
+        })
+
+    return records
+
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark of many figures plotted one after another in a loop, with
+and without PlotIs, and writing the bundles synchronously, in the
+background, or as a single loop bundle.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_loop -o loop.json
+"""
+
+# Standard lib imports
+import os
+import time
+import tempfile
+
+# Dependencies imports
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+# Specified imports
+from typing import Any, Dict, List
+
+# Package imports
+from benchmarks.common import main_for
+from src.plotis.plotis import PlotIs
+
+N_FIGURES = 200
+QUICK_N_FIGURES = 20
+
+loop_data = pd.DataFrame(data={"x": np.arange(1000), "y": np.random.default_rng(0).normal(size=1000)})
+
+
+def plot_baseline(figpath: str) -> None:
+    plt.plot(loop_data["x"], loop_data["y"])
+    plt.close("all")
+
+
+def plot_plotis(figpath: str) -> None:
+    with PlotIs(figpath, loop_data):
+        plt.plot(loop_data["x"], loop_data["y"])
+    plt.close("all")
+
+
+def plot_plotis_async(figpath: str) -> None:
+    with PlotIs(figpath, loop_data, asynchronous=True):
+        plt.plot(loop_data["x"], loop_data["y"])
+    plt.close("all")
+
+
+def plot_plotis_loop(figpath: str) -> None:
+    # All figures are iterations of one bundle in the parent folder
+    with PlotIs(os.path.dirname(figpath), loop_data, loop={"figure": os.path.basename(figpath)}):
+        plt.plot(loop_data["x"], loop_data["y"])
+    plt.close("all")
+
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    n_figures = QUICK_N_FIGURES if quick else N_FIGURES
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = [
+            ("baseline", plot_baseline),
+            ("plotis", plot_plotis),
+            ("plotis_async", plot_plotis_async),
+            ("plotis_loop", plot_plotis_loop),
+        ]
+        for mode, plot in cases:
+            start = time.perf_counter()
+            for ix in range(n_figures):
+                plot(f"{tmp_dir}/{mode}/fig_{ix}")
+            # Background writes, and writing the loop bundle, are part of the cost
+            PlotIs.flush()
+            elapsed = time.perf_counter() - start
+
+            records.append({
+                "benchmark": "figure_loop",
+                "mode": mode,
+                "n_figures": n_figures,
+                "mean": elapsed,
+                "per_figure": elapsed / n_figures,
+            })
+
+    return records
+
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Micro-benchmark of the PlotIs enter/exit overhead as a function of the
+depth of the call stack the context is used in.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.bench_stack_depth -o stack_depth.json
+"""
+
+import inspect
+import tempfile
+import timeit
+import pandas as pd
+
+from typing import Any, Dict, List
+
+from benchmarks.common import main_for
+from src.plotis.plotis import PlotIs
+
+STACK_DEPTHS = [1, 10, 100, 500]
+
+bench_data = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+
+def run_plotis(figpath: str) -> None:
+    with PlotIs(figpath, bench_data):
+        bench_data["x"].sum()
+
+def run_frame_capture() -> None:
+    PlotIs._get_calling_frame(1)
+
+def run_inspect_stack() -> None:
+    inspect.stack()[1]
+
+def at_depth(depth: int, repeats: int, func, *args) -> float:
+    """Calls `func` with `depth` extra frames on the stack and returns
+    the mean time per call in seconds.
+    """
+    if depth > 1:
+        return at_depth(depth - 1, repeats, func, *args)
+    return timeit.timeit(lambda: func(*args), number=repeats) / repeats
+
+def run(quick: bool = False) -> List[Dict[str, Any]]:
+    repeats = 10 if quick else 50
+    records = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        figpath = tmp_dir + "/fig"
+        for depth in STACK_DEPTHS:
+            cases = [
+                ("plotis_enter_exit", run_plotis, (figpath,)),
+                ("frame_capture", run_frame_capture, ()),
+                ("inspect_stack", run_inspect_stack, ()),
+            ]
+            for method, func, args in cases:
+                records.append({
+                    "benchmark": "stack_depth",
+                    "depth": depth,
+                    "method": method,
+                    "mean": at_depth(depth, repeats, func, *args),
+                    "repeats": repeats,
+                })
+
+    return records
+
+def main() -> None:
+    main_for(run, __doc__.splitlines()[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Helpers shared by the benchmarks.
+
+Each benchmark module has a `run(quick)` function returning a list of
+result records, i.e. flat dicts with a "benchmark" name, the parameters
+of the case and its measurements in seconds, and a `main()` writing them
+as JSON. The records of a case are matched across runs by the name and
+parameters, see benchmarks.compare.
+"""
+
+# Standard lib imports
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+
+# Specified imports
+from typing import Any, Callable, Dict, List, Optional
+
+# Keys of a record which are measurements rather than parameters
+MEASUREMENT_KEYS = {
+    "min", "median", "mean", "repeats", "serialize_min", "bytes", "rows_per_s", "mb_per_s", "per_figure"
+}
+
+
+def measure(func: Callable[[], Any], repeats: int = 5, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """Returns the min, median and mean time in seconds of `repeats`
+    calls to `func`, calling `setup` untimed before each of them.
+    """
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return summarize(times)
+
+
+def summarize(times: List[float]) -> Dict[str, float]:
+    """Returns the min, median and mean of `times`.
+    """
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "repeats": len(times),
+    }
+
+
+def get_environment() -> Dict[str, Any]:
+    """Returns the versions of everything that affects the timings.
+    """
+    import numpy
+    import pandas
+    import matplotlib
+    from src.plotis._version import __version__
+
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "plotis": __version__,
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def write_results(records: List[Dict[str, Any]], path: Optional[str] = None) -> None:
+    """Writes `records` with the environment as JSON to `path`,
+    or to stdout if not given.
+    """
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": get_environment(),
+        "results": records,
+    }
+    text = json.dumps(results, indent=2)
+    if path is None:
+        print(text)
+    else:
+        with open(path, "w") as fp:
+            fp.write(text + "\n")
+
+
+def main_for(run: Callable[[bool], List[Dict[str, Any]]], description: str) -> None:
+    """Command line entry point of a single benchmark module.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write, defaults to stdout")
+    parser.add_argument("--quick", action="store_true", help="Run smaller cases with fewer repeats")
+    args = parser.parse_args()
+
+    write_results(run(args.quick), args.output)
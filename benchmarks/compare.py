@@ -0,0 +1,51 @@
+"""Compares the results of two benchmark runs, printing the ratio of the
+new to the old time of every case found in both.
+
+    python -m benchmarks.compare old.json new.json
+"""
+
+# Standard lib imports
+import json
+import argparse
+
+# Specified imports
+from typing import Any, Dict, Tuple
+
+# Package imports
+from benchmarks.common import MEASUREMENT_KEYS
+
+
+def get_case_key(record: Dict[str, Any]) -> Tuple:
+    """Returns the name and parameters identifying the case of `record`.
+    """
+    return tuple(sorted((key, value) for key, value in record.items() if key not in MEASUREMENT_KEYS))
+
+
+def load_cases(path: str) -> Dict[Tuple, Dict[str, Any]]:
+    with open(path) as fp:
+        results = json.load(fp)
+    return {get_case_key(record): record for record in results["results"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares two benchmark runs")
+    parser.add_argument("old", help="JSON results of the reference run")
+    parser.add_argument("new", help="JSON results of the run to compare")
+    parser.add_argument("--threshold", type=float, default=1.1, help="Ratio above which a case is flagged as slower")
+    args = parser.parse_args()
+
+    old_cases = load_cases(args.old)
+    new_cases = load_cases(args.new)
+    for key, new_record in new_cases.items():
+        if key not in old_cases:
+            continue
+        # The minimum is the least noisy, when measured
+        measurement = "min" if "min" in new_record else "mean"
+        ratio = new_record[measurement] / old_cases[key][measurement]
+        flag = "SLOWER" if ratio > args.threshold else ""
+        case = " ".join(f"{name}={value}" for name, value in key)
+        print(f"{ratio:6.2f}x  {case} {flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Generation of large calling modules for the benchmarks.
+"""
+
+# Standard lib imports
+import os
+import importlib.util
+
+# Specified imports
+from types import ModuleType
+
+
+def get_module_source(n_lines: int) -> str:
+    """Returns the source of a module of about `n_lines` lines, made of
+    small functions, ending with a function using PlotIs.
+    """
+    lines = ["from src.plotis.plotis import PlotIs\n", "\n"]
+    ix = 0
+    while len(lines) < n_lines:
+        lines += [
+            f"def filler_{ix}(a):\n",
+            f"    # Filler function {ix}\n",
+            "    if a > 0:\n",
+            "        a = a - 1\n",
+            "\n",
+            "    return a\n",
+            "\n",
+        ]
+        ix += 1
+
+    lines += [
+        "def run(figpath, data):\n",
+        "    with PlotIs(figpath, data) as pi:\n",
+        "        data[\"x\"].sum()\n",
+        "\n",
+        "    return pi\n",
+    ]
+    return "".join(lines)
+
+
+def write_module(directory: str, n_lines: int) -> ModuleType:
+    """Writes a module of about `n_lines` lines to `directory`
+    and imports it.
+    """
+    name = f"bench_module_{n_lines}"
+    path = os.path.join(directory, name + ".py")
+    with open(path, "w") as fp:
+        fp.write(get_module_source(n_lines))
+
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,45 @@
+"""Runs all benchmarks and writes their results to a single JSON file.
+
+Run from the root of the repository with:
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run --quick --only enter,export
+
+and compare two runs with benchmarks.compare.
+"""
+
+# Standard lib imports
+import sys
+import time
+import argparse
+import importlib
+
+# Package imports
+from benchmarks.common import write_results
+
+BENCHMARKS = ["import", "enter", "stack_depth", "context_end", "export", "loop"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Runs the PlotIs benchmarks")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write, defaults to stdout")
+    parser.add_argument("--quick", action="store_true", help="Run smaller cases with fewer repeats")
+    parser.add_argument("--only", default=None, help=f"Comma separated benchmarks to run, from {BENCHMARKS}")
+    args = parser.parse_args()
+
+    names = BENCHMARKS if args.only is None else args.only.split(",")
+    records = []
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark: {name}")
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+
+        start = time.perf_counter()
+        records += module.run(args.quick)
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    write_results(records, args.output)
+
+
+if __name__ == "__main__":
+    main()
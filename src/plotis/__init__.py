@@ -0,0 +1,20 @@
+from ._version import __version__
+
+# Specified imports
+from typing import Any, List
+
+__all__ = ["PlotIs", "__version__"]
+
+
+def __getattr__(name: str) -> Any:
+    # PlotIs is imported on first use, so that importing the package,
+    # e.g. by the command line tools, does not import its dependencies
+    if name == "PlotIs":
+        from .plotis import PlotIs
+        globals()["PlotIs"] = PlotIs
+        return PlotIs
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + ["PlotIs"])
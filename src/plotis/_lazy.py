@@ -0,0 +1,34 @@
+"""Heavy dependencies of PlotIs, imported on first use.
+
+Importing pandas and numpy takes hundreds of milliseconds, which short
+lived processes importing plotis only to register figures would pay on
+every start. The modules here stand in for them and import them the first
+time one of their attributes is used, typically when the first bundle is
+exported, after which they behave as the modules themselves.
+"""
+
+# Standard lib imports
+import types
+import importlib
+
+# Specified imports
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    """Module importing the module `name` on first attribute access.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        # Only called for attributes not in __dict__, i.e. until the
+        # module is imported, and then for those the module creates lazily
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(vars(module))
+        return getattr(module, attribute)
+
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
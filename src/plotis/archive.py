@@ -0,0 +1,115 @@
+"""Single file bundles.
+
+Instead of a folder, a bundle can be written as one zip archive,
+figpath + ".zip", holding its code as __main__.py, its manifest and its
+data files. The members are stored uncompressed, each as a contiguous
+range of the archive found from the central directory at its end, so
+that a member is read by seeking to it rather than extracting the whole
+archive. The code reads the data straight out of the archive, and the
+archive can be run as it is with `python figpath.zip`.
+"""
+
+# Standard lib imports
+import os
+import json
+import uuid
+import zipfile
+
+# Specified imports
+from typing import Any, Dict, List, Optional, Tuple
+
+# Package imports
+from .serializers import Serializer, sync_folder, sync_path
+
+ARCHIVE_EXTENSION = ".zip"
+
+# Name of the code in the archive, which makes the archive runnable
+CODE_MEMBER = "__main__.py"
+
+# Name of the manifest in the archive, as in bundle folders
+MANIFEST_MEMBER = "manifest.json"
+
+
+def get_archive_path(figpath: str) -> str:
+    """Returns the path of the archive of the bundle in `figpath`.
+    """
+    return figpath + ARCHIVE_EXTENSION
+
+
+def get_archive_open_code(archive_path: str) -> List[str]:
+    """Returns the lines of code opening the archive from which the data
+    is loaded, see get_member_load_code().
+    """
+    return [f"_archive = zipfile.ZipFile(\"{archive_path}\")\n\n"]
+
+
+def get_member_load_code(
+    serializer: Serializer,
+    variable_name: str,
+    member: str,
+    columns: Optional[List[str]] = None
+) -> List[str]:
+    """Returns the lines of code loading the data written by `serializer`
+    to the archive member `member` into the variable `variable_name`.
+    """
+    code = [f"with _archive.open(\"{member}\") as _fp:\n"]
+    code += ["    " + line for line in serializer.get_stream_load_code(variable_name, "_fp", columns)]
+    return code
+
+
+def write_archive(
+    archive_path: str,
+    code: List[str],
+    manifest: Dict[str, Any],
+    members: List[Tuple[str, str]],
+    fsync: bool = False
+) -> None:
+    """Writes the archive `archive_path` holding `code`, `manifest`, and
+    the files of the (member, path) tuples in `members`. The archive is
+    written to a temporary file first, so that it is never seen half written,
+    which is synced to disk before being renamed if `fsync` is True, 
+    as is its folder afterwards.
+    """
+    tmp_path = f"{archive_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+            archive.writestr(CODE_MEMBER, "".join(code))
+            archive.writestr(MANIFEST_MEMBER, json.dumps(manifest, indent=2))
+            for member, path in members:
+                archive.write(path, member)
+        # Synced once closed, i.e. with its central directory
+        if fsync is True:
+            sync_path(tmp_path)
+        os.replace(tmp_path, archive_path)
+        if fsync is True:
+            sync_folder(os.path.dirname(archive_path) or ".")
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_archive_manifest(archive_path: str) -> Optional[Dict[str, Any]]:
+    """Returns the manifest of the archive `archive_path`, or None if it
+    is not a readable bundle archive. Only the manifest member is read.
+    """
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            return json.loads(archive.read(MANIFEST_MEMBER))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def is_bundle_archive(path: str) -> bool:
+    """Returns True if `path` is a bundle archive, i.e. a zip archive
+    holding code and a manifest.
+    """
+    if not path.endswith(ARCHIVE_EXTENSION) or not os.path.isfile(path):
+        return False
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+    return CODE_MEMBER in names and MANIFEST_MEMBER in names
@@ -0,0 +1,260 @@
+"""Command line interface of PlotIs.
+
+Regenerating all figure bundles under a folder:
+
+    plotis regenerate path/to/figures -j 8
+
+The bundles are run on a pool of worker processes which import pandas and
+matplotlib once, using the non-interactive Agg backend. Bundles whose
+figures are newer than their code and data are skipped unless --force is
+given. Note that the paths in run.py are relative to the working directory
+PlotIs was used from, use --cwd if it differs from the current one.
+
+With --render-cache, bundles whose figures are in the render cache are
+copied from it rather than run, see render_cache.py.
+"""
+
+# Standard lib imports
+import os
+import sys
+import time
+import runpy
+import argparse
+import traceback
+
+# Specified imports
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+# Package imports
+from .archive import is_bundle_archive, read_archive_manifest
+from .manifest import MANIFEST_FILENAME, read_manifest
+from .render_cache import RenderCache, get_rc_hash, with_file_fingerprints
+from .writer import STAGING_SUFFIX
+
+# Name of the code file of each bundle
+RUN_FILENAME = "run.py"
+
+# rcParams of the worker process before it ran any bundle
+_worker_rc_params = None
+
+# Render cache of the worker process, kept across bundles 
+# since it tracks the size of the cache
+_worker_render_cache: Optional[RenderCache] = None
+
+
+def find_bundles(root: str) -> List[str]:
+    """Returns the folders under `root`, including `root`, holding a
+    figure bundle, i.e. a run.py file, and the bundle archives under 
+    `root`, in sorted order.
+    """
+    bundle_dirs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        if RUN_FILENAME in filenames:
+            bundle_dirs.append(dirpath)
+        for filename in filenames:
+            if is_bundle_archive(os.path.join(dirpath, filename)):
+                bundle_dirs.append(os.path.join(dirpath, filename))
+        # Staging folders of bundles being written, see writer.py
+        dirnames[:] = sorted(dirname for dirname in dirnames if not dirname.endswith(STAGING_SUFFIX))
+
+    return sorted(bundle_dirs)
+
+
+def is_up_to_date(bundle_dir: str) -> bool:
+    """Returns True if all figures of the bundle in `bundle_dir`, or of
+    the bundle archive `bundle_dir`, exist and are newer than its code 
+    and data files.
+    """
+    if is_bundle_archive(bundle_dir):
+        manifest = read_archive_manifest(bundle_dir)
+        inputs = [bundle_dir]
+    else:
+        manifest = read_manifest(bundle_dir)
+        inputs = [bundle_dir + "/" + RUN_FILENAME, bundle_dir + "/" + MANIFEST_FILENAME]
+    if manifest is None or len(manifest.get("outputs", [])) == 0:
+        return False
+
+    # The data in archives is part of the archive, only stored data has a path
+    inputs += [data_manifest["path"] for data_manifest in manifest.get("data", []) if "path" in data_manifest]
+    try:
+        newest_input = max(os.path.getmtime(path) for path in inputs if os.path.exists(path))
+        oldest_output = min(os.path.getmtime(path) for path in manifest["outputs"])
+    except OSError:
+        # At least one of the outputs is missing
+        return False
+
+    return oldest_output >= newest_input
+
+
+def _init_worker(cwd: Optional[str]) -> None:
+    """Imports the plotting libraries once per worker process, and saves
+    the rcParams which each bundle starts from.
+    """
+    global _worker_rc_params
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+
+    _worker_rc_params = matplotlib.rcParams.copy()
+
+    if cwd is not None:
+        os.chdir(cwd)
+
+
+def _regenerate_bundle(
+    bundle_dir: str,
+    render_cache_root: Optional[str] = None
+) -> Tuple[str, float, Optional[str], bool]:
+    """Runs the run.py of the bundle in `bundle_dir`, or the bundle archive
+    `bundle_dir`, and returns the bundle, the time it took, the formatted 
+    error if it failed, and whether its figures were taken from the render 
+    cache in `render_cache_root` rather than rendered.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    # Workers are reused, the rcParams set by a previous bundle
+    # must neither change the figures nor the render cache keys
+    if _worker_rc_params is not None:
+        matplotlib.rcParams.update(_worker_rc_params)
+    is_archive = is_bundle_archive(bundle_dir)
+    render_cache = None
+    if render_cache_root is not None:
+        render_cache = _get_worker_render_cache(render_cache_root)
+        manifest = read_archive_manifest(bundle_dir) if is_archive else read_manifest(bundle_dir)
+        rc_hash = get_rc_hash()
+        if manifest is None:
+            render_cache = None
+        else:
+            # Data which was not fingerprinted is identified by its file
+            manifest = with_file_fingerprints(manifest, bundle_dir if is_archive else None)
+            if render_cache.fetch_outputs(manifest, rc_hash):
+                return bundle_dir, time.perf_counter() - start, None, True
+
+    error = None
+    try:
+        with matplotlib.rc_context():
+            if is_archive:
+                runpy.run_path(bundle_dir, run_name="__main__")
+            else:
+                runpy.run_path(bundle_dir + "/" + RUN_FILENAME, run_name="__main__")
+        if render_cache is not None:
+            render_cache.put_outputs(manifest, rc_hash)
+    except BaseException:
+        error = traceback.format_exc()
+    finally:
+        # Figures left open would pile up in the long lived workers
+        plt.close("all")
+
+    return bundle_dir, time.perf_counter() - start, error, False
+
+
+def _get_worker_render_cache(root: str) -> RenderCache:
+    """Returns the render cache in `root` of the worker process.
+    """
+    global _worker_render_cache
+    if _worker_render_cache is None or _worker_render_cache.root != root:
+        _worker_render_cache = RenderCache(root)
+
+    return _worker_render_cache
+
+
+def regenerate(
+    root: str,
+    n_workers: Optional[int] = None,
+    force: bool = False,
+    cwd: Optional[str] = None,
+    render_cache: Optional[str] = None
+) -> int:
+    """Regenerates the figures of all bundles under `root` in parallel.
+
+    Parameters
+    ----------
+    root : str
+        Folder in which to look for bundles.
+    n_workers : int | None
+        Number of worker processes, defaults to the number of CPUs.
+    force : bool
+        If True, bundles with up to date figures are regenerated as well.
+    cwd : str | None
+        Working directory in which to run the bundles, defaults to
+        the current one.
+    render_cache : str | None
+        Folder of a render cache, see render_cache.py. Bundles whose 
+        figures are cached are not run, and the figures rendered by the
+        others are added to the cache.
+
+    Returns
+    -------
+    int
+        Number of bundles which failed.
+    """
+    bundle_dirs = find_bundles(root)
+    if render_cache is not None:
+        render_cache = os.path.abspath(render_cache)
+    if cwd is not None:
+        # Up to date checks use the paths in the manifests
+        # which are relative to `cwd`
+        bundle_dirs = [os.path.abspath(bundle_dir) for bundle_dir in bundle_dirs]
+
+    current_dir = os.getcwd()
+    if cwd is not None:
+        os.chdir(cwd)
+    try:
+        to_run = []
+        for bundle_dir in bundle_dirs:
+            if force is False and is_up_to_date(bundle_dir):
+                print(f"up to date  {bundle_dir}")
+            else:
+                to_run.append(bundle_dir)
+    finally:
+        os.chdir(current_dir)
+
+    n_failed = 0
+    if len(to_run) == 0:
+        return n_failed
+
+    total_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(cwd,)) as executor:
+        futures = [executor.submit(_regenerate_bundle, bundle_dir, render_cache) for bundle_dir in to_run]
+        for future in as_completed(futures):
+            bundle_dir, elapsed, error, is_cached = future.result()
+            if error is None:
+                print(f"{elapsed:8.3f}s   {bundle_dir}{' (cached)' if is_cached else ''}")
+            else:
+                n_failed += 1
+                print(f"{elapsed:8.3f}s   {bundle_dir} FAILED\n{error}", file=sys.stderr)
+
+    print(f"Regenerated {len(to_run) - n_failed} of {len(to_run)} bundles in {time.perf_counter() - total_start:.3f}s")
+    return n_failed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the `plotis` command.
+    """
+    parser = argparse.ArgumentParser(prog="plotis", description="Plot isolation tool for python")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    regenerate_parser = subparsers.add_parser(
+        "regenerate",
+        help="Regenerate the figures of all bundles under a folder"
+    )
+    regenerate_parser.add_argument("root", help="Folder in which to look for bundles")
+    regenerate_parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes")
+    regenerate_parser.add_argument("-f", "--force", action="store_true", help="Also regenerate up to date bundles")
+    regenerate_parser.add_argument("--cwd", default=None, help="Working directory in which to run the bundles")
+    regenerate_parser.add_argument(
+        "--render-cache",
+        default=None,
+        help="Folder of a cache of rendered figures, reused when the bundles did not change"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "regenerate":
+        n_failed = regenerate(args.root, args.jobs, args.force, args.cwd, args.render_cache)
+        return 1 if n_failed > 0 else 0
+
+    return 0
@@ -0,0 +1,166 @@
+# Standard lib imports
+import ast
+
+# Specified imports
+from typing import Dict, List, Optional
+
+# Package imports
+from .source_cache import SourceFile
+
+
+class WithContext:
+    """A `with PlotIs(...)` statement found in a source file.
+
+    All line numbers start counting at 1 and are inclusive.
+    """
+
+    def __init__(
+        self,
+        header_start: int,
+        header_end: int,
+        body_start: int,
+        body_end: int,
+        data_source: Optional[str],
+        figpath_source: Optional[str],
+        has_nested_plotis: bool
+    ) -> None:
+        # Lines of the with statement up to and including the colon
+        self.header_start = header_start
+        self.header_end = header_end
+
+        # Lines of the body of the with statement
+        self.body_start = body_start
+        self.body_end = body_end
+
+        # Source code of the data and figpath arguments, None if
+        # the argument is not given
+        self.data_source = data_source
+        self.figpath_source = figpath_source
+
+        # True if there is a with PlotIs(...) statement in the body
+        self.has_nested_plotis = has_nested_plotis
+
+
+def find_with_context(
+    source_file: SourceFile,
+    lineno: int,
+    class_name: str = "PlotIs"
+) -> Optional[WithContext]:
+    """Returns the `with class_name(...)` statement whose header contains
+    line `lineno` in `source_file`.
+
+    The file is parsed once and the with statements are cached together
+    with the source file, i.e. until the file changes.
+
+    Parameters
+    ----------
+    source_file : SourceFile
+        Source file in which to look for the with statement.
+    lineno : int
+        A line number in the header of the with statement, typically
+        the line number of the calling frame.
+    class_name : str
+        Name of the context manager class.
+
+    Returns
+    -------
+    WithContext | None
+        The with statement, or None if the file can not be parsed or
+        there is no such with statement at `lineno`.
+    """
+    cache_key = "with_contexts:" + class_name
+    with_contexts = source_file.derived.get(cache_key)
+    if with_contexts is None:
+        with_contexts = _parse_with_contexts(source_file, class_name)
+        source_file.derived[cache_key] = with_contexts
+
+    return with_contexts.get(lineno)
+
+
+def _parse_with_contexts(source_file: SourceFile, class_name: str) -> Dict[int, WithContext]:
+    """Parses `source_file` and returns the with statements using
+    `class_name`, keyed by each of the line numbers of their headers.
+    """
+    source = "".join(source_file.lines)
+    try:
+        tree = ast.parse(source, filename=source_file.filename)
+    except (SyntaxError, ValueError):
+        return {}
+
+    with_contexts: Dict[int, WithContext] = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.With, ast.AsyncWith)):
+            continue
+
+        call = _get_plotis_call(node, class_name)
+        if call is None:
+            continue
+
+        # The header ends with the last with item, the colon is
+        # assumed to be on the same line
+        header_end = max(
+            (item.optional_vars or item.context_expr).end_lineno
+            for item in node.items
+        )
+        body_start = min(header_end + 1, node.body[0].lineno)
+
+        has_nested_plotis = any(
+            isinstance(child, (ast.With, ast.AsyncWith)) and _get_plotis_call(child, class_name) is not None
+            for stmt in node.body for child in ast.walk(stmt)
+        )
+
+        data_node = _get_argument(call, 1, "data")
+        figpath_node = _get_argument(call, 0, "figpath")
+
+        with_context = WithContext(
+            header_start=node.lineno,
+            header_end=header_end,
+            body_start=body_start,
+            body_end=node.end_lineno,
+            data_source=_get_source(source, data_node),
+            figpath_source=_get_source(source, figpath_node),
+            has_nested_plotis=has_nested_plotis
+        )
+        for lineno in range(node.lineno, header_end + 1):
+            with_contexts[lineno] = with_context
+
+    return with_contexts
+
+
+def _get_plotis_call(node: ast.AST, class_name: str) -> Optional[ast.Call]:
+    """Returns the `class_name(...)` call among the items of the with
+    statement `node`, if any.
+    """
+    for item in node.items:
+        call = item.context_expr
+        if not isinstance(call, ast.Call):
+            continue
+        if isinstance(call.func, ast.Name) and call.func.id == class_name:
+            return call
+        if isinstance(call.func, ast.Attribute) and call.func.attr == class_name:
+            return call
+    return None
+
+
+def _get_argument(call: ast.Call, position: int, name: str) -> Optional[ast.expr]:
+    """Returns the argument of `call` given either as positional argument
+    `position` or as keyword argument `name`.
+    """
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    if len(call.args) > position and not isinstance(call.args[position], ast.Starred):
+        return call.args[position]
+    return None
+
+
+def _get_source(source: str, node: Optional[ast.expr]) -> Optional[str]:
+    if node is None:
+        return None
+    return ast.get_source_segment(source, node)
+
+
+def get_header_lines(source_file: SourceFile, with_context: WithContext) -> List[str]:
+    """Returns the source lines of the header of `with_context`.
+    """
+    return source_file.lines[with_context.header_start - 1:with_context.header_end]
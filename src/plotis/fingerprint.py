@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+# Standard lib imports
+import hashlib
+
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
+
+# Specified imports
+from typing import Any, List, Optional, Union
+
+# Package imports
+from .serializers import get_series_column, is_arrow_table, is_polars_frame
+
+# Number of rows hashed at a time, bounding the memory needed for
+# columns that have to be copied to be hashed.
+BLOCK_ROWS = 1 << 20
+
+
+class Fingerprinter:
+    """Computes a fingerprint of a DataFrame, i.e. a hash of its column
+    names and dtypes, the names and dtypes of its index, and the values
+    of both.
+
+    The values are hashed from the underlying NumPy buffers, block by block,
+    rather than from any text representation. Each column is hashed
+    separately, so the fingerprint does not depend on how the rows are
+    split when passed to update() in consecutive chunks.
+    """
+
+    def __init__(self) -> None:
+        self._columns: Optional[List[Any]] = None
+        self._dtypes: Optional[List[str]] = None
+        self._index_key: Optional[str] = None
+        self._column_hashers: List[Any] = []
+        self._index_hasher = hashlib.blake2b(digest_size=16)
+        self.n_rows = 0
+
+    def update(self, data: pd.DataFrame) -> None:
+        """Adds the rows of `data` to the fingerprint.
+        """
+        columns = list(data.columns)
+        dtypes = [_get_dtype_key(dtype) for dtype in data.dtypes]
+        index_key = repr(list(data.index.names)) + repr([
+            _get_dtype_key(data.index.get_level_values(level).dtype) for level in range(data.index.nlevels)
+        ])
+        if self._columns is None:
+            self._columns = columns
+            self._dtypes = dtypes
+            self._index_key = index_key
+            self._column_hashers = [hashlib.blake2b(digest_size=16) for _ in columns]
+        elif columns != self._columns or dtypes != self._dtypes or index_key != self._index_key:
+            raise ValueError("All chunks of data must have the same columns, dtypes and index")
+
+        for ix, hasher in enumerate(self._column_hashers):
+            _hash_values(hasher, data.iloc[:, ix])
+        _hash_values(self._index_hasher, data.index)
+
+        self.n_rows += len(data)
+
+    def hexdigest(self) -> str:
+        """Returns the fingerprint of all rows added so far.
+        """
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update((self._index_key or "").encode())
+        hasher.update(self._index_hasher.digest())
+        for column, dtype, column_hasher in zip(self._columns or [], self._dtypes or [], self._column_hashers):
+            hasher.update(repr(column).encode())
+            hasher.update(dtype.encode())
+            hasher.update(column_hasher.digest())
+
+        return hasher.hexdigest()
+
+
+def fingerprint_data(data: Union[pd.DataFrame, pd.Series, np.ndarray]) -> str:
+    """Returns the fingerprint of `data`, see Fingerprinter. Series are
+    fingerprinted as the single column DataFrames they are written as, 
+    along with their name, distinct from the fingerprints of DataFrames.
+    Arrow tables and Polars DataFrames are fingerprinted from their 
+    Arrow buffers.
+    """
+    if isinstance(data, np.ndarray):
+        return _fingerprint_array(data)
+    if is_arrow_table(data):
+        return _fingerprint_arrow_table(data, "pyarrow")
+    if is_polars_frame(data):
+        # Polars DataFrames are converted without copying their buffers
+        return _fingerprint_arrow_table(data.to_arrow(), "polars")
+
+    fingerprinter = Fingerprinter()
+    if not isinstance(data, pd.Series):
+        fingerprinter.update(data)
+        return fingerprinter.hexdigest()
+
+    # See SeriesSerializer
+    fingerprinter.update(data.to_frame(name=get_series_column(data.name)))
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(b"series")
+    hasher.update(repr(data.name).encode())
+    hasher.update(fingerprinter.hexdigest().encode())
+    return hasher.hexdigest()
+
+
+def _fingerprint_array(array: np.ndarray) -> str:
+    """Returns the fingerprint of the dtype, shape and values of `array`.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(array.dtype.str.encode())
+    hasher.update(repr(array.dtype.descr).encode())
+    hasher.update(repr(array.shape).encode())
+
+    flat = array.reshape(-1)
+    for start in range(0, len(flat), BLOCK_ROWS):
+        block = flat[start:start + BLOCK_ROWS]
+        if array.dtype.hasobject:
+            block = pd.util.hash_array(block.astype(object))
+        hasher.update(np.ascontiguousarray(block).view(np.uint8))
+
+    return hasher.hexdigest()
+
+
+def _fingerprint_arrow_table(table: Any, library: str) -> str:
+    """Returns the fingerprint of the schema and values of the Arrow 
+    `table` of `library`, hashed from the buffers of its columns.
+    """
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(library.encode())
+    hasher.update(table.schema.to_string(show_schema_metadata=False).encode())
+    hasher.update(repr(table.num_rows).encode())
+    for column in table.columns:
+        for chunk in column.chunks:
+            # Slices share the buffers of the whole array, hence the
+            # offset and length of the chunk within them
+            hasher.update(repr((chunk.offset, len(chunk))).encode())
+            if chunk.type.num_fields > 0:
+                # The children of nested arrays have offsets of their own
+                hasher.update(repr(chunk.to_pylist()).encode())
+                continue
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    hasher.update(buffer)
+
+    return hasher.hexdigest()
+
+
+def _get_dtype_key(dtype: Any) -> str:
+    """Returns a description of `dtype` which tells apart all dtypes whose
+    data is written differently, e.g. categoricals by their categories.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories_hasher = hashlib.blake2b(digest_size=16)
+        _hash_values(categories_hasher, dtype.categories)
+        return f"category[{dtype.categories.dtype}, ordered={dtype.ordered}, {categories_hasher.hexdigest()}]"
+    return str(dtype)
+
+
+def _hash_values(hasher: Any, values: Any) -> None:
+    """Updates `hasher` with the values of a Series or Index.
+    """
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufcmM":
+        # Plain NumPy data is hashed straight from its buffer
+        array = values.to_numpy()
+        for start in range(0, len(array), BLOCK_ROWS):
+            block = np.ascontiguousarray(array[start:start + BLOCK_ROWS])
+            hasher.update(block.view(np.uint8))
+    else:
+        # Objects and extension dtypes are hashed through pandas'
+        # vectorized per-row hash
+        for start in range(0, len(values), BLOCK_ROWS):
+            block = values[start:start + BLOCK_ROWS]
+            row_hashes = pd.util.hash_pandas_object(block, index=False).to_numpy()
+            hasher.update(np.ascontiguousarray(row_hashes).view(np.uint8))
+            if values.dtype == object:
+                # Objects are hashed by their str, hence their types tell
+                # apart e.g. 1 and "1"
+                type_names = np.array([type(value).__qualname__ for value in block], dtype=object)
+                hasher.update(pd.util.hash_array(type_names).view(np.uint8))
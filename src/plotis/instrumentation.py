@@ -0,0 +1,173 @@
+"""Instrumentation of PlotIs.
+
+The time spent in each phase of a `with PlotIs` block, and the rows and
+bytes written, are collected in a BundleStats for each bundle. When a
+bundle is done, its stats are logged to the "plotis" logger, passed to
+the hooks added with add_hook(), and added to a process wide summary
+returned by get_summary().
+
+    def send_metrics(stats):
+        statsd.timing("plotis.serialize", stats.timings.get("serialize", 0.0))
+
+    add_hook(send_metrics)
+
+The phases are:
+    enter        the whole of __enter__
+    stack        finding the calling frame
+    source       reading the calling file and locating the context
+    clean        cleaning the source of the context
+    exit         the whole of __exit__, excluding background writes
+    reduce       pruning and downsampling the data
+    fingerprint  fingerprinting the data
+    codegen      generating run.py and the manifest
+    render       saving the figure, or copying it from the render cache
+    snapshot     snapshotting the data written in the background
+    serialize    writing the data files
+    write_code   writing run.py and the manifest
+    fsync        syncing the written files to disk
+    publish      renaming the written files to figpath
+"""
+
+# Standard lib imports
+import time
+import logging
+import threading
+
+# Specified imports
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("plotis")
+
+# Callbacks called with the BundleStats of each bundle when it is done
+_hooks: List[Callable[["BundleStats"], None]] = []
+
+
+class BundleStats:
+    """Timings and sizes of writing one bundle.
+    """
+
+    def __init__(self, figpath: str) -> None:
+        """
+        Parameters
+        ----------
+        figpath : str
+            Path to the folder of the bundle.
+        """
+        self.figpath = figpath
+        self.timings: Dict[str, float] = {} # Seconds spent in each phase
+        self.bytes_written = 0
+        self.n_rows = 0
+        self.status: Optional[str] = None # "written", "reused" or "failed"
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Adds the time spent in the with block to `phase`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def update(self, other: "BundleStats") -> None:
+        """Sets the timings, sizes and status to those of `other`, e.g. 
+        stats returned from a worker process.
+        """
+        self.timings = dict(other.timings)
+        self.bytes_written = other.bytes_written
+        self.n_rows = other.n_rows
+        self.status = other.status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "figpath": self.figpath,
+            "status": self.status,
+            "timings": dict(self.timings),
+            "bytes_written": self.bytes_written,
+            "n_rows": self.n_rows,
+        }
+
+
+class Summary:
+    """Totals of the stats of all bundles done in the process.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.n_bundles = 0
+            self.n_by_status: Dict[str, int] = {}
+            self.timings: Dict[str, float] = {}
+            self.bytes_written = 0
+            self.n_rows = 0
+
+    def add(self, stats: BundleStats) -> None:
+        with self._lock:
+            self.n_bundles += 1
+            self.n_by_status[stats.status] = self.n_by_status.get(stats.status, 0) + 1
+            for phase, seconds in stats.timings.items():
+                self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+            self.bytes_written += stats.bytes_written
+            self.n_rows += stats.n_rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "n_bundles": self.n_bundles,
+                "n_by_status": dict(self.n_by_status),
+                "timings": dict(self.timings),
+                "bytes_written": self.bytes_written,
+                "n_rows": self.n_rows,
+            }
+
+
+SUMMARY = Summary()
+
+
+def add_hook(hook: Callable[[BundleStats], None]) -> None:
+    """Adds a callback called with the BundleStats of each bundle when it
+    is done. Bundles written in the background call it from the thread or
+    process writing them, hence hooks must be thread-safe.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[BundleStats], None]) -> None:
+    _hooks.remove(hook)
+
+
+def get_summary() -> Dict[str, Any]:
+    """Returns the totals of the stats of all bundles done in the process.
+    """
+    return SUMMARY.to_dict()
+
+
+def reset_summary() -> None:
+    SUMMARY.reset()
+
+
+def report(stats: BundleStats) -> None:
+    """Logs `stats`, adds it to the summary and passes it to the hooks.
+    """
+    SUMMARY.add(stats)
+    logger.debug(
+        "Bundle %s %s: %d rows, %d bytes, %s",
+        stats.figpath,
+        stats.status,
+        stats.n_rows,
+        stats.bytes_written,
+        ", ".join(f"{phase} {seconds * 1000:.2f}ms" for phase, seconds in stats.timings.items())
+    )
+    for hook in list(_hooks):
+        try:
+            hook(stats)
+        except Exception:
+            # A failing hook must not fail the bundle
+            logger.exception("PlotIs instrumentation hook %r failed", hook)
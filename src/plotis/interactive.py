@@ -0,0 +1,56 @@
+"""Source of code run interactively, e.g. notebook and IPython cells.
+
+The code of a cell is compiled with a pseudo file name, such as
+<ipython-input-3-5f1a2b3c4d5e> or /tmp/ipykernel_1234/2841306127.py, which
+does not exist on disk. IPython registers the source of each cell in
+linecache instead, without a modification time, and keeps it in the
+history of the session. The source is taken from there, see SourceCache.
+"""
+
+# Standard lib imports
+import re
+import sys
+import linecache
+
+# Specified imports
+from typing import List, Optional
+
+# Matches the pseudo file names of cells in terminal IPython, with the
+# number of the cell in the history
+IPYTHON_INPUT_PATTERN = re.compile(r"<ipython-input-(\d+)-[0-9a-f]+>")
+
+
+def get_linecache_lines(filename: str) -> Optional[List[str]]:
+    """Returns the lines of `filename` if they are held in memory by
+    linecache, i.e. registered without a modification time as IPython
+    does for cells, rather than read from a file. Otherwise returns None.
+    """
+    entry = linecache.cache.get(filename)
+    if entry is None or len(entry) != 4 or entry[1] is not None:
+        # Entries of files on disk, or lazily loaded entries
+        return None
+
+    return entry[2]
+
+
+def get_history_lines(filename: str) -> Optional[List[str]]:
+    """Returns the lines of the IPython cell compiled as `filename` from
+    the history of the running IPython session, or None if there is no
+    such cell.
+    """
+    match = IPYTHON_INPUT_PATTERN.fullmatch(filename)
+    if match is None:
+        return None
+
+    # IPython is only used if it is already running
+    ipython = sys.modules.get("IPython")
+    shell = ipython.get_ipython() if ipython is not None else None
+    if shell is None:
+        return None
+
+    history = shell.history_manager.input_hist_parsed
+    cell_number = int(match.group(1))
+    if cell_number >= len(history):
+        return None
+
+    return history[cell_number].splitlines(keepends=True)
@@ -0,0 +1,143 @@
+# Standard lib imports
+import re
+
+# Specified imports
+from typing import List, Optional
+
+# Package imports
+from .source_cache import SourceFile
+
+# Tags of a line, combined as bit flags
+BLANK = 1
+COMMENT = 2
+SAVEFIG = 4  # Saves a figure and is removed from the context
+SHOW = 8  # Shows a figure and is removed from the context
+NESTED_PLOTIS = 16  # A with statement using PlotIs
+
+# Lines with any of these tags are removed when cleaning the context
+REMOVED = COMMENT | SAVEFIG | SHOW
+
+# Matches a line with a with statement using PlotIs
+WITH_PLOTIS_PATTERN = re.compile(
+    r"(\s{1,}|)with PlotIs[(](\s|\S|){1,}[)] as \S{1,}:[\n]|(\s{1,}|)with PlotIs[(](\s|\S|){1,}[)]:[\n]"
+)
+
+
+class LineClassification:
+    """The lines of a context, each cleaned and tagged once, from which
+    the cleaned source and the checks of the context are read.
+    """
+
+    def __init__(self, lines: List[str], tags: List[int], cleaned_lines: List[str], n_show: int, n_savefig: int) -> None:
+        """
+        Parameters
+        ----------
+        lines : List[str]
+            The lines of the context, without indentation and each
+            ending with a line break.
+        tags : List[int]
+            Tags of each of `lines`, as bit flags.
+        cleaned_lines : List[str]
+            The lines without those removed when cleaning the context.
+        n_show : int
+            Number of calls showing a figure.
+        n_savefig : int
+            Number of calls saving a figure.
+        """
+        self.lines = lines
+        self.tags = tags
+        self.cleaned_lines = cleaned_lines
+        self.n_show = n_show
+        self.n_savefig = n_savefig
+
+    @property
+    def has_multiple_plots(self) -> bool:
+        return self.n_show > 1 or self.n_savefig > 1
+
+    @property
+    def has_nested_plotis(self) -> bool:
+        return any(tag & NESTED_PLOTIS for tag in self.tags)
+
+
+def classify_lines(code: List[str]) -> LineClassification:
+    """Cleans and tags each line of `code` in a single pass.
+
+    A line is cleaned by removing its indentation and ensuring it ends
+    with a line break. Lines containing ".savefig" or "plt.show(", and
+    comment lines, are removed from the cleaned lines. Calls to savefig()
+    and .show() are counted, and the kept lines starting a with statement
+    using PlotIs are tagged as nested.
+    """
+    lines = []
+    tags = []
+    cleaned_lines = []
+    n_show = 0
+    n_savefig = 0
+    for line in code:
+        n_show += 1 if ".show()" in line else 0
+        n_savefig += 1 if "savefig(" in line else 0
+
+        line = line.lstrip()
+        if len(line) == 0:
+            line = "\n"
+        elif line[-1] != "\n":
+            line = line + "\n"
+
+        tag = 0
+        if line == "\n":
+            tag |= BLANK
+        if line[0] == "#":
+            tag |= COMMENT
+        if ".savefig" in line:
+            tag |= SAVEFIG
+        if "plt.show(" in line:
+            tag |= SHOW
+
+        if tag & REMOVED == 0:
+            # The pattern is only tried on the few lines which could match
+            if "PlotIs" in line and WITH_PLOTIS_PATTERN.match(line) is not None:
+                tag |= NESTED_PLOTIS
+            cleaned_lines.append(line)
+
+        lines.append(line)
+        tags.append(tag)
+
+    return LineClassification(lines, tags, cleaned_lines, n_show, n_savefig)
+
+
+def get_line_classification(source_file: SourceFile, start: int, end: int) -> LineClassification:
+    """Returns the classification of the lines `start` to `end`, inclusive
+    and counting from 1, of `source_file`. The classification is cached
+    with the file, i.e. computed once per span until the file changes.
+    """
+    key = f"line_classification:{start}:{end}"
+    classification: Optional[LineClassification] = source_file.derived.get(key)
+    if classification is None:
+        classification = classify_lines(source_file.lines[start - 1:end])
+        source_file.derived[key] = classification
+
+    return classification
+
+
+def get_indented_lines(source_file: SourceFile, start: int, end: int) -> List[str]:
+    """Returns the cleaned lines `start` to `end` of `source_file`, see 
+    classify_lines(), but keeping their indentation relative to the least
+    indented of them, so that blocks in the context stay valid code.
+    """
+    classification = get_line_classification(source_file, start, end)
+    lines = source_file.lines[start - 1:end]
+    indentation = min(
+        (indent for line, indent in zip(lines, source_file.indentation[start - 1:end]) if line.strip() != ""),
+        default=0
+    )
+
+    indented_lines = []
+    for line, tag in zip(lines, classification.tags):
+        if tag & REMOVED != 0:
+            continue
+        if tag & BLANK != 0:
+            indented_lines.append("\n")
+        else:
+            indented_lines.append(line[indentation:].rstrip("\n") + "\n")
+
+    return indented_lines
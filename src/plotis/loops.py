@@ -0,0 +1,363 @@
+"""Bundles of `with PlotIs` blocks in loops.
+
+Plotting one figure per group or parameter is done by a `with PlotIs`
+block in a loop. Given the parameters of each iteration as `loop`, all
+iterations entering PlotIs from the same line with the same figpath are
+collected into a single loop bundle:
+
+    for group, group_df in df.groupby("group"):
+        with PlotIs("figures/groups", group_df, loop={"group": group}):
+            plt.plot(group_df["x"], group_df["y"])
+            plt.title(group)
+
+The context is located and cleaned by the first iteration only, the others
+only add their parameters and data. The bundle is written when PlotIs is
+flushed, or when the process exits. It holds one data file per data object
+with the rows of all iterations, partitioned by the column _iteration, and
+a single run.py regenerating all iterations, or those given on the command
+line, e.g. `python run.py 0 2`, saving the figures to figure_0.png, ...
+"""
+
+from __future__ import annotations
+
+# Standard lib imports
+import json
+import time
+import atexit
+import hashlib
+import threading
+
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
+
+# Specified imports
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+# Package imports
+from ._version import __version__
+from .instrumentation import BundleStats, logger, report
+from .outputs import get_output_suffix
+from .references import get_referenced_columns
+from .writer import Bundle, BundleData, write_bundle
+
+# Column of the data files holding the index of the iteration of each row
+PARTITION_COLUMN = "_iteration"
+
+
+class LoopBundle:
+    """The iterations of a `with PlotIs` block in a loop, see the module
+    docstring.
+    """
+
+    def __init__(
+        self,
+        figpath: str,
+        call_site: Tuple[str, int],
+        context: Dict[str, Any],
+        source_lines: List[str],
+        outputs: List[Tuple[str, Optional[float]]],
+        lazy_load: bool = False,
+        fsync: bool = True
+    ) -> None:
+        """
+        Parameters
+        ----------
+        figpath : str
+            Path to the folder in which to save the data and code.
+        call_site : Tuple[str, int]
+            File name and line number of the with statement.
+        context : Dict[str, Any]
+            The attributes of PlotIs describing the context, set by
+            the first iteration and reused by the others.
+        source_lines : List[str]
+            The cleaned lines of the context, with their relative 
+            indentation, run for each iteration.
+        outputs : List[Tuple[str, float | None]]
+            The (format, dpi) in which each iteration is saved.
+        lazy_load : bool
+            If True, run.py only loads the columns used in the context.
+        fsync : bool
+            If True, the files are synced to disk before the bundle is
+            published, see writer.py.
+        """
+        self.figpath = figpath
+        self.call_site = call_site
+        self.context = context
+        self.source_lines = source_lines
+        self.outputs = outputs
+        self.lazy_load = lazy_load
+        self.fsync = fsync
+        self.iterations: List[Dict[str, Any]] = []
+        self.data_items: List[BundleData] = [] # Of the first iteration
+        self.partitions: Dict[str, List[pd.DataFrame]] = {}
+        self.stats = BundleStats(figpath)
+        self._keys: Set[str] = set()
+
+    def has_iteration(self, params: Dict[str, Any]) -> bool:
+        """Returns True if an iteration with `params` was already added,
+        i.e. the loop was started over.
+        """
+        return _get_params_key(params) in self._keys
+
+    def add_iteration(self, params: Dict[str, Any], bundle_data: List[BundleData], stats: BundleStats) -> int:
+        """Adds an iteration with parameters `params` and data `bundle_data`,
+        whose timings `stats` are added to those of the bundle. Returns the
+        index of the iteration.
+        """
+        if len(self.iterations) == 0:
+            self.data_items = bundle_data
+            self.partitions = {data_item.name: [] for data_item in bundle_data}
+        elif list(params) != list(self.iterations[0]):
+            raise ValueError("All iterations of a loop must have the same parameters")
+        elif [data_item.name for data_item in bundle_data] != list(self.partitions):
+            raise ValueError("All iterations of a loop must have the same data")
+
+        for data_item in bundle_data:
+            if not isinstance(data_item.data, pd.DataFrame):
+                raise ValueError(f"The data of loops must be DataFrames, got: {type(data_item.data).__name__}")
+            if PARTITION_COLUMN in data_item.data.columns:
+                raise ValueError(f"The data of loops can not have a column named {PARTITION_COLUMN}")
+            self.partitions[data_item.name].append(data_item.data)
+
+        self.iterations.append(params)
+        self._keys.add(_get_params_key(params))
+        for phase, seconds in stats.timings.items():
+            self.stats.add_time(phase, seconds)
+
+        return len(self.iterations) - 1
+
+    def get_output_paths(self) -> List[str]:
+        """Returns the paths of the figures of all iterations.
+        """
+        return [
+            self.figpath + f"/figure_{ix}" + get_output_suffix(format, dpi)
+            for ix in range(len(self.iterations))
+            for format, dpi in self.outputs
+        ]
+
+    def get_code(self) -> List[str]:
+        """Returns the lines of run.py, regenerating the selected iterations.
+        """
+        code = [
+            "import sys\n",
+            "import json\n",
+            "import pandas as pd\n",
+            "import matplotlib.pyplot as plt\n",
+        ]
+        for data_item in self.data_items:
+            code += [line for line in data_item.serializer.get_import_code() if line not in code]
+        code.append("\n")
+
+        # The parameters are given as a JSON string literal
+        code += [
+            "# Parameters of each iteration\n",
+            f"_iterations = json.loads({json.dumps(json.dumps(self.iterations))})\n\n",
+            "# Indices of the iterations to regenerate, given on the command line,\n",
+            "# e.g. `python run.py 0 2`, or as ITERATIONS in the init_globals of\n",
+            "# runpy.run_path(), defaulting to all of them. Other arguments are\n",
+            "# those of the program running this file, e.g. plotis regenerate\n",
+            "if \"ITERATIONS\" in globals():\n",
+            "    _selected = ITERATIONS\n",
+            "elif len(sys.argv) > 1 and all(arg.isdigit() for arg in sys.argv[1:]):\n",
+            "    _selected = [int(arg) for arg in sys.argv[1:]]\n",
+            "else:\n",
+            "    _selected = range(len(_iterations))\n\n",
+        ]
+
+        for data_item in self.data_items:
+            data_name = f"_{data_item.name}_data"
+            columns = None
+            if self.lazy_load is True:
+                columns = get_referenced_columns(
+                    self.context["context_source_lines"],
+                    data_item.name,
+                    list(data_item.data.columns)
+                )
+                if columns is not None:
+                    columns = [PARTITION_COLUMN] + columns
+            code += data_item.serializer.get_load_code(data_name, data_item.path, columns)
+            code[-1] = code[-1].rstrip("\n") + "\n"
+            code += [
+                f"_{data_item.name}_partitions = {{\n",
+                f"    ix: part.drop(columns=\"{PARTITION_COLUMN}\") for ix, part in {data_name}.groupby(\"{PARTITION_COLUMN}\")\n",
+                "}\n",
+                f"_{data_item.name}_empty = {data_name}.iloc[0:0].drop(columns=\"{PARTITION_COLUMN}\")\n\n",
+            ]
+
+        code.append("for _ix in _selected:\n")
+        for key in self.iterations[0] if len(self.iterations) > 0 else []:
+            code.append(f"    {key} = _iterations[_ix][{json.dumps(key)}]\n")
+        for data_item in self.data_items:
+            code.append(f"    {data_item.name} = _{data_item.name}_partitions.get(_ix, _{data_item.name}_empty)\n")
+        code += ["    " + line if line != "\n" else line for line in self.source_lines]
+        for format, dpi in self.outputs:
+            dpi_code = f", dpi={dpi:g}" if dpi is not None else ""
+            code.append(
+                f"    plt.savefig(\"{self.figpath}/figure_\" + str(_ix) + \"{get_output_suffix(format, dpi)}\"{dpi_code})\n"
+            )
+        code.append("    plt.close()\n")
+
+        return code
+
+    def get_manifest(self, code: List[str]) -> Dict[str, Any]:
+        """Returns the description of the bundle written to its manifest.
+        """
+        return {
+            "plotis_version": __version__,
+            "code_hash": hashlib.sha256("".join(code).encode()).hexdigest(),
+            "data": [
+                {
+                    "name": data_item.name,
+                    "path": data_item.path,
+                    "serializer": data_item.serializer.name,
+                    "partition_column": PARTITION_COLUMN,
+                }
+                for data_item in self.data_items
+            ],
+            "iterations": self.iterations,
+            "outputs": self.get_output_paths(),
+        }
+
+    def get_registry_entry(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the entry describing the bundle in the registry, as for
+        other bundles, see PlotIs._get_registry_entry().
+        """
+        return {
+            "figpath": self.figpath,
+            "archive": False,
+            "source_file": self.call_site[0],
+            "context_start": self.context["calling_context_line_start"],
+            "context_end": self.context["calling_context_line_end"],
+            "created": time.time(),
+            "plotis_version": manifest["plotis_version"],
+            "code_hash": manifest["code_hash"],
+            # The data of loops is not fingerprinted
+            "data": [{"fingerprint": None, **data_manifest} for data_manifest in manifest["data"]],
+            "outputs": manifest["outputs"],
+        }
+
+    def write(self) -> BundleStats:
+        """Writes the data of all iterations, run.py and the manifest, see
+        write_bundle(). Returns the stats of the bundle, which are reported.
+        """
+        stats = self.stats
+        logger.info("Writing %d iterations to: %s", len(self.iterations), self.figpath)
+
+        bundle_data = []
+        with stats.timer("serialize"):
+            for data_item in self.data_items:
+                # Concatenated once, which unifies the dtypes of the partitions
+                data = pd.concat([
+                    part.assign(**{PARTITION_COLUMN: np.int64(ix)}) 
+                    for ix, part in enumerate(self.partitions[data_item.name])
+                ])
+                bundle_data.append(BundleData(data_item.name, data, data_item.serializer, data_item.path))
+
+        with stats.timer("codegen"):
+            code = self.get_code()
+            manifest = self.get_manifest(code)
+
+        # Imported here, since the registry writes the loop bundles when flushed
+        from .registry import REGISTRY
+        if REGISTRY.enabled:
+            REGISTRY.add(self.get_registry_entry(manifest), stats)
+
+        write_bundle(Bundle(self.figpath, bundle_data, code, manifest, stats=stats, fsync=self.fsync))
+        report(stats)
+
+        return stats
+
+
+def _get_params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def normalize_params(params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Returns the parameters of an iteration as they are loaded by run.py,
+    i.e. through JSON. NumPy scalars, e.g. keys of groupby(), are converted
+    to python scalars.
+    """
+    for key in params:
+        if not isinstance(key, str) or not key.isidentifier():
+            raise ValueError(f"Loop parameters must be named by valid variable names, got: {key}")
+
+    def to_json(value: Any) -> Any:
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Loop parameters must be JSON serializable, got: {type(value).__name__}")
+
+    try:
+        return json.loads(json.dumps(dict(params), default=to_json))
+    except TypeError as e:
+        raise ValueError(str(e)) from e
+
+
+class LoopRegistry:
+    """The loop bundles not yet written, by figpath.
+    """
+
+    def __init__(self) -> None:
+        self._bundles: Dict[str, LoopBundle] = {}
+        self._lock = threading.Lock()
+
+    def get(self, figpath: str) -> Optional[LoopBundle]:
+        with self._lock:
+            return self._bundles.get(figpath)
+
+    def add_iteration(
+        self,
+        figpath: str,
+        call_site: Tuple[str, int],
+        params: Dict[str, Any],
+        bundle_data: List[BundleData],
+        stats: BundleStats,
+        new_bundle: Any
+    ) -> int:
+        """Adds an iteration to the loop bundle in `figpath`. A new bundle
+        is made by calling `new_bundle()` if there is none, or if the
+        bundle is from another call site or already has an iteration with
+        `params`, in which case it is written first. Returns the index of
+        the iteration.
+        """
+        finished = None
+        with self._lock:
+            loop_bundle = self._bundles.get(figpath)
+            if loop_bundle is None or loop_bundle.call_site != call_site or loop_bundle.has_iteration(params):
+                finished = loop_bundle
+                loop_bundle = new_bundle()
+                self._bundles[figpath] = loop_bundle
+            ix = loop_bundle.add_iteration(params, bundle_data, stats)
+
+        if finished is not None:
+            finished.write()
+
+        return ix
+
+    def flush(self) -> int:
+        """Writes all loop bundles. Returns the number of bundles written.
+        """
+        with self._lock:
+            loop_bundles = list(self._bundles.values())
+            self._bundles.clear()
+
+        for loop_bundle in loop_bundles:
+            loop_bundle.write()
+
+        return len(loop_bundles)
+
+
+LOOPS = LoopRegistry()
+
+
+def flush_loops() -> int:
+    """Writes the loop bundles not yet written, see LoopRegistry.flush().
+    """
+    return LOOPS.flush()
+
+
+@atexit.register
+def _flush_loops_at_exit() -> None:
+    try:
+        LOOPS.flush()
+    except Exception as e:
+        logger.error("Failed to write loop bundles: %s", e)
@@ -0,0 +1,58 @@
+# Standard lib imports
+import os
+import json
+
+# Specified imports
+from typing import Any, Dict, Optional
+
+# Package imports
+from .archive import get_archive_path, read_archive_manifest
+
+# Name of the manifest file written to each bundle
+MANIFEST_FILENAME = "manifest.json"
+
+
+def get_manifest_path(figpath: str) -> str:
+    """Returns the path to the manifest of the bundle in `figpath`.
+    """
+    return figpath + "/" + MANIFEST_FILENAME
+
+
+def write_manifest(figpath: str, manifest: Dict[str, Any]) -> None:
+    """Writes `manifest` to the bundle in `figpath`.
+    """
+    with open(get_manifest_path(figpath), "w+") as fp:
+        json.dump(manifest, fp, indent=2)
+
+
+def read_manifest(figpath: str, archive: bool = False) -> Optional[Dict[str, Any]]:
+    """Returns the manifest of the bundle in `figpath`, or of its archive
+    if `archive` is True, or None if the bundle has no readable manifest.
+    """
+    if archive is True:
+        return read_archive_manifest(get_archive_path(figpath))
+
+    manifest_path = get_manifest_path(figpath)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path, "r") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def is_bundle_up_to_date(figpath: str, manifest: Dict[str, Any], archive: bool = False) -> bool:
+    """Returns True if the bundle in `figpath`, or its archive if `archive`
+    is True, was written with the exact manifest `manifest`, i.e. the same 
+    data, code, serializer and PlotIs version, and its code and data files 
+    still exist. The members of an archive exist if its manifest does.
+    """
+    if read_manifest(figpath, archive) != manifest:
+        return False
+
+    paths = [data_manifest["path"] for data_manifest in manifest["data"] if "path" in data_manifest]
+    if archive is False:
+        paths.append(figpath + "/run.py")
+    return all(os.path.exists(path) for path in paths)
@@ -0,0 +1,104 @@
+# Specified imports
+from typing import List, Optional, Sequence, Tuple, Union
+
+# An output is given as a format, e.g. "svg", or a (format, dpi) tuple
+OutputSpec = Union[str, Tuple[str, Optional[float]]]
+
+# The output written when none are given
+DEFAULT_OUTPUTS = [("png", None)]
+
+
+def normalize_outputs(outputs: Optional[Sequence[OutputSpec]]) -> List[Tuple[str, Optional[float]]]:
+    """Returns `outputs` as a list of unique (format, dpi) tuples,
+    where a dpi of None means matplotlib's default.
+    """
+    if outputs is None:
+        return list(DEFAULT_OUTPUTS)
+    if isinstance(outputs, (str, tuple)):
+        outputs = [outputs]
+
+    normalized = []
+    for output in outputs:
+        format, dpi = (output, None) if isinstance(output, str) else output
+        format = format.lower().lstrip(".")
+        if len(format) == 0 or not format.isalnum():
+            raise ValueError(f"Invalid output format: {format!r}")
+        if dpi is not None and dpi <= 0:
+            raise ValueError(f"Invalid output dpi: {dpi}")
+        if (format, dpi) not in normalized:
+            normalized.append((format, dpi))
+
+    if len(normalized) == 0:
+        raise ValueError("At least one output is needed")
+
+    return normalized
+
+
+def get_output_path(figpath: str, format: str, dpi: Optional[float] = None, archive: bool = False) -> str:
+    """Returns the path to which run.py saves the figure in `format`
+    at `dpi`, e.g. figpath/figure.png or figpath/figure_300dpi.png.
+    Bundles written as archives have no folder, their figures are saved
+    next to the archive, e.g. figpath.png or figpath_300dpi.png.
+    """
+    prefix = figpath if archive is True else figpath + "/figure"
+    return prefix + get_output_suffix(format, dpi)
+
+
+def get_output_suffix(format: str, dpi: Optional[float] = None) -> str:
+    """Returns the end of the paths of the figures saved in `format` at 
+    `dpi`, e.g. .png or _300dpi.png.
+    """
+    if dpi is None:
+        return "." + format
+    return f"_{dpi:g}dpi." + format
+
+
+def get_save_import_code(n_outputs: int, parallel: bool) -> List[str]:
+    """Returns the imports needed by the code from get_save_code().
+    """
+    if parallel is False or n_outputs < 2:
+        return []
+
+    return [
+        "import pickle\n",
+        "import multiprocessing\n",
+        "from concurrent.futures import ProcessPoolExecutor\n",
+    ]
+
+
+def get_save_code(outputs: List[Tuple[str, Optional[float]]], parallel: bool) -> List[str]:
+    """Returns lines of code saving the current figure to each of the
+    (path, dpi) `outputs`, so that the figure is only plotted once.
+
+    If `parallel` is True the outputs are rasterized concurrently, each by
+    a forked process holding a copy of the figure. Where processes can
+    not be forked the outputs are saved one after another.
+    """
+    if len(outputs) == 1:
+        path, dpi = outputs[0]
+        if dpi is None:
+            return [f"plt.savefig(\"{path}\")"]
+        return [f"plt.savefig(\"{path}\", dpi={dpi!r})"]
+
+    outputs_code = ", ".join(f"(\"{path}\", {dpi!r})" for path, dpi in outputs)
+    sequential_code = [
+        "for _path, _dpi in _outputs:\n",
+        "    plt.savefig(_path, dpi=_dpi)\n",
+    ]
+    if parallel is False:
+        return [f"_outputs = [{outputs_code}]\n"] + sequential_code
+
+    return [
+        "\n",
+        "def _savefig(figure_bytes, path, dpi):\n",
+        "    pickle.loads(figure_bytes).savefig(path, dpi=dpi)\n",
+        "\n",
+        f"_outputs = [{outputs_code}]\n",
+        "if \"fork\" in multiprocessing.get_all_start_methods():\n",
+        "    _figure_bytes = pickle.dumps(plt.gcf())\n",
+        "    _context = multiprocessing.get_context(\"fork\")\n",
+        "    with ProcessPoolExecutor(len(_outputs), mp_context=_context) as _executor:\n",
+        "        _paths, _dpis = zip(*_outputs)\n",
+        "        list(_executor.map(_savefig, [_figure_bytes] * len(_outputs), _paths, _dpis))\n",
+        "else:\n",
+    ] + ["    " + line for line in sequential_code]
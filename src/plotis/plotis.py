@@ -1,108 +1,539 @@
+from __future__ import annotations
+
 # Standard lib imports
-import os
-import inspect
 import re
+import sys
+import time
+import hashlib
 
-# Dependencies imports
-import pandas as pd
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
 
 # Specified imports
 from contextlib import AbstractContextManager
-from typing import Any, List
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
 from types import TracebackType
 
+# Package imports
+from ._version import __version__
+from .archive import get_archive_open_code, get_archive_path, get_member_load_code
+from .context_parser import WithContext, find_with_context, get_header_lines
+from .fingerprint import fingerprint_data
+from .instrumentation import BundleStats, logger, report
+from .line_classes import WITH_PLOTIS_PATTERN, classify_lines, get_indented_lines, get_line_classification
+from .loops import LOOPS, LoopBundle, flush_loops, normalize_params
+from .manifest import is_bundle_up_to_date
+from .outputs import OutputSpec, get_output_path, get_save_code, get_save_import_code, normalize_outputs
+from .reduction import DOWNSAMPLERS, reduce_data
+from .references import get_referenced_columns
+from .registry import REGISTRY
+from .render_cache import RenderCache, get_rc_hash
+from .serializers import NpySerializer, Serializer, SeriesSerializer, get_column_names, get_serializer, get_table_serializer, is_chunked
+from .snapshot import snapshot
+from .source_cache import SOURCE_CACHE, SourceFile
+from .store import ObjectStore
+from .writer import Bundle, BundleData, BundleWriter, flush_all, get_default_writer, write_bundle
+
 class PlotIs(AbstractContextManager):
     """A context manager for isolating, and packaging everything
     needed to independently reproduce plots.
     """
 
-    def __init__(self, figpath: str, data: pd.DataFrame) -> None:
+    # Matches a line with a with statement using PlotIs. Only used when 
+    # the calling file can not be parsed, see __enter__().
+    _with_context_pattern = WITH_PLOTIS_PATTERN
+
+    def __init__(
+        self,
+        figpath: str,
+        data: Union[pd.DataFrame, Iterable[pd.DataFrame], Mapping[str, Any]],
+        serializer: Union[str, Serializer] = "csv",
+        asynchronous: Union[bool, BundleWriter] = False,
+        store: Union[str, ObjectStore, None] = None,
+        incremental: bool = False,
+        max_chunk_bytes: Optional[int] = None,
+        lazy_load: bool = False,
+        outputs: Optional[Iterable[OutputSpec]] = None,
+        parallel_outputs: bool = False,
+        prune_columns: bool = False,
+        downsample: Optional[str] = None,
+        downsample_points: int = 4000,
+        freeze_arrays: bool = False,
+        archive: bool = False,
+        render_cache: Union[str, RenderCache, None] = None,
+        loop: Optional[Mapping[str, Any]] = None,
+        fsync: bool = True
+    ) -> None:
+        """
+        Parameters
+        ----------
+        figpath : str
+            Path to the folder in which to save the data and code.
+        data : pd.DataFrame | Iterable[pd.DataFrame]
+            The data used for plotting in the context. Can also be an 
+            iterable, e.g. a generator, of DataFrame chunks which are 
+            streamed to the data file without ever being concatenated.
+            Several data objects are given as a mapping from the names of 
+            the variables used in the context to DataFrames, Series, NumPy
+            arrays or iterables of DataFrame chunks. DataFrames and Series 
+            are written by the serializer, and arrays, including structured
+            arrays, as .npy files which are memory-mapped when loaded. 
+            pyarrow Tables and Polars DataFrames are also accepted, written 
+            by their own library without converting them to pandas, in the 
+            format of the serializer if it is "csv", "parquet" or "feather" 
+            and as feather otherwise, and loaded back with that library.
+        serializer : str | Serializer
+            Format in which to write the data, one of "csv", "parquet",
+            "feather" and "npz", or a Serializer instance. The binary 
+            formats keep the dtypes and are much faster for large data.
+        asynchronous : bool | BundleWriter
+            If True the bundle is written in the background by a shared
+            BundleWriter when leaving the context, and if a BundleWriter
+            is given that writer is used. Use PlotIs.flush() to wait for
+            the bundles to be written. The bundle holds a snapshot of the
+            data as of leaving the context, which with copy-on-write in 
+            pandas shares the column buffers rather than copying them.
+        store : str | ObjectStore | None
+            If given, the data is written to this content-addressed store, 
+            or a store in this folder, instead of to figpath. Bundles with
+            the same data then share a single data file, referred to from 
+            their run.py and manifest.
+        incremental : bool
+            If True, nothing is written when the bundle in figpath already 
+            holds the same data and code, written with the same serializer 
+            and version of PlotIs. Whether the bundle was written or reused 
+            is given by the attribute bundle_status after the context.
+        max_chunk_bytes : int | None
+            If given, the data is written in row chunks using at most 
+            about this much memory each, rather than all at once. The 
+            parquet and feather serializers write each chunk as a row 
+            group, and the csv serializer appends the chunks. The npz 
+            serializer can not stream, it writes the data at once and 
+            ignores max_chunk_bytes.
+        lazy_load : bool
+            If True, the generated run.py only loads the columns of each 
+            DataFrame which are referred to in the context, memory-mapping
+            the data files when the format allows it. See 
+            get_referenced_columns() for how the columns are detected.
+        outputs : Iterable[str | Tuple[str, float | None]] | None
+            Formats in which run.py saves the figure, given as a format, 
+            e.g. "svg", or a (format, dpi) tuple, e.g. ("png", 300). The 
+            figure is plotted once and saved in all of them. Defaults to 
+            a png at matplotlib's default dpi.
+        parallel_outputs : bool
+            If True, run.py rasterizes the outputs concurrently in forked
+            processes. Worth it for several large raster outputs.
+        prune_columns : bool
+            If True, the columns of each DataFrame which are not referred
+            to in the context are not written. See get_referenced_columns()
+            for how the columns are detected.
+        downsample : str | None
+            If given, the rows of each DataFrame are downsampled before 
+            being written, keeping about downsample_points points of each 
+            numeric column. Either "lttb", keeping the shape of lines, or 
+            "minmax", keeping the minimum and maximum of each bucket of 
+            rows. Only meant for line and scatter plots of data in 
+            plotting order, and data objects plotted against each other 
+            must be columns of the same DataFrame to stay aligned.
+        downsample_points : int
+            Number of points kept by the downsampling, a few times the 
+            pixel width of the figure is visually lossless.
+        freeze_arrays : bool
+            If True, NumPy arrays written in the background are made 
+            read-only until their bundle is written, rather than being 
+            copied. Writing to them in the meantime raises a ValueError.
+        archive : bool
+            If True, the bundle is written as the single file archive 
+            figpath + ".zip" rather than as a folder, holding the code as 
+            __main__.py, the manifest and the data, which is read straight 
+            out of the archive. The figures are saved next to the archive,
+            e.g. to figpath + ".png", when running it with `python`.
+        render_cache : str | RenderCache | None
+            If given, the figure is also saved to the outputs when leaving 
+            the context, copied from this cache of rendered figures, or a 
+            cache in this folder, when the context, data, matplotlib 
+            version and rcParams did not change since it was cached, and
+            rendered otherwise. Figures are added to the cache by 
+            `plotis regenerate --render-cache`, which renders them from
+            run.py. Nothing is saved if the context raised.
+        loop : Mapping[str, Any] | None
+            If given, the context is one iteration of a loop, with these
+            parameters, e.g. the key of a group, which are JSON serialized.
+            All iterations from the same with statement with the same 
+            figpath are written as one bundle when PlotIs is flushed, with
+            one data file holding the DataFrames of all iterations, and a 
+            run.py regenerating any of them, see loops.py.
+        fsync : bool
+            If True, the files of the bundle are synced to disk before it
+            is published to figpath, see writer.py. Disable it for bundles
+            which do not need to survive a power loss.
+        """
         self.figpath = figpath
         self.data = data
+        self.serializer = get_serializer(serializer)
+        self.asynchronous = asynchronous
+        self.store = ObjectStore(store) if isinstance(store, str) else store
+        self.incremental = incremental
+        self.max_chunk_bytes = max_chunk_bytes
+        self.lazy_load = lazy_load
+        self.outputs = normalize_outputs(outputs)
+        self.parallel_outputs = parallel_outputs
+        self.prune_columns = prune_columns
+        self.downsample = downsample
+        self.downsample_points = downsample_points
+        self.freeze_arrays = freeze_arrays
+        self.archive = archive
+        self.render_cache = RenderCache(render_cache) if isinstance(render_cache, str) else render_cache
+        self.rc_hash = None # Hash of the rcParams the figure is rendered with
+        self.loop = normalize_params(loop) if loop is not None else None
+        self.fsync = fsync
+        if self.loop is not None and (
+            self.store is not None 
+            or incremental is True 
+            or archive is True 
+            or asynchronous is not False 
+            or self.render_cache is not None
+        ):
+            raise ValueError("Loops can not be used with a store, a render cache, or in incremental, archive or asynchronous mode")
+        if downsample is not None and downsample not in DOWNSAMPLERS:
+            raise ValueError(f"Unknown downsampling method: {downsample}, use one of {list(DOWNSAMPLERS)}")
+        self.bundle_status = None # Set to "written" or "reused" on exit
+        self.stats = BundleStats(figpath) # Timings and sizes, see instrumentation
+
+        # Data given in chunks can only be read once, when writing it, 
+        # hence it can not be fingerprinted beforehand
+        data_objects = data.values() if isinstance(data, Mapping) else [data]
+        has_chunks = any(is_chunked(data_object) for data_object in data_objects)
+        if has_chunks and (self.store is not None or incremental is True or self.render_cache is not None):
+            raise ValueError("Data given as chunks can not be used with a store, a render cache or in incremental mode")
+        if has_chunks and not self.serializer.streams_chunks:
+            raise ValueError(f"Data given as chunks can not be written by the {self.serializer.name} serializer, use csv, parquet or feather")
 
         # Information about the calling file
         self.calling_filename = "" 
         self.calling_context_line_start = -1  # This is set to calling line + 1
         self.calling_line_end = -1
         self.constructing_line = "" # Line of code conaining the constructor call
+        self.data_source = None # Source code of the data argument, if found
         self.context_source_lines = []
+        self._call_site = None # File name and line number of the with statement
 
     def __enter__(self) -> Any:
-        calling_frame = inspect.stack()[1]
+        self.stats = BundleStats(self.figpath)
+        enter_start = time.perf_counter()
+
+        with self.stats.timer("stack"):
+            calling_filename, calling_lineno = PlotIs._get_calling_frame()
+        self._call_site = (calling_filename, calling_lineno)
+
+        # The iterations of a loop after the first reuse its context
+        if self.loop is not None:
+            loop_bundle = LOOPS.get(self.figpath)
+            if loop_bundle is not None and loop_bundle.call_site == (calling_filename, calling_lineno):
+                self.calling_filename = calling_filename
+                for attribute, value in loop_bundle.context.items():
+                    setattr(self, attribute, value)
+                self.stats.add_time("enter", time.perf_counter() - enter_start)
+                return self
         
-        # Ensuring we have calling code context
-        if calling_frame.code_context is None:
-            raise Exception("Could not find code context")
-        self.constructing_line = calling_frame.code_context[0]
+        with self.stats.timer("source"):
+            # Ensuring we have calling code context
+            source_file = SOURCE_CACHE.get(calling_filename)
+            if calling_lineno > len(source_file.lines):
+                raise Exception("Could not find code context")
+            self.calling_filename = calling_filename
+
+            # Locating the with statement in the parsed source file. If the 
+            # file can not be parsed we fall back on scanning the source lines.
+            with_context = find_with_context(source_file, calling_lineno, type(self).__name__)
+            if with_context is not None:
+                self._enter_with_context(source_file, with_context)
+            else:
+                self._enter_with_scanner(source_file, calling_lineno)
+
+        with self.stats.timer("clean"):
+            # The lines of the context are classified once per file and 
+            # span, and the checks and cleaning below read from it
+            classification = get_line_classification(
+                source_file,
+                self.calling_context_line_start,
+                self.calling_context_line_end
+            )
+
+            # Ensuring that there is not more than one plot in the context
+            # NOTE: this method is very yanky, see _has_multiple_plots().
+            if classification.has_multiple_plots is True:
+                raise Exception("Multiple figures are not supported. You cannot have more than one savefig or show calls in context")
+
+            # Formats and cleans source code and save it in attribute
+            self.context_source_lines = list(classification.cleaned_lines)
+
+            # Ensuring that there are no nested with contexts using PlotIs 
+            if with_context is not None:
+                has_nested_plotis = with_context.has_nested_plotis
+            else:
+                has_nested_plotis = classification.has_nested_plotis
+            if has_nested_plotis is True:
+                raise Exception("PlotIs does not support nested `with` contexts using PlotIs")
+
+        # The rcParams are hashed before the context changes them, as 
+        # when running run.py
+        if self.render_cache is not None:
+            self.rc_hash = get_rc_hash()
+
+        self.stats.add_time("enter", time.perf_counter() - enter_start)
+        return self
+
+    def _enter_with_context(self, source_file: SourceFile, with_context: WithContext) -> None:
+        """Sets up the attributes describing the calling context from the 
+        parsed with statement.
+        """
+        self.constructing_line = "".join(get_header_lines(source_file, with_context))
+        self.data_source = with_context.data_source
+        self.calling_context_line_start = with_context.body_start
+        self.calling_context_line_end = with_context.body_end
+
+    def _enter_with_scanner(self, source_file: SourceFile, calling_lineno: int) -> None:
+        """Sets up the attributes describing the calling context by scanning 
+        the indentation of the source lines following `calling_lineno`.
+        """
+        self.constructing_line = source_file.lines[calling_lineno - 1]
        
         # Ensuring that this function is called 
         # as part of a with statement
-        regex_str = r"(\s{1,}|)with PlotIs[(](\s|\S|){1,}[)] as \S{1,}:[\n]|(\s{1,}|)with PlotIs[(](\s|\S|){1,}[)]:[\n]" 
-        with_context_pattern = re.compile(regex_str)
-        if with_context_pattern.fullmatch(self.constructing_line) is None :
-            raise Exception(f"PlotIs must be called by `with`: {calling_frame.code_context[0]}")
+        if PlotIs._with_context_pattern.fullmatch(self.constructing_line) is None :
+            raise Exception(f"PlotIs must be called by `with`: {self.constructing_line}")
        
         # Parsing calling frame to set up attributes
-        self.calling_filename = calling_frame.filename
-        self.calling_context_line_start = calling_frame.lineno + 1 # Exclude calling line
+        self.calling_context_line_start = calling_lineno + 1 # Exclude calling line
         self.calling_context_line_end = self._get_last_lineno_of_context(
             self.calling_filename,
             self.calling_context_line_start,
             include_calling_line=False
         )
 
-        # Extacting source lines
-        lines = []
-        with open(self.calling_filename, "r") as fp:
-            # Colleting the source lines of our context.
-            # Note that code lines start counting at 1 while 
-            # list index starts at 0.
-            lbnd_inclusive = self.calling_context_line_start - 1 
-            ubnd_exclusive = self.calling_context_line_end
-            lines = fp.readlines()[lbnd_inclusive:ubnd_exclusive]
-
-        # Ensuring that there is not more than one plot in the context
-        # NOTE: this method is very yanky, see _has_multiple_plots().
-        if PlotIs._has_multiple_plots(lines) is True:
-            raise Exception("Multiple figures are not supported. You cannot have more than one savefig or show calls in context")
-
-        # Formats and cleans source code and save it in attribute
-        self.context_source_lines = self._clean_context_source(lines) 
-
-        # Ensuring that there are no nested with contexts using PlotIs 
-        line_match_list = [with_context_pattern.match(line) is not None for line in self.context_source_lines]
-        if True in line_match_list:
-            raise Exception("PlotIs does not support nested `with` contexts using PlotIs")
-
     def __exit__(
         self, 
         __exc_type: type[BaseException] | None, 
         __exc_value: BaseException | None, 
         __traceback: TracebackType | None
     ) -> bool | None:
-        calling_frame = inspect.stack()[1]
-        self.calling_line_end = calling_frame.lineno
-
-        # Creates the folder in which to write the data and code
-        if not os.path.exists(self.figpath):
-            os.makedirs(self.figpath)
-
-        # Writing data to figpath
-        data_file_path = self.figpath + f"/data.csv"
-        print(f"Writing data to: {data_file_path}")
-        with open(data_file_path, "w+") as fp:
-            self.data.to_csv(fp)
-
-        # Writing concatinating data load code with 
-        # context source and writing it to file
-        code_file_path = self.figpath + "/run.py" 
-        print(f"Writing context code to: {code_file_path}")
-        with open(code_file_path, "w+") as fp:
-            code_to_write = self._get_import_code()
-            code_to_write += self._get_data_load_code()
+        exit_start = time.perf_counter()
+        _, self.calling_line_end = PlotIs._get_calling_frame()
+
+        if self.loop is not None:
+            self._exit_loop(exit_start)
+            return
+
+        # The fingerprints are only needed to address the data in the 
+        # store, to compare with the existing bundle, for the registry, 
+        # or to look up the rendered figure
+        bundle_data = self._get_bundle_data(
+            with_fingerprints=(
+                self.store is not None 
+                or self.incremental is True 
+                or REGISTRY.enabled 
+                or self.render_cache is not None
+            )
+        )
+
+        with self.stats.timer("codegen"):
+            # Concatinating data load code with context source
+            code_to_write = self._get_import_code(bundle_data)
+            code_to_write += self._get_data_load_code(bundle_data)
             code_to_write += self.context_source_lines
-            code_to_write += self._get_savefig_code("png")
-            fp.writelines(code_to_write)
+            code_to_write += self._get_savefig_code()
+
+            manifest = self._get_manifest(bundle_data, code_to_write)
+
+        if REGISTRY.enabled:
+            REGISTRY.add(self._get_registry_entry(manifest), self.stats)
+
+        # A context which raised may have left the figure half plotted
+        if self.render_cache is not None and __exc_type is None:
+            with self.stats.timer("render"):
+                self._render_outputs(manifest)
+
+        # Skipping the bundle if it has not changed since it was written
+        if self.incremental is True and is_bundle_up_to_date(self.figpath, manifest, self.archive):
+            logger.info("Reusing unchanged bundle: %s", self.figpath)
+            self.bundle_status = "reused"
+            self.stats.status = "reused"
+            self.stats.add_time("exit", time.perf_counter() - exit_start)
+            report(self.stats)
+            return
+        self.bundle_status = "written"
+
+        bundle = Bundle(
+            self.figpath,
+            bundle_data,
+            code_to_write,
+            manifest,
+            self.store,
+            self.max_chunk_bytes,
+            self.stats,
+            self.archive,
+            self.fsync
+        )
+
+        if self.asynchronous is False:
+            write_bundle(bundle)
+            self.stats.add_time("exit", time.perf_counter() - exit_start)
+            report(self.stats)
+        else:
+            writer = self.asynchronous
+            if not isinstance(writer, BundleWriter):
+                writer = get_default_writer()
+
+            # The data is snapshot so that changes made to it after 
+            # the context do not end up in the bundle
+            unfreezes = []
+            with self.stats.timer("snapshot"):
+                for data_item in bundle_data:
+                    data_item.data, unfreeze = snapshot(data_item.data, self.freeze_arrays)
+                    if unfreeze is not None:
+                        unfreezes.append(unfreeze)
+
+            # The stats are reported by the writer once the bundle is written
+            self.stats.add_time("exit", time.perf_counter() - exit_start)
+            future = writer.submit(bundle)
+            for unfreeze in unfreezes:
+                future.add_done_callback(lambda _, unfreeze=unfreeze: unfreeze())
+
+    def _get_manifest(self, bundle_data: List[BundleData], code: List[str]) -> Dict[str, Any]:
+        """Returns the description of the bundle written to its manifest.
+        """
+        data_manifests = []
+        for data_item in bundle_data:
+            data_manifest = {
+                "name": data_item.name,
+                "member" if self._has_archive_members() else "path": data_item.path,
+                "serializer": data_item.serializer.name,
+            }
+            if data_item.fingerprint is not None:
+                data_manifest["fingerprint"] = data_item.fingerprint
+            if data_item.reduction is not None:
+                data_manifest["reduction"] = data_item.reduction
+            data_manifests.append(data_manifest)
+
+        manifest = {
+            "plotis_version": __version__,
+            "code_hash": hashlib.sha256("".join(code).encode()).hexdigest(),
+            # The context without the paths in the code, see render_cache.py
+            "context_hash": hashlib.sha256("".join(self.context_source_lines).encode()).hexdigest(),
+            "data": data_manifests,
+            "outputs": [self._get_figure_path(format, dpi) for format, dpi in self.outputs],
+            "output_formats": [[format, dpi] for format, dpi in self.outputs],
+        }
+        if self.archive is True:
+            manifest["archive"] = get_archive_path(self.figpath)
+
+        return manifest
+
+    def _exit_loop(self, exit_start: float) -> None:
+        """Adds the data of this iteration of a loop to its loop bundle, 
+        see loops.py. The data is snapshot, as it is written later.
+        """
+        bundle_data = self._get_bundle_data()
+        with self.stats.timer("snapshot"):
+            for data_item in bundle_data:
+                data_item.data, _ = snapshot(data_item.data)
+        self.stats.add_time("exit", time.perf_counter() - exit_start)
+
+        def new_bundle() -> LoopBundle:
+            context = {
+                attribute: getattr(self, attribute) for attribute in [
+                    "constructing_line",
+                    "data_source",
+                    "calling_context_line_start",
+                    "calling_context_line_end",
+                    "context_source_lines",
+                ]
+            }
+            # The context is run in a loop by run.py, hence its blocks 
+            # have to be kept
+            source_lines = get_indented_lines(
+                SOURCE_CACHE.get(self.calling_filename),
+                self.calling_context_line_start,
+                self.calling_context_line_end
+            )
+            return LoopBundle(self.figpath, self._call_site, context, source_lines, self.outputs, self.lazy_load, self.fsync)
+
+        LOOPS.add_iteration(self.figpath, self._call_site, self.loop, bundle_data, self.stats, new_bundle)
+        self.bundle_status = "looped"
+        self.stats.status = "looped"
+
+    def _render_outputs(self, manifest: Dict[str, Any]) -> None:
+        """Saves the current figure to the outputs of the bundle, copying 
+        them from the render cache if they are cached.
+
+        The figure rendered here is not added to the cache, since it may
+        hold state from before the context, e.g. a figure created earlier,
+        which the inputs the cache is keyed by do not describe. Only the 
+        figures rendered by run.py, with `plotis regenerate`, are cached.
+        """
+        if self.render_cache.fetch_outputs(manifest, self.rc_hash):
+            return
+
+        import matplotlib.pyplot as plt
+
+        figure = plt.gcf()
+        for output_path, (_, dpi) in zip(manifest["outputs"], self.outputs):
+            logger.info("Rendering figure to: %s", output_path)
+            if dpi is None:
+                figure.savefig(output_path)
+            else:
+                figure.savefig(output_path, dpi=dpi)
+
+    def _get_registry_entry(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the entry describing the bundle in the registry, on top
+        of its stats.
+        """
+        return {
+            "figpath": self.figpath,
+            "archive": self.archive,
+            "source_file": self.calling_filename,
+            "context_start": self.calling_context_line_start,
+            "context_end": self.calling_context_line_end,
+            "created": time.time(),
+            "plotis_version": manifest["plotis_version"],
+            "code_hash": manifest["code_hash"],
+            # Data which is not fingerprinted, e.g. given in chunks, is recorded as such
+            "data": [{"fingerprint": None, **data_manifest} for data_manifest in manifest["data"]],
+            "outputs": manifest["outputs"],
+        }
+
+    @staticmethod
+    def flush() -> None:
+        """Writes the bundles of loops, then waits until all bundles 
+        written in the background are done. Raises BundleWriteError if 
+        any of them failed.
+        """
+        flush_loops()
+        flush_all()
+
+    @staticmethod
+    def wait_all() -> None:
+        """Alias of PlotIs.flush().
+        """
+        PlotIs.flush()
+
+    @staticmethod
+    def _get_calling_frame(depth: int = 2) -> Tuple[str, int]:
+        """Returns the file name and current line number of the frame 
+        `depth` levels up the stack from this function, i.e. by default 
+        the caller of the method calling this function.
+
+        Only the frame itself is looked up, as opposed to inspect.stack()
+        which builds frame info, including source lines, for every frame 
+        on the stack. This keeps the cost independent of the stack depth.
+        """
+        frame = sys._getframe(depth)
+        try:
+            return frame.f_code.co_filename, frame.f_lineno
+        finally:
+            # Breaking the reference cycle created by holding a frame
+            del frame
 
     def _get_last_lineno_of_context(
         self,
@@ -113,11 +544,7 @@ class PlotIs(AbstractContextManager):
         """Returns the last line number of the calling context specified in 
         `calling_frame`.
         """
-        with open(calling_filename, "r") as fp:
-            lines = fp.readlines()
-
-        # Initiates the returning variable as the base case 
-        last_lineno_context = len(lines)
+        source_file = SOURCE_CACHE.get(calling_filename)
 
         # Specifies the line to start analysing our context from.
         # The number is dependent on if we want to include the calling 
@@ -130,37 +557,10 @@ class PlotIs(AbstractContextManager):
         else:
             starting_line_no = calling_line_no + 1
 
-        # Iterate over each line of code in starting at calling frame 
-        # (or one line after it) until indentation becomes less than 
-        # the initial one, i.e. stepping out of the context.
-        context_indent_base = None
-        for lineno in range(starting_line_no, len(lines)+1):
-            line = lines[lineno-1]
-            current_indent = self._get_indentation(line)
-
-            # For the first iteration we save the number 
-            # of indentation defining the calling context 
-            if lineno == starting_line_no:
-                context_indent_base = current_indent
-                continue
-
-            # The first time at which the number of 
-            # indentations are less than the context base 
-            # defines beginning of the next context.
-            #
-            # Note: that we do not consider a new line. If we do not do this 
-            # code in same context but separated by new line will be 
-            # incorrecly excluded.
-            any_white_space = re.compile(r"\s")
-            if current_indent < context_indent_base and not any_white_space.fullmatch(line):
-                # When current indent is less than base indent 
-                # for the first time we are at first line in next
-                # context. Therefore we subtract one to get last 
-                # line in context we are analysing 
-                last_lineno_context = lineno - 1
-                break
-
-        return last_lineno_context
+        # The context ends at the line before the first non-empty line 
+        # with less indentation than the starting line. The source cache
+        # has precomputed this for every line of the file.
+        return source_file.get_last_lineno_of_context(starting_line_no)
 
     @staticmethod
     def _get_indentation(line: str) -> int:
@@ -180,22 +580,91 @@ class PlotIs(AbstractContextManager):
         return leading_spaces
 
 
-    def _get_data_load_code(self) -> List[str]:
-        """Returns the strings of code needed to load the data, which is saved in 
-        data.csv, into a variable of the same name as was supplied to the data argument
-        in the PlotIs constructor.
+    def _get_bundle_data(self, with_fingerprints: bool = False) -> List[BundleData]:
+        """Returns the data objects to write, each with the name of the 
+        variable to load it into, its serializer and the path of its file.
+
+        Parameters
+        ----------
+        with_fingerprints : bool
+            If True the data is fingerprinted, which is needed to write 
+            it to a store.
 
         Returns
         -------
-        List[str]
-            List of strings. Each entry is one line of pyhton code.
+        List[BundleData]
+            One entry for each data object given to the constructor.
+        """
+        # A mapping of data is loaded into variables named by its keys, 
+        # otherwise into the variable given as data argument
+        is_mapping = isinstance(self.data, Mapping)
+        if is_mapping:
+            named_data = list(self.data.items())
+        else:
+            named_data = [(self._get_data_variable_name(), self.data)]
+
+        bundle_data = []
+        for name, data in named_data:
+            if not isinstance(name, str) or not name.isidentifier():
+                raise ValueError(f"Data names must be valid variable names, got: {name}")
+
+            # Reducing the data before it is fingerprinted, so that the 
+            # fingerprint describes what is written
+            with self.stats.timer("reduce"):
+                data, reduction = reduce_data(
+                    data,
+                    name,
+                    self.context_source_lines,
+                    self.prune_columns,
+                    self.downsample,
+                    self.downsample_points
+                )
+
+            serializer = self._get_serializer_for(data)
+            # Data given in chunks is only read when it is written
+            fingerprint = None
+            if with_fingerprints is True and not is_chunked(data):
+                with self.stats.timer("fingerprint"):
+                    fingerprint = fingerprint_data(data)
+            path = self._get_data_file_path(
+                fingerprint, 
+                serializer, 
+                name if is_mapping else None
+            )
+            bundle_data.append(BundleData(name, data, serializer, path, fingerprint, reduction))
+
+        return bundle_data
+
+    def _get_serializer_for(self, data: Any) -> Serializer:
+        """Returns the serializer used to write `data`. DataFrames and data 
+        given in chunks are written by the serializer given to the constructor, 
+        Series as single column DataFrames, and NumPy arrays as .npy files.
+        Arrow tables and Polars DataFrames are written by their own library.
+        """
+        table_serializer = get_table_serializer(data, self.serializer)
+        if table_serializer is not None:
+            return table_serializer
+        if isinstance(data, np.ndarray):
+            return NpySerializer(allow_pickle=data.dtype.hasobject)
+        if isinstance(data, pd.Series):
+            return SeriesSerializer(self.serializer, data.name)
+        return self.serializer
+
+    def _get_data_variable_name(self) -> str:
+        """Returns the name of the variable supplied to the data argument
+        in the PlotIs constructor.
         """
         # Checking if the contructor call is using PlotIs(data=xxx, xxx)
         # or PlotIs(some_file_path, some_pd_df)
         variable_name = ""
         regex_str = r"data=[\S\s]+"
         data_pattern_match = re.search(regex_str, self.constructing_line)
-        if data_pattern_match is not None:
+        if self.data_source is not None:
+            # The data argument was found when parsing the calling file
+            variable_name = self.data_source.strip()
+            if not variable_name.isidentifier():
+                raise ValueError(f"The data argument must be a variable name, got: {variable_name}")
+        elif data_pattern_match is not None:
             # Extracts the name of the variable storing the data
             variable_name = self.constructing_line.split("data=")[1].strip()
             variable_name = variable_name.replace(")", "").replace(":", "")
@@ -210,30 +679,110 @@ class PlotIs(AbstractContextManager):
         if variable_name == "":
             raise ValueError("Something went wrong. Could not parse varable name containing data")
 
-        # Constructing line of code to load data from data.csv into variable 
-        data_file_path = self.figpath + f"/data.csv"
-        data_load_code = [
-            f"{variable_name} = pd.read_csv(\"{data_file_path}\")\n\n"
-        ]
+        return variable_name
+
+    def _get_data_load_code(self, bundle_data: Optional[List[BundleData]] = None) -> List[str]:
+        """Returns the strings of code needed to load the data, which is saved in 
+        the data files, into variables of the same names as was supplied to the 
+        data argument in the PlotIs constructor.
+
+        Parameters
+        ----------
+        bundle_data : List[BundleData] | None
+            The data objects to load, as given by _get_bundle_data(). 
+            Defaults to the data written to figpath.
+
+        Returns
+        -------
+        List[str]
+            List of strings. Each entry is one line of pyhton code.
+        """
+        if bundle_data is None:
+            bundle_data = self._get_bundle_data()
+
+        # Constructing lines of code to load data from the data files into variables 
+        data_load_code = []
+        if self._has_archive_members():
+            data_load_code += get_archive_open_code(get_archive_path(self.figpath))
+        for data_item in bundle_data:
+            # Only the columns used in the context are loaded lazily
+            columns = None
+            column_names = get_column_names(data_item.data) if self.lazy_load is True else None
+            if column_names is not None:
+                columns = get_referenced_columns(
+                    self.context_source_lines, 
+                    data_item.name, 
+                    column_names
+                )
+
+            if self._has_archive_members():
+                data_load_code += get_member_load_code(data_item.serializer, data_item.name, data_item.path, columns)
+            else:
+                data_load_code += data_item.serializer.get_load_code(data_item.name, data_item.path, columns)
 
         return data_load_code
 
-    def _get_savefig_code(self, format: str) -> List[str]:
+    def _has_archive_members(self) -> bool:
+        """Returns True if the data is written to the bundle archive, i.e.
+        when writing an archive without a store.
+        """
+        return self.archive is True and self.store is None
+
+    def _get_data_file_path(
+        self, 
+        fingerprint: Optional[str] = None, 
+        serializer: Optional[Serializer] = None,
+        name: Optional[str] = None
+    ) -> str:
+        """Returns the path to the file to which data is written by `serializer`,
+        which defaults to the serializer given to the constructor. When using 
+        a store this is the stored file with fingerprint `fingerprint`. 
+        Otherwise it is the data file in figpath, named by `name` when 
+        several data objects are written.
+        """
+        if serializer is None:
+            serializer = self.serializer
+
+        if self.store is not None and fingerprint is not None:
+            return self.store.get_object_path(fingerprint, serializer)
+        if self._has_archive_members():
+            # Name of the member of the archive
+            return ("data_" + name if name is not None else "data") + serializer.extension
+        if name is not None:
+            return self.figpath + "/data_" + name + serializer.extension
+        return self.figpath + "/data" + serializer.extension
+
+    def _get_savefig_code(self) -> List[str]:
         """Returns lines of code needed to save 
-        the most recently created figure.
+        the most recently created figure in all outputs.
+        """
+        save_paths = [(self._get_figure_path(format, dpi), dpi) for format, dpi in self.outputs]
+        return get_save_code(save_paths, self.parallel_outputs)
+
+    def _get_figure_path(self, format: str, dpi: Optional[float] = None) -> str:
+        """Returns the path to which run.py saves the figure in `format`.
         """
-        save_path = self.figpath + "/figure." + format
-        return [f"plt.savefig(\"{save_path}\")"]
+        return get_output_path(self.figpath, format, dpi, self.archive)
 
-    def _get_import_code(self) -> List[str]:
-        """Returns lines of code with neccessary imports.
+    def _get_import_code(self, bundle_data: Optional[List[BundleData]] = None) -> List[str]:
+        """Returns lines of code with neccessary imports, including the
+        imports needed to load each of the data objects in `bundle_data`.
         """
         code = [
             "import pandas as pd\n",
             "import matplotlib.pyplot as plt\n",
-            "\n"
         ]
 
+        serializers = [self.serializer]
+        if bundle_data is not None:
+            serializers = [data_item.serializer for data_item in bundle_data]
+        for serializer in serializers:
+            code += [line for line in serializer.get_import_code() if line not in code]
+        if self._has_archive_members():
+            code.append("import zipfile\n")
+        code += get_save_import_code(len(self.outputs), self.parallel_outputs)
+        code.append("\n")
+
         return code
 
     def _clean_context_source(self, code: List[str]) -> List[str]:
@@ -251,30 +800,9 @@ class PlotIs(AbstractContextManager):
             Input list where each string element has been formated and 
             cleaned.
         """
-        # Removing indentation
-        code = [line.lstrip() for line in code]
-
-        # Translating empty lines to blank rows
-        for ix, line in enumerate(code):
-            if len(line) == 0:
-                code[ix] = "\n"
-
-        # Ensuring that last element in each code line is a line break
-        for ix, line in enumerate(code):
-            if line[len(line)-1] != "\n":
-                line = line + "\n"
-                code[ix] = line
-
-        # Removing any lines containing savefig 
-        code = [line for line in code if ".savefig" not in line]
-
-        # Removing any lines containing plt.show()
-        code = [line for line in code if "plt.show(" not in line]
-
-        # Removes all in line comments
-        code = [line for line in code if line[0] != "#"]
-
-        return code
+        # Removes indentation, ensures a line break at the end of each 
+        # line, and removes savefig and plt.show() calls and comments
+        return classify_lines(code).cleaned_lines
 
     @staticmethod
     def _has_multiple_plots(code: List[str]) -> bool:
@@ -294,11 +822,5 @@ class PlotIs(AbstractContextManager):
             False if there are more than one savefig() and or 
             plt.show() call in `code`, otherwise it returns True.
         """
-        n_show = 0
-        n_savefig = 0
-        for line in code:
-            n_show += 1 if ".show()" in line else 0
-            n_savefig += 1 if "savefig(" in line else 0
-
-        return n_show > 1 or n_savefig > 1
+        return classify_lines(code).has_multiple_plots
 
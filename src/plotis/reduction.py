@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
+
+# Specified imports
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Package imports
+from .references import get_referenced_columns
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_points: int) -> np.ndarray:
+    """Returns the indices of the `n_points` points of (x, y) selected by
+    the Largest-Triangle-Three-Buckets algorithm, which keeps the visual
+    shape of a line. The first and last points are always kept.
+    """
+    n_rows = len(y)
+    if n_points >= n_rows or n_points < 3:
+        return np.arange(n_rows)
+
+    # The points between the first and the last are split
+    # into n_points - 2 buckets of at least one point each
+    edges = np.linspace(1, n_rows - 1, n_points - 1).astype(np.int64)
+    edges = np.append(edges, n_rows)
+
+    selected = np.empty(n_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n_rows - 1
+    previous = 0
+    for bucket in range(n_points - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+
+        # The point forming the largest triangle with the previously
+        # selected point and the average of the next bucket is selected
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + np.argmax(np.nan_to_num(areas, nan=-1.0))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_points: int) -> np.ndarray:
+    """Returns the indices of the minimum and maximum of y in each of
+    n_points // 2 buckets of consecutive points, which keeps the envelope
+    of a line. The first and last points are always kept.
+    """
+    n_rows = len(y)
+    n_buckets = n_points // 2
+    if n_points >= n_rows or n_buckets < 1:
+        return np.arange(n_rows)
+
+    edges = np.linspace(0, n_rows, n_buckets + 1).astype(np.int64)
+    y_min = np.where(np.isnan(y), np.inf, y)
+    y_max = np.where(np.isnan(y), -np.inf, y)
+
+    selected = [0, n_rows - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        selected.append(start + np.argmin(y_min[start:end]))
+        selected.append(start + np.argmax(y_max[start:end]))
+
+    return np.unique(selected)
+
+
+# Downsampling methods by name
+DOWNSAMPLERS: Dict[str, Callable[[np.ndarray, np.ndarray, int], np.ndarray]] = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+}
+
+
+def _get_x_values(data: pd.DataFrame) -> np.ndarray:
+    """Returns the x values used to downsample `data`, its index if it is
+    sorted numbers or dates, otherwise the row positions.
+    """
+    index = data.index
+    if index.is_monotonic_increasing:
+        if pd.api.types.is_datetime64_any_dtype(index):
+            return pd.DatetimeIndex(index).asi8.astype(np.float64)
+        if pd.api.types.is_numeric_dtype(index) and not pd.api.types.is_bool_dtype(index):
+            return index.to_numpy(dtype=np.float64)
+
+    return np.arange(len(data), dtype=np.float64)
+
+
+def downsample_rows(data: pd.DataFrame, method: str, n_points: int) -> pd.DataFrame:
+    """Returns the rows of `data` selected by downsampling each of its
+    numeric columns to about `n_points` points with `method`.
+
+    The rows are kept whole, so that columns plotted against each other
+    stay aligned, which means that up to `n_points` rows can be kept for
+    each numeric column. The rows are assumed to be in plotting order.
+    """
+    downsampler = DOWNSAMPLERS[method]
+    numeric_columns = [
+        column for column in data.columns
+        if pd.api.types.is_numeric_dtype(data[column]) and not pd.api.types.is_bool_dtype(data[column])
+    ]
+    if len(data) <= n_points or len(numeric_columns) == 0:
+        return data
+
+    x = _get_x_values(data)
+    selected = [
+        downsampler(x, data[column].to_numpy(dtype=np.float64, na_value=np.nan), n_points)
+        for column in numeric_columns
+    ]
+
+    return data.iloc[np.unique(np.concatenate(selected))]
+
+
+def reduce_data(
+    data: Any,
+    name: str,
+    code: List[str],
+    prune_columns: bool = False,
+    downsample: Optional[str] = None,
+    downsample_points: int = 4000
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Reduces the size of the DataFrame `data` before it is written.
+
+    Parameters
+    ----------
+    data : Any
+        The data object, only DataFrames are reduced.
+    name : str
+        Name of the variable holding the data in `code`.
+    code : List[str]
+        Lines of code using the data.
+    prune_columns : bool
+        If True, the columns not referred to in `code` are dropped, see
+        get_referenced_columns().
+    downsample : str | None
+        If given, the rows are downsampled with this method, "lttb" or
+        "minmax", see downsample_rows().
+    downsample_points : int
+        Number of points each numeric column is downsampled to.
+
+    Returns
+    -------
+    Tuple[Any, Dict[str, Any] | None]
+        The reduced data, and a description of what was reduced, or None
+        if nothing was.
+    """
+    if not isinstance(data, pd.DataFrame):
+        return data, None
+
+    reduction = {}
+    if prune_columns is True:
+        columns = get_referenced_columns(code, name, list(data.columns))
+        if columns is not None and len(columns) < len(data.columns):
+            reduction["dropped_columns"] = [column for column in data.columns if column not in columns]
+            data = data[columns]
+
+    if downsample is not None and len(data) > downsample_points:
+        n_rows = len(data)
+        data = downsample_rows(data, downsample, downsample_points)
+        if len(data) < n_rows:
+            reduction["downsample"] = {
+                "method": downsample,
+                "points": downsample_points,
+                "rows_before": n_rows,
+                "rows_after": len(data),
+            }
+
+    if len(reduction) == 0:
+        return data, None
+
+    return data, reduction
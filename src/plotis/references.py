@@ -0,0 +1,118 @@
+# Standard lib imports
+import io
+import ast
+import tokenize
+
+# Specified imports
+from typing import Any, List, Optional
+
+
+def get_referenced_columns(code: List[str], variable_name: str, columns: List[Any]) -> Optional[List[str]]:
+    """Returns the columns of the DataFrame in `variable_name` which are
+    referred to in `code`.
+
+    A column is referred to if its name appears as a string literal,
+    e.g. df["x"] or plt.title("x"), or as an attribute, e.g. df.x. Since
+    this is a heuristic the DataFrame must only be used through indexing
+    with string literals or lists of them, its column attributes or its
+    index. If it is used in any other way, e.g. passed as an argument to
+    a function, indexed with a variable or a column name built at runtime,
+    e.g. df[ycol] or df[f"y{i}"], or through any other attribute or 
+    method, e.g. df.plot(x="x") or df.iloc[:, 1], all columns are 
+    assumed to be used.
+
+    Parameters
+    ----------
+    code : List[str]
+        Lines of code using the DataFrame.
+    variable_name : str
+        Name of the variable holding the DataFrame.
+    columns : List[Any]
+        Columns of the DataFrame, only string column names can be detected.
+
+    Returns
+    -------
+    List[str] | None
+        The referenced columns in the order of `columns`, or None if all
+        columns may be used.
+    """
+    column_names = set(column for column in columns if isinstance(column, str))
+    if len(column_names) < len(columns):
+        return None
+
+    try:
+        tokens = [
+            token for token in tokenize.generate_tokens(io.StringIO("".join(code)).readline)
+            if token.type not in (tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT)
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return None
+
+    referenced = set()
+    for ix, token in enumerate(tokens):
+        if token.type == tokenize.STRING:
+            try:
+                value = ast.literal_eval(token.string)
+            except (ValueError, SyntaxError):
+                continue
+            if value in column_names:
+                referenced.add(value)
+            continue
+
+        if token.type != tokenize.NAME or token.string != variable_name:
+            continue
+
+        # Attributes of other objects with the same name are not the variable
+        if ix > 0 and tokens[ix - 1].string == ".":
+            continue
+
+        next_token = tokens[ix + 1] if ix + 1 < len(tokens) else None
+        if next_token is not None and next_token.string == "[":
+            if not _is_literal_subscript(tokens, ix + 1):
+                # e.g. df[ycol] or df[f"y{i}"], which may be any column
+                return None
+            continue
+        if next_token is not None and next_token.string == "=":
+            continue
+        if next_token is not None and next_token.string == ".":
+            attribute = tokens[ix + 2].string if ix + 2 < len(tokens) else ""
+            if attribute in column_names:
+                referenced.add(attribute)
+                continue
+            # The index is loaded whichever columns are
+            if attribute == "index":
+                continue
+            # Methods and other attributes may use any column
+            return None
+
+        # The DataFrame is used as a whole
+        return None
+
+    if len(referenced) == 0:
+        return None
+
+    return [column for column in columns if column in referenced]
+
+
+def _is_literal_subscript(tokens: List[tokenize.TokenInfo], start: int) -> bool:
+    """Returns True if the subscript opened by the "[" token at `start`
+    only holds string literals, or lists of them, e.g. ["x"] or [["x", "y"]].
+    """
+    depth = 0
+    for token in tokens[start:]:
+        if token.string == "[":
+            depth += 1
+        elif token.string == "]":
+            depth -= 1
+            if depth == 0:
+                return True
+        elif token.type == tokenize.STRING:
+            try:
+                if not isinstance(ast.literal_eval(token.string), str):
+                    return False
+            except (ValueError, SyntaxError):
+                return False
+        elif token.string != ",":
+            return False
+
+    return False
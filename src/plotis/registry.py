@@ -0,0 +1,202 @@
+"""Process wide registry of the bundles written by PlotIs.
+
+When enabled, every `with PlotIs` block adds an entry to the registry
+describing its bundle, and loops one entry per loop bundle when it is 
+written: figpath, calling file and lines of the context, data files and
+fingerprints, outputs, and the sizes and timings of writing it. The entries are written to an index file at once, when
+flushed or when the process exits, so that tooling can query the
+bundles without crawling the file system.
+
+    enable_registry("figures/index.jsonl")
+
+The index is a JSON Lines file, one entry per line, or a SQLite database
+for paths ending with .sqlite or .db. Entries are appended to an existing
+index, which can be read back with read_index().
+"""
+
+# Standard lib imports
+import json
+import atexit
+import sqlite3
+import threading
+
+# Specified imports
+from typing import Any, Dict, List, Optional, Tuple
+
+# Package imports
+from .instrumentation import BundleStats, logger
+from .loops import flush_loops
+from .writer import BundleWriteError, flush_all
+
+SQLITE_EXTENSIONS = (".sqlite", ".db")
+
+# Columns of the bundles table of SQLite indexes, the others are stored as JSON
+_SQLITE_COLUMNS = [
+    "figpath", "archive", "source_file", "context_start", "context_end", "status",
+    "created", "plotis_version", "code_hash", "bytes_written", "n_rows",
+]
+_SQLITE_JSON_COLUMNS = ["data", "outputs", "timings"]
+
+
+class BundleRegistry:
+    """Entries of the bundles written in the process, see the module
+    docstring.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.index_path: Optional[str] = None
+        self._entries: List[Tuple[Dict[str, Any], BundleStats]] = []
+        self._lock = threading.Lock()
+
+    def enable(self, index_path: Optional[str] = None) -> None:
+        """Starts registering bundles, which are written to `index_path`
+        when flushed. Without an index path the entries are only kept in
+        memory, see get_entries().
+        """
+        self.enabled = True
+        self.index_path = index_path
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add(self, entry: Dict[str, Any], stats: BundleStats) -> None:
+        """Adds the `entry` of a bundle. The sizes and timings are taken
+        from `stats` when the entries are read, since bundles written in
+        the background are not done yet.
+        """
+        with self._lock:
+            self._entries.append((entry, stats))
+
+    def get_entries(self) -> List[Dict[str, Any]]:
+        """Returns the entries not yet flushed, with their stats.
+        """
+        with self._lock:
+            entries = list(self._entries)
+
+        return [_with_stats(entry, stats) for entry, stats in entries]
+
+    def flush(self, index_path: Optional[str] = None) -> int:
+        """Writes the loop bundles and waits for the bundles written in the
+        background, then appends the entries to the index `index_path`, defaulting to the one given
+        when enabling the registry, and removes them from the registry.
+        Returns the number of entries written.
+        """
+        index_path = index_path if index_path is not None else self.index_path
+        if index_path is None:
+            raise ValueError("No index path to flush the registry to")
+
+        flush_loops()
+        try:
+            flush_all()
+        except BundleWriteError as e:
+            # The failed bundles are recorded with their status
+            logger.error("%s", e)
+
+        with self._lock:
+            entries, self._entries = self._entries, []
+        records = [_with_stats(entry, stats) for entry, stats in entries]
+        if len(records) == 0:
+            return 0
+
+        if index_path.endswith(SQLITE_EXTENSIONS):
+            _write_sqlite(index_path, records)
+        else:
+            _write_json_lines(index_path, records)
+        logger.info("Wrote %d bundle(s) to the index: %s", len(records), index_path)
+
+        return len(records)
+
+
+def _with_stats(entry: Dict[str, Any], stats: BundleStats) -> Dict[str, Any]:
+    return {
+        **entry,
+        "status": stats.status,
+        "bytes_written": stats.bytes_written,
+        "n_rows": stats.n_rows,
+        "timings": dict(stats.timings),
+    }
+
+
+def _write_json_lines(index_path: str, records: List[Dict[str, Any]]) -> None:
+    # A single write, so that entries appended by concurrent processes
+    # do not end up interleaved
+    text = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+    with open(index_path, "a") as fp:
+        fp.write(text)
+
+
+def _write_sqlite(index_path: str, records: List[Dict[str, Any]]) -> None:
+    columns = _SQLITE_COLUMNS + _SQLITE_JSON_COLUMNS
+    rows = [
+        [record.get(column) for column in _SQLITE_COLUMNS]
+        + [json.dumps(record.get(column), separators=(",", ":")) for column in _SQLITE_JSON_COLUMNS]
+        for record in records
+    ]
+
+    connection = sqlite3.connect(index_path, timeout=30)
+    try:
+        with connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS bundles ({', '.join(columns)})")
+            connection.execute("CREATE INDEX IF NOT EXISTS bundles_figpath ON bundles (figpath)")
+            connection.executemany(
+                f"INSERT INTO bundles ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                rows
+            )
+    finally:
+        connection.close()
+
+
+def read_index(index_path: str) -> List[Dict[str, Any]]:
+    """Returns the entries of the index `index_path`, in the order they
+    were written.
+    """
+    if not index_path.endswith(SQLITE_EXTENSIONS):
+        with open(index_path, "r") as fp:
+            return [json.loads(line) for line in fp if line.strip() != ""]
+
+    connection = sqlite3.connect(index_path)
+    try:
+        cursor = connection.execute("SELECT * FROM bundles ORDER BY rowid")
+        names = [description[0] for description in cursor.description]
+        records = []
+        for row in cursor:
+            record = dict(zip(names, row))
+            for column in _SQLITE_JSON_COLUMNS:
+                record[column] = json.loads(record[column])
+            record["archive"] = bool(record["archive"])
+            records.append(record)
+    finally:
+        connection.close()
+
+    return records
+
+
+REGISTRY = BundleRegistry()
+
+
+def enable_registry(index_path: Optional[str] = None) -> None:
+    """Starts registering the bundles written in the process, see
+    BundleRegistry.enable().
+    """
+    REGISTRY.enable(index_path)
+
+
+def disable_registry() -> None:
+    REGISTRY.disable()
+
+
+def flush_registry(index_path: Optional[str] = None) -> int:
+    """Writes the registered bundles to the index, see BundleRegistry.flush().
+    """
+    return REGISTRY.flush(index_path)
+
+
+@atexit.register
+def _flush_registry_at_exit() -> None:
+    if REGISTRY.index_path is None:
+        return
+    try:
+        REGISTRY.flush()
+    except Exception as e:
+        logger.error("Failed to write the bundle index: %s", e)
@@ -0,0 +1,271 @@
+"""Cache of rendered figures.
+
+Rendering, i.e. saving the figure, is usually the most expensive part of
+reproducing it. The cache keeps the rendered outputs of bundles, each
+named by a hash of everything the image depends on: the source of the
+context, the fingerprints and serializers of its data, the version of
+matplotlib, its rcParams and the format and dpi of the output. When none
+of them changed the cached image is copied rather than rendered again,
+both by the `with PlotIs` block and by `plotis regenerate`. Only the 
+images rendered by running run.py, i.e. by `plotis regenerate`, are added
+to the cache, since the live figure of a `with PlotIs` block may depend on
+more than these inputs.
+
+The cache is a folder shared between bundles and processes. Its total size
+is bounded, the least recently used images being removed first, which is
+tracked by the modification times of the cached files. Listing the cache is
+costly, so each RenderCache scans it once and then keeps a running estimate
+of its size, only evicting when the estimate exceeds the bound. Figures
+added by other processes are only counted at the next eviction, hence the
+bound may be exceeded by what the other processes added in the meantime.
+"""
+
+# Standard lib imports
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import zipfile
+
+# Specified imports
+from typing import Any, Dict, List, Optional, Tuple
+
+# Package imports
+from .instrumentation import logger
+
+# Default bound of the total size of the cache
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Fraction of max_bytes down to which the cache is evicted when full,
+# so that the cache is not scanned again after every added figure
+EVICTION_TARGET = 0.9
+
+# rcParams which do not affect saved figures
+_IGNORED_RC_PARAMS = {"backend", "backend_fallback", "interactive", "toolbar", "savefig.directory"}
+
+
+def get_rc_hash() -> str:
+    """Returns a hash of the current rcParams of matplotlib.
+    """
+    import matplotlib
+
+    # Read as a plain dict, since reading the backend through
+    # rcParams resolves it, importing pyplot
+    items = sorted(
+        (key, repr(value)) for key, value in dict.items(matplotlib.rcParams)
+        if key not in _IGNORED_RC_PARAMS and not key.startswith("webagg.")
+    )
+    return hashlib.sha256(repr(items).encode()).hexdigest()
+
+
+def get_render_keys(manifest: Dict[str, Any], rc_hash: str) -> Optional[List[str]]:
+    """Returns the key of each output of the bundle described by `manifest`,
+    rendered with the rcParams hashed as `rc_hash`. Returns None if the
+    bundle can not be cached, i.e. if its manifest has no context hash
+    or some of its data is not fingerprinted.
+    """
+    import matplotlib
+
+    if "context_hash" not in manifest or "output_formats" not in manifest:
+        return None
+    if any(data_manifest.get("fingerprint") is None for data_manifest in manifest["data"]):
+        return None
+
+    inputs = {
+        "context_hash": manifest["context_hash"],
+        "data": [
+            [data_manifest["name"], data_manifest["serializer"], data_manifest["fingerprint"]]
+            for data_manifest in manifest["data"]
+        ],
+        "matplotlib": matplotlib.__version__,
+        "rc_hash": rc_hash,
+    }
+    keys = []
+    for format, dpi in manifest["output_formats"]:
+        inputs["output"] = [format, dpi]
+        keys.append(hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest())
+
+    return keys
+
+
+def with_file_fingerprints(manifest: Dict[str, Any], archive_path: Optional[str] = None) -> Dict[str, Any]:
+    """Returns a copy of `manifest` in which the data which was not 
+    fingerprinted when writing the bundle is fingerprinted by the contents 
+    of its file, or of its member of the archive `archive_path`. Returns 
+    `manifest` as it is if there is no such file.
+    """
+    data_manifests = []
+    for data_manifest in manifest.get("data", []):
+        if data_manifest.get("fingerprint") is None:
+            try:
+                if "path" in data_manifest:
+                    with open(data_manifest["path"], "rb") as fp:
+                        fingerprint = _hash_file(fp)
+                else:
+                    with zipfile.ZipFile(archive_path) as archive, archive.open(data_manifest["member"]) as fp:
+                        fingerprint = _hash_file(fp)
+            except (OSError, KeyError, TypeError, ValueError, zipfile.BadZipFile):
+                return manifest
+            # Distinct from the fingerprints of the data itself
+            data_manifest = {**data_manifest, "fingerprint": "file:" + fingerprint}
+        data_manifests.append(data_manifest)
+
+    return {**manifest, "data": data_manifests}
+
+
+def _hash_file(fp: Any) -> str:
+    hasher = hashlib.blake2b(digest_size=20)
+    for block in iter(lambda: fp.read(1 << 20), b""):
+        hasher.update(block)
+    return hasher.hexdigest()
+
+
+class RenderCache:
+    """Folder of rendered figures, see the module docstring.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        Parameters
+        ----------
+        root : str
+            Path to the folder holding the rendered figures.
+        max_bytes : int
+            Bound of the total size of the cached figures.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        # Estimated total size of the cached figures, scanned on first use
+        self._n_bytes: Optional[int] = None
+
+    def get_path(self, key: str, output_path: str) -> str:
+        """Returns the path of the cached figure with key `key`, with the
+        extension of `output_path`.
+        """
+        extension = os.path.splitext(output_path)[1]
+        return self.root + "/" + key[:2] + "/" + key + extension
+
+    def fetch(self, key: str, output_path: str) -> bool:
+        """Copies the cached figure with key `key` to `output_path`.
+        Returns False if it is not cached.
+        """
+        cached_path = self.get_path(key, output_path)
+        try:
+            shutil.copyfile(cached_path, output_path)
+            # Marks the figure as recently used
+            os.utime(cached_path)
+        except FileNotFoundError:
+            # Not cached, or evicted in the meantime
+            return False
+
+        return True
+
+    def put(self, key: str, output_path: str) -> None:
+        """Adds the figure rendered to `output_path` to the cache with key
+        `key`. Use evict() to bound the size of the cache afterwards.
+        """
+        cached_path = self.get_path(key, output_path)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+
+        # Copied to a temporary file first, so that concurrent processes
+        # never fetch a partly written figure
+        tmp_path = cached_path + f".{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(output_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def fetch_outputs(self, manifest: Dict[str, Any], rc_hash: str) -> bool:
+        """Copies the cached figures of all outputs of the bundle described
+        by `manifest` to their paths, see get_render_keys(). Returns False
+        if any of them is not cached, in which case the bundle has to be
+        rendered.
+        """
+        keys = get_render_keys(manifest, rc_hash)
+        if keys is None:
+            return False
+
+        for key, output_path in zip(keys, manifest["outputs"]):
+            output_dir = os.path.dirname(output_path)
+            if output_dir != "":
+                os.makedirs(output_dir, exist_ok=True)
+            if not self.fetch(key, output_path):
+                return False
+
+        logger.info("Reusing cached figures: %s", ", ".join(manifest["outputs"]))
+        return True
+
+    def put_outputs(self, manifest: Dict[str, Any], rc_hash: str) -> None:
+        """Adds the rendered outputs of the bundle described by `manifest`
+        to the cache, then evicts the least recently used figures if the
+        estimated size of the cache exceeds max_bytes.
+        """
+        keys = get_render_keys(manifest, rc_hash)
+        if keys is None:
+            return
+
+        if self._n_bytes is None:
+            self._n_bytes = self.get_size()
+        for key, output_path in zip(keys, manifest["outputs"]):
+            self.put(key, output_path)
+            # Overestimated when replacing a cached figure, 
+            # which is corrected by the next eviction
+            self._n_bytes += os.path.getsize(output_path)
+
+        if self._n_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """Removes the least recently used figures until the total size of
+        the cache is at most `target_bytes`, defaulting to max_bytes. 
+        Returns the number of removed figures.
+        """
+        if target_bytes is None:
+            target_bytes = self.max_bytes
+
+        entries = self._get_entries()
+        total_bytes = sum(size for _, _, size in entries)
+        n_removed = 0
+        for _, path, size in sorted(entries):
+            if total_bytes <= target_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+            total_bytes -= size
+            n_removed += 1
+
+        self._n_bytes = total_bytes
+        return n_removed
+
+    def get_size(self) -> int:
+        """Returns the total size of the cached figures in bytes.
+        """
+        return sum(size for _, _, size in self._get_entries())
+
+    def _get_entries(self) -> List[Tuple[float, str, int]]:
+        """Returns the (modification time, path, size) of the cached figures.
+        """
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+
+        for subdir in os.scandir(self.root):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+
+        return entries
+
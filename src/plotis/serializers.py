@@ -0,0 +1,678 @@
+from __future__ import annotations
+
+# Standard lib imports
+import os
+import sys
+import json
+import importlib
+
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
+
+# Specified imports
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+
+class Serializer:
+    """Base class for the formats in which PlotIs can write the data of
+    a figure.
+
+    A serializer knows how to write a DataFrame to a file and which lines
+    of code are needed in the generated run.py to load it back.
+    """
+
+    name = ""
+    extension = ""
+    # Whether write_chunks() writes one chunk at a time, rather than
+    # concatenating them
+    streams_chunks = False
+
+    # Modules that has to be importable to be able to use the serializer
+    required_modules: List[str] = []
+
+    def __init__(self) -> None:
+        for module_name in self.required_modules:
+            try:
+                importlib.import_module(module_name)
+            except ImportError as e:
+                raise ImportError(
+                    f"The {self.name} serializer requires `{module_name}` to be installed"
+                ) from e
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        """Writes `data` to the file `path`.
+        """
+        raise NotImplementedError
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], path: str) -> None:
+        """Writes the rows of the consecutive DataFrames in `chunks` to the 
+        file `path`, as if they were one DataFrame.
+
+        Serializers supporting streaming write one chunk at a time, keeping 
+        at most one chunk in memory. This default implementation 
+        concatenates the chunks and writes them with write().
+        """
+        chunk_list = list(chunks)
+        data = pd.concat(chunk_list) if len(chunk_list) > 0 else pd.DataFrame()
+        self.write(data, path)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        """Returns the lines of code needed to load the data stored
+        in `path` into a variable named `variable_name`.
+
+        Parameters
+        ----------
+        variable_name : str
+            Name of the variable to load the data into.
+        path : str
+            Path to the file written by `write()`.
+        columns : List[str] | None
+            If given, only these columns are loaded, and the file is 
+            memory-mapped when the format allows it. The index is 
+            kept by all formats but csv.
+
+        Returns
+        -------
+        List[str]
+            List of strings. Each entry is one line of pyhton code.
+        """
+        raise NotImplementedError
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        """Returns the lines of code needed to load the data from a binary 
+        file object, e.g. a member of an archive, rather than from a path.
+
+        Parameters
+        ----------
+        variable_name : str
+            Name of the variable to load the data into.
+        source : str
+            Code of the expression giving the file object, which must be
+            seekable, holding what `write()` wrote.
+        columns : List[str] | None
+            If given, only these columns are loaded.
+
+        Returns
+        -------
+        List[str]
+            List of strings. Each entry is one line of pyhton code.
+        """
+        raise NotImplementedError
+
+    def get_import_code(self) -> List[str]:
+        """Returns lines of code with imports needed by the load code,
+        on top of pandas and matplotlib.
+        """
+        return []
+
+
+class CsvSerializer(Serializer):
+    """Writes data as comma separated values. This is the most portable
+    format, but it is slow for large data and does not keep dtypes.
+    """
+
+    name = "csv"
+    extension = ".csv"
+    streams_chunks = True
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        with open(path, "w+") as fp:
+            data.to_csv(fp)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], path: str) -> None:
+        with open(path, "w+") as fp:
+            for ix, chunk in enumerate(chunks):
+                # Only the first chunk gets a header
+                chunk.to_csv(fp, header=(ix == 0))
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            return [f"{variable_name} = pd.read_csv(\"{path}\", usecols={json.dumps(columns)}, memory_map=True)\n\n"]
+        return [f"{variable_name} = pd.read_csv(\"{path}\")\n\n"]
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            return [f"{variable_name} = pd.read_csv({source}, usecols={json.dumps(columns)})\n\n"]
+        return [f"{variable_name} = pd.read_csv({source})\n\n"]
+
+
+class ParquetSerializer(Serializer):
+    """Writes data as a Parquet file using pyarrow. Dtypes and index are
+    kept through the pandas metadata stored in the file.
+    """
+
+    name = "parquet"
+    extension = ".parquet"
+    streams_chunks = True
+    required_modules = ["pyarrow"]
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        data.to_parquet(path, engine="pyarrow", index=True)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], path: str) -> None:
+        # Each chunk is written as a separate row group
+        import pyarrow as pa
+        from pyarrow import parquet
+
+        writer = None
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=True)
+                    writer = parquet.ParquetWriter(path, table.schema)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=True)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            self.write(pd.DataFrame(), path)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            # The index columns are added by pyarrow from the pandas metadata
+            return [f"{variable_name} = pd.read_parquet(\"{path}\", columns={json.dumps(columns)}, memory_map=True)\n\n"]
+        return [f"{variable_name} = pd.read_parquet(\"{path}\")\n\n"]
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            return [f"{variable_name} = pd.read_parquet({source}, columns={json.dumps(columns)})\n\n"]
+        return [f"{variable_name} = pd.read_parquet({source})\n\n"]
+
+
+class FeatherSerializer(Serializer):
+    """Writes data as a Feather (Arrow IPC) file. Dtypes and index are
+    kept through the pandas metadata stored in the file.
+    """
+
+    name = "feather"
+    extension = ".feather"
+    streams_chunks = True
+    required_modules = ["pyarrow"]
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        # DataFrame.to_feather() only accepts a default index, hence
+        # we go through pyarrow directly to keep the index as well.
+        import pyarrow as pa
+        from pyarrow import feather
+
+        table = pa.Table.from_pandas(data, preserve_index=True)
+        feather.write_feather(table, path)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame], path: str) -> None:
+        # Feather files are Arrow IPC files, each chunk is written as 
+        # a separate record batch.
+        import pyarrow as pa
+
+        compression = "lz4" if pa.Codec.is_available("lz4") else None
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = None
+        schema = None
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=True)
+                    schema = table.schema
+                    writer = pa.ipc.new_file(path, schema, options=options)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=True)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            self.write(pd.DataFrame(), path)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            # The index columns are only read if selected, their names 
+            # are read from the schema stored in the file footer.
+            return [
+                f"with pa.memory_map(\"{path}\") as _source:\n",
+                "    _index_columns = pa.ipc.open_file(_source).schema.pandas_metadata[\"index_columns\"]\n",
+                f"{variable_name} = feather.read_table(\n",
+                f"    \"{path}\",\n",
+                f"    columns={json.dumps(columns)} + [col for col in _index_columns if isinstance(col, str)],\n",
+                "    memory_map=True\n",
+                ").to_pandas()\n\n",
+            ]
+        return [f"{variable_name} = pd.read_feather(\"{path}\")\n\n"]
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        if columns is not None:
+            return [
+                f"_index_columns = pa.ipc.open_file({source}).schema.pandas_metadata[\"index_columns\"]\n",
+                f"{source}.seek(0)\n",
+                f"{variable_name} = feather.read_table(\n",
+                f"    {source},\n",
+                f"    columns={json.dumps(columns)} + [col for col in _index_columns if isinstance(col, str)]\n",
+                ").to_pandas()\n\n",
+            ]
+        return [f"{variable_name} = feather.read_table({source}).to_pandas()\n\n"]
+
+    def get_import_code(self) -> List[str]:
+        return ["import pyarrow as pa\n", "from pyarrow import feather\n"]
+
+
+class NpzSerializer(Serializer):
+    """Writes data as a compressed NumPy archive with one array per column
+    and per index level. Dtypes are restored by the load code from the 
+    dtype objects pickled in the archive, which keep e.g. the categories
+    and their order, and the index from its levels and names.
+    """
+
+    name = "npz"
+    extension = ".npz"
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        # Columns are loaded by name, as with parquet and feather
+        if not data.columns.is_unique:
+            raise ValueError("The npz serializer can not write DataFrames with duplicate column names")
+
+        index_levels = [data.index.get_level_values(level) for level in range(data.index.nlevels)]
+        arrays = {
+            "columns": np.asarray(data.columns.to_numpy()),
+            "dtypes": _to_object_array(list(data.dtypes)),
+            "index_names": _to_object_array(list(data.index.names)),
+            "index_dtypes": _to_object_array([level.dtype for level in index_levels]),
+        }
+        for level, values in enumerate(index_levels):
+            arrays[f"index_{level}"] = values.to_numpy()
+        for ix in range(data.shape[1]):
+            arrays[f"column_{ix}"] = data.iloc[:, ix].to_numpy()
+
+        # np.savez_compressed appends .npz to paths not ending with it,
+        # writing through a file object keeps the path as is.
+        with open(path, "wb+") as fp:
+            np.savez_compressed(fp, **arrays)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        return self.get_stream_load_code(variable_name, f"\"{path}\"", columns)
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        # The members of the archive are only decompressed when accessed,
+        # i.e. only the selected columns are read.
+        selected = ""
+        if columns is not None:
+            selected = f" if col in {json.dumps(columns)}"
+        return [
+            f"with np.load({source}, allow_pickle=True) as _npz:\n",
+            "    _columns = _npz[\"columns\"].tolist()\n",
+            "    _dtypes = _npz[\"dtypes\"].tolist()\n",
+            "    _levels = [\n",
+            "        pd.Index(_npz[f\"index_{level}\"], name=name).astype(dtype)\n",
+            "        for level, (name, dtype) in enumerate(zip(_npz[\"index_names\"].tolist(), _npz[\"index_dtypes\"].tolist()))\n",
+            "    ]\n",
+            f"    {variable_name} = pd.DataFrame(\n",
+            f"        {{col: _npz[f\"column_{{ix}}\"] for ix, col in enumerate(_columns){selected}}},\n",
+            "        index=_levels[0] if len(_levels) == 1 else pd.MultiIndex.from_arrays(_levels)\n",
+            f"    ).astype({{col: dtype for col, dtype in zip(_columns, _dtypes){selected}}})\n\n",
+        ]
+
+    def get_import_code(self) -> List[str]:
+        return ["import numpy as np\n"]
+
+
+def _to_object_array(items: List[Any]) -> np.ndarray:
+    """Returns a 1D object array of `items`, which are not unpacked even if
+    they are sequences, e.g. the tuple names of MultiIndex levels.
+    """
+    array = np.empty(len(items), dtype=object)
+    for ix, item in enumerate(items):
+        array[ix] = item
+    return array
+
+
+class NpySerializer(Serializer):
+    """Writes a NumPy array as a .npy file. The load code memory-maps the
+    file (copy-on-write) unless the array holds python objects.
+
+    Used for NumPy arrays given as data, it can not write DataFrames.
+    """
+
+    name = "npy"
+    extension = ".npy"
+
+    def __init__(self, allow_pickle: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        allow_pickle : bool
+            Must be True to write arrays holding python objects, which
+            are pickled and therefore can not be memory-mapped.
+        """
+        super().__init__()
+        self.allow_pickle = allow_pickle
+
+    def write(self, data: np.ndarray, path: str) -> None:
+        with open(path, "wb+") as fp:
+            np.save(fp, data, allow_pickle=self.allow_pickle)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        if self.allow_pickle is True:
+            return [f"{variable_name} = np.load(\"{path}\", allow_pickle=True)\n\n"]
+        return [f"{variable_name} = np.load(\"{path}\", mmap_mode=\"c\")\n\n"]
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        # File objects can not be memory-mapped
+        return [f"{variable_name} = np.load({source}, allow_pickle={self.allow_pickle})\n\n"]
+
+    def get_import_code(self) -> List[str]:
+        return ["import numpy as np\n"]
+
+
+def get_series_column(series_name: Any) -> str:
+    """Returns the column to which a Series named `series_name` is written,
+    which has to be a string for most formats.
+    """
+    return series_name if isinstance(series_name, str) else "values"
+
+
+class SeriesSerializer(Serializer):
+    """Writes a Series as a single column DataFrame using another serializer.
+    """
+
+    def __init__(self, serializer: Serializer, series_name: Any) -> None:
+        """
+        Parameters
+        ----------
+        serializer : Serializer
+            Serializer used to write the Series as a DataFrame.
+        series_name : Any
+            Name of the Series to write.
+        """
+        self.serializer = serializer
+        self.series_name = series_name
+        self.name = serializer.name
+        self.extension = serializer.extension
+        self.streams_chunks = serializer.streams_chunks
+
+        self.column = get_series_column(series_name)
+
+    def write(self, data: pd.Series, path: str) -> None:
+        self.serializer.write(data.to_frame(name=self.column), path)
+
+    def write_chunks(self, chunks: Iterable[pd.Series], path: str) -> None:
+        self.serializer.write_chunks((chunk.to_frame(name=self.column) for chunk in chunks), path)
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        return self._select_series(variable_name, self.serializer.get_load_code(variable_name, path))
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        return self._select_series(variable_name, self.serializer.get_stream_load_code(variable_name, source))
+
+    def _select_series(self, variable_name: str, code: List[str]) -> List[str]:
+        """Appends the code selecting the Series from the loaded DataFrame 
+        to the load `code`.
+        """
+        code[-1] = code[-1].rstrip("\n") + "\n"
+
+        select_code = f"{variable_name} = {variable_name}[{json.dumps(self.column)}]"
+        if self.series_name is None:
+            select_code += ".rename(None)"
+        code.append(select_code + "\n\n")
+
+        return code
+
+    def get_import_code(self) -> List[str]:
+        return self.serializer.get_import_code()
+
+
+class NativeTableSerializer(Serializer):
+    """Base class of the serializers writing tables of other libraries than
+    pandas straight from their own buffers, without converting them, in
+    the format of the serializer given to PlotIs. The generated code loads
+    them back with the same library.
+    """
+
+    # Function loading each format and its argument selecting columns, 
+    # formatted with the JSON list of the columns
+    readers: Dict[str, Tuple[str, str]] = {}
+
+    def __init__(self, format: str = "feather") -> None:
+        """
+        Parameters
+        ----------
+        format : str
+            Format in which to write the tables, one of TABLE_FORMATS.
+        """
+        super().__init__()
+        self.format = format
+        self.name = format
+        self.extension = TABLE_FORMATS[format]
+
+    def get_load_code(self, variable_name: str, path: str, columns: Optional[List[str]] = None) -> List[str]:
+        return self.get_stream_load_code(variable_name, f"\"{path}\"", columns)
+
+    def get_stream_load_code(self, variable_name: str, source: str, columns: Optional[List[str]] = None) -> List[str]:
+        function, columns_argument = self.readers[self.format]
+        arguments = source
+        if columns is not None:
+            arguments += ", " + columns_argument.format(json.dumps(columns))
+        return [f"{variable_name} = {function}({arguments})\n\n"]
+
+
+class ArrowTableSerializer(NativeTableSerializer):
+    """Writes a pyarrow Table with pyarrow, loaded back as a Table.
+    """
+
+    required_modules = ["pyarrow"]
+    readers = {
+        "csv": ("pa_csv.read_csv", "convert_options=pa_csv.ConvertOptions(include_columns={})"),
+        "parquet": ("pq.read_table", "columns={}"),
+        "feather": ("feather.read_table", "columns={}"),
+    }
+
+    def write(self, data: Any, path: str) -> None:
+        if self.format == "csv":
+            from pyarrow import csv
+            csv.write_csv(data, path)
+        elif self.format == "parquet":
+            from pyarrow import parquet
+            parquet.write_table(data, path)
+        else:
+            from pyarrow import feather
+            feather.write_feather(data, path)
+
+    def get_import_code(self) -> List[str]:
+        if self.format == "csv":
+            return ["import pyarrow.csv as pa_csv\n"]
+        if self.format == "parquet":
+            return ["import pyarrow.parquet as pq\n"]
+        return ["from pyarrow import feather\n"]
+
+
+class PolarsSerializer(NativeTableSerializer):
+    """Writes a Polars DataFrame with Polars, loaded back as a Polars 
+    DataFrame. The feather format is written as an Arrow IPC file.
+    """
+
+    required_modules = ["polars"]
+    readers = {
+        "csv": ("pl.read_csv", "columns={}"),
+        "parquet": ("pl.read_parquet", "columns={}"),
+        "feather": ("pl.read_ipc", "columns={}"),
+    }
+
+    def write(self, data: Any, path: str) -> None:
+        if self.format == "csv":
+            data.write_csv(path)
+        elif self.format == "parquet":
+            data.write_parquet(path)
+        else:
+            data.write_ipc(path)
+
+    def get_import_code(self) -> List[str]:
+        return ["import polars as pl\n"]
+
+
+# Extensions of the formats in which Arrow tables and Polars DataFrames
+# are written, named as the serializers writing DataFrames in them
+TABLE_FORMATS = {
+    CsvSerializer.name: CsvSerializer.extension,
+    ParquetSerializer.name: ParquetSerializer.extension,
+    FeatherSerializer.name: FeatherSerializer.extension,
+}
+
+
+def get_table_serializer(data: Any, serializer: Serializer) -> Optional[Serializer]:
+    """Returns the serializer writing `data` natively if it is an Arrow 
+    table or a Polars DataFrame, otherwise None. The format is the one of 
+    `serializer` if it is one of TABLE_FORMATS, and feather otherwise.
+    """
+    format = serializer.name if serializer.name in TABLE_FORMATS else FeatherSerializer.name
+    if is_arrow_table(data):
+        return ArrowTableSerializer(format)
+    if is_polars_frame(data):
+        return PolarsSerializer(format)
+    return None
+
+
+def is_arrow_table(data: Any) -> bool:
+    # An Arrow table can only exist if pyarrow is imported, which is
+    # hence never imported here
+    pa = sys.modules.get("pyarrow")
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def is_polars_frame(data: Any) -> bool:
+    pl = sys.modules.get("polars")
+    return pl is not None and isinstance(data, pl.DataFrame)
+
+
+def is_chunked(data: Any) -> bool:
+    """Returns True if `data` is an iterable of chunks rather than a 
+    DataFrame, Series, NumPy array, Arrow table or Polars DataFrame.
+    """
+    return not (
+        isinstance(data, (pd.DataFrame, pd.Series, np.ndarray)) 
+        or is_arrow_table(data) 
+        or is_polars_frame(data)
+    )
+
+
+def get_column_names(data: Any) -> Optional[List[Any]]:
+    """Returns the column names of a pandas, Arrow or Polars table, 
+    otherwise None.
+    """
+    if isinstance(data, pd.DataFrame):
+        return list(data.columns)
+    if is_arrow_table(data):
+        return list(data.column_names)
+    if is_polars_frame(data):
+        return list(data.columns)
+    return None
+
+
+def iter_row_chunks(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    max_chunk_bytes: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """Returns an iterator over row chunks of `data`.
+
+    Parameters
+    ----------
+    data : pd.DataFrame | pd.Series | Iterable[pd.DataFrame]
+        Either a DataFrame or Series, or an iterable of chunks which 
+        are passed on as they are.
+    max_chunk_bytes : int | None
+        Approximate maximum memory used by each chunk of a DataFrame, 
+        estimated from the memory used by its rows. If None the 
+        DataFrame is given as a single chunk.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        The chunks of `data`.
+    """
+    if not isinstance(data, (pd.DataFrame, pd.Series)):
+        yield from data
+        return
+
+    if max_chunk_bytes is None or len(data) == 0:
+        yield data
+        return
+
+    # Estimated from the buffers of the columns, the memory
+    # used by python objects in object columns is not included
+    bytes_per_row = max(1, int(np.sum(data.memory_usage(index=True))) // len(data))
+    rows_per_chunk = max(1, max_chunk_bytes // bytes_per_row)
+    for start in range(0, len(data), rows_per_chunk):
+        yield data.iloc[start:start + rows_per_chunk]
+
+
+def write_data(
+    serializer: Serializer,
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    path: str,
+    max_chunk_bytes: Optional[int] = None
+) -> None:
+    """Writes `data` to `path` using `serializer`, streaming it in row 
+    chunks if `data` is an iterable of chunks or `max_chunk_bytes` 
+    is given, see iter_row_chunks(). NumPy arrays, Arrow tables and 
+    Polars DataFrames are always written at once, as is all data by
+    serializers which do not stream chunks, e.g. npz, which would 
+    otherwise concatenate the chunks into a copy of the data.
+    """
+    if not is_chunked(data) and (
+        max_chunk_bytes is None 
+        or not serializer.streams_chunks 
+        or not isinstance(data, (pd.DataFrame, pd.Series))
+    ):
+        serializer.write(data, path)
+    else:
+        serializer.write_chunks(iter_row_chunks(data, max_chunk_bytes), path)
+
+
+def sync_path(path: str) -> None:
+    """Flushes the file or folder `path` to disk.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_folder(path: str) -> None:
+    """Flushes the entries of the folder `path`, e.g. a file renamed into
+    it, to disk. Folders can not be opened on Windows, which does not need it.
+    """
+    if os.name == "posix":
+        sync_path(path)
+
+
+SERIALIZERS: Dict[str, Type[Serializer]] = {
+    CsvSerializer.name: CsvSerializer,
+    ParquetSerializer.name: ParquetSerializer,
+    FeatherSerializer.name: FeatherSerializer,
+    NpzSerializer.name: NpzSerializer,
+}
+
+
+def get_serializer(serializer: Union[str, Serializer]) -> Serializer:
+    """Returns the serializer instance specified by `serializer`.
+
+    Parameters
+    ----------
+    serializer : str | Serializer
+        Either the name of one of the serializers in `SERIALIZERS`
+        or a serializer instance, which is returned as is.
+
+    Returns
+    -------
+    Serializer
+        Serializer to use for writing the data.
+    """
+    if isinstance(serializer, Serializer):
+        return serializer
+
+    if serializer not in SERIALIZERS:
+        raise ValueError(
+            f"Unknown serializer `{serializer}`, expected one of: {', '.join(SERIALIZERS)}"
+        )
+
+    return SERIALIZERS[serializer]()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+# Dependencies imports, imported on first use
+from ._lazy import np, pd
+
+# Specified imports
+from typing import Any, Callable, Optional, Tuple
+
+# Package imports
+from .serializers import is_polars_frame
+
+
+def is_copy_on_write_enabled() -> bool:
+    """Returns True if pandas uses copy-on-write, which is always the case
+    from pandas 3.0, and optional from pandas 2.0.
+    """
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        return pd.get_option("mode.copy_on_write") is True
+    except KeyError:
+        # Older pandas without copy-on-write
+        return False
+
+
+def freeze_array(array: np.ndarray) -> Optional[Callable[[], None]]:
+    """Makes `array` read-only, so that it can not change while it is
+    being written. Returns a function making it writeable again, or None
+    if the array can not be frozen, i.e. if it does not own its memory,
+    which could then be changed through another array, or is already
+    read-only.
+    """
+    if array.base is not None or not array.flags.writeable:
+        return None
+
+    array.flags.writeable = False
+
+    def unfreeze() -> None:
+        array.flags.writeable = True
+
+    return unfreeze
+
+
+def snapshot(data: Any, freeze_arrays: bool = False) -> Tuple[Any, Optional[Callable[[], None]]]:
+    """Returns a snapshot of `data` as it is now, which later changes to
+    `data` do not affect.
+
+    With copy-on-write, DataFrames and Series are snapshot by a shallow
+    copy sharing the column buffers of `data`, which are only copied if
+    either of them is changed later. Without it, they are copied.
+    NumPy arrays are copied, unless `freeze_arrays` is True in which case
+    they are made read-only and used as they are, see freeze_array().
+    Polars DataFrames are cloned, which shares their buffers. Any other 
+    data, e.g. immutable Arrow tables or iterables of chunks, is returned 
+    as it is.
+
+    Parameters
+    ----------
+    data : Any
+        The data to snapshot.
+    freeze_arrays : bool
+        If True, NumPy arrays are frozen rather than copied.
+
+    Returns
+    -------
+    Tuple[Any, Callable | None]
+        The snapshot, and for frozen arrays a function to call once
+        the snapshot is no longer used, making the array writeable again.
+    """
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return data.copy(deep=not is_copy_on_write_enabled()), None
+
+    if isinstance(data, np.ndarray):
+        unfreeze = freeze_array(data) if freeze_arrays is True else None
+        if unfreeze is not None:
+            return data, unfreeze
+        return data.copy(), None
+
+    if is_polars_frame(data):
+        return data.clone(), None
+
+    return data, None
@@ -0,0 +1,195 @@
+# Standard lib imports
+import os
+import bisect
+import threading
+
+# Specified imports
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Package imports
+from .interactive import get_history_lines, get_linecache_lines
+
+
+class SourceFile:
+    """The lines of a source file together with the line classifications
+    needed to find the extent of code contexts.
+    """
+
+    def __init__(self, filename: str, lines: List[str], mtime: int = 0, size: int = 0) -> None:
+        self.filename = filename
+        self.lines = lines
+        self.mtime = mtime
+        self.size = size
+
+        # Number of leading whitespace characters of each line, as
+        # given by PlotIs._get_indentation()
+        self.indentation = [len(line) - len(line.lstrip()) for line in lines]
+
+        # Lines consisting of a single whitespace character, i.e. empty lines
+        self.blank = [len(line) == 1 and line.isspace() for line in lines]
+
+        # Results derived from the lines, e.g. the parsed syntax tree,
+        # which are cached and invalidated together with the file
+        self.derived: Dict[str, Any] = {}
+
+        self._context_ends: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    def get_last_lineno_of_context(self, starting_line_no: int) -> int:
+        """Returns the last line number of the context whose indentation
+        is defined by line `starting_line_no`, i.e. the line before the
+        first following non-empty line with less indentation. Returns
+        the number of lines if the context extends to the end of the file.
+        """
+        if starting_line_no < 1 or starting_line_no > len(self.lines):
+            return len(self.lines)
+
+        with self._lock:
+            if self._context_ends is None:
+                self._context_ends = self._compute_context_ends()
+
+        return self._context_ends[starting_line_no - 1]
+
+    def _compute_context_ends(self) -> List[int]:
+        """Computes the last line number of the context starting at each
+        line in a single pass from the end of the file.
+        """
+        n_lines = len(self.lines)
+        context_ends = [n_lines] * n_lines
+
+        # Line indices of non-empty lines following the current line,
+        # each with a strictly smaller indentation than the one before.
+        # The top of the stack is the closest one.
+        stack: List[int] = []
+        stack_indents: List[int] = []
+        for ix in range(n_lines - 1, -1, -1):
+            indent = self.indentation[ix]
+
+            if self.blank[ix] is True:
+                # Empty lines do not end any contexts and are therefore not
+                # pushed, hence the stack can not be popped either. Instead
+                # the closest line with less indentation is searched for.
+                # Note that the stack indentations are decreasing from the
+                # top, i.e. increasing in list order.
+                pos = bisect.bisect_left(stack_indents, indent)
+                if pos > 0:
+                    context_ends[ix] = stack[pos - 1]
+                continue
+
+            while len(stack) > 0 and stack_indents[-1] >= indent:
+                stack.pop()
+                stack_indents.pop()
+
+            # The line at (zero based) index stack[-1] is the first line
+            # of the next context, i.e. line number stack[-1] is the last
+            # line of this context.
+            if len(stack) > 0:
+                context_ends[ix] = stack[-1]
+
+            stack.append(ix)
+            stack_indents.append(indent)
+
+        return context_ends
+
+
+class SourceCache:
+    """A process-wide cache of source files, similar to linecache but
+    invalidated when the modification time or size of a file changes.
+
+    The cache holds at most `max_bytes` of source, evicting the least
+    recently used files first.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._files: "OrderedDict[str, SourceFile]" = OrderedDict()
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, filename: str) -> SourceFile:
+        """Returns the cached source of `filename`, reading the file if it
+        is not cached or has changed since it was cached.
+
+        Code run interactively, e.g. in notebooks, has pseudo file names
+        which do not exist on disk, its source is taken from memory
+        instead, see interactive.py.
+        """
+        lines = get_linecache_lines(filename)
+        if lines is not None:
+            return self._get_in_memory(filename, lines)
+
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            lines = get_history_lines(filename)
+            if lines is None:
+                raise
+            return self._get_in_memory(filename, lines)
+
+        with self._lock:
+            source_file = self._files.get(filename)
+            if source_file is not None:
+                if source_file.mtime == stat.st_mtime_ns and source_file.size == stat.st_size:
+                    self._files.move_to_end(filename)
+                    return source_file
+                self._remove(filename)
+
+        with open(filename, "r") as fp:
+            lines = fp.readlines()
+        source_file = SourceFile(filename, lines, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            self._add(source_file)
+
+        return source_file
+
+    def _get_in_memory(self, filename: str, lines: List[str]) -> SourceFile:
+        """Returns the cached source of `filename`, whose `lines` are held
+        in memory, adding it to the cache if it is not cached with the
+        same lines. Hence the cell is parsed once however many figures
+        it creates.
+        """
+        with self._lock:
+            source_file = self._files.get(filename)
+            if source_file is not None:
+                if source_file.lines is lines or source_file.lines == lines:
+                    self._files.move_to_end(filename)
+                    return source_file
+                self._remove(filename)
+
+        source_file = SourceFile(filename, lines, 0, sum(len(line) for line in lines))
+        with self._lock:
+            self._add(source_file)
+
+        return source_file
+
+    def clear(self) -> None:
+        """Removes all files from the cache.
+        """
+        with self._lock:
+            self._files.clear()
+            self._n_bytes = 0
+
+    def _add(self, source_file: SourceFile) -> None:
+        if source_file.filename in self._files:
+            self._remove(source_file.filename)
+
+        # Files larger than the cache are not cached at all
+        if source_file.size > self.max_bytes:
+            return
+
+        self._files[source_file.filename] = source_file
+        self._n_bytes += source_file.size
+
+        while self._n_bytes > self.max_bytes:
+            _, evicted = self._files.popitem(last=False)
+            self._n_bytes -= evicted.size
+
+    def _remove(self, filename: str) -> None:
+        source_file = self._files.pop(filename)
+        self._n_bytes -= source_file.size
+
+
+# Cache shared by all PlotIs instances in the process
+SOURCE_CACHE = SourceCache()
@@ -0,0 +1,73 @@
+# Standard lib imports
+import os
+import uuid
+
+# Specified imports
+from typing import Any, Optional
+
+# Package imports
+from .serializers import Serializer, sync_folder, sync_path, write_data
+
+
+class ObjectStore:
+    """A content-addressed store of data files shared between bundles.
+
+    Each data file is named by the fingerprint of its data, see
+    fingerprint_data(), and written only once no matter how many bundles
+    refer to it. Bundles refer to their data file through their manifest.
+    """
+
+    def __init__(self, root: str) -> None:
+        """
+        Parameters
+        ----------
+        root : str
+            Path to the folder holding the data files.
+        """
+        self.root = root
+
+    def get_object_path(self, fingerprint: str, serializer: Serializer) -> str:
+        """Returns the path of the data file with fingerprint `fingerprint`
+        written by `serializer`.
+        """
+        # Files are spread over subfolders to keep folders small
+        return self.root + "/" + fingerprint[:2] + "/" + fingerprint + serializer.extension
+
+    def put(
+        self,
+        data: Any,
+        object_path: str,
+        serializer: Serializer,
+        max_chunk_bytes: Optional[int] = None,
+        fsync: bool = False
+    ) -> bool:
+        """Writes `data` to `object_path` unless it is already stored, 
+        see write_data() for `max_chunk_bytes`.
+
+        The data is written to a temporary file which is then renamed, so 
+        that bundles written concurrently never see a partly written file.
+        If `fsync` is True, the file is synced to disk before being renamed,
+        and its folder afterwards.
+
+        Returns
+        -------
+        bool
+            True if the data was written, False if it was already stored.
+        """
+        if os.path.exists(object_path):
+            return False
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = object_path + f".{uuid.uuid4().hex}.tmp"
+        try:
+            write_data(serializer, data, tmp_path, max_chunk_bytes)
+            if fsync is True:
+                sync_path(tmp_path)
+            os.replace(tmp_path, object_path)
+            if fsync is True:
+                sync_folder(os.path.dirname(object_path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return True
@@ -0,0 +1,703 @@
+"""Writing figure bundles.
+
+A bundle is written to a staging folder next to figpath, its data files
+concurrently with its code and manifest. The files are then synced to disk
+in one batch, and the bundle is published by renaming the staging folder
+to figpath, see publish_staged(). Readers, e.g. `plotis regenerate`, hence
+never see a partly written bundle, even if the process crashes, and any
+number of threads and processes can write bundles under the same folder.
+Bundles can be written in the background by a BundleWriter.
+"""
+
+from __future__ import annotations
+
+# Standard lib imports
+import os
+import sys
+import uuid
+import errno
+import ctypes
+import shutil
+import atexit
+import tempfile
+import threading
+import weakref
+
+# Dependencies imports, imported on first use
+from ._lazy import pd
+
+# Specified imports
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Package imports
+from .archive import get_archive_path, write_archive
+from .instrumentation import BundleStats, logger, report
+from .manifest import MANIFEST_FILENAME, read_manifest, write_manifest
+from .serializers import Serializer, is_chunked, sync_folder, sync_path, write_data
+from .store import ObjectStore
+
+
+class BundleData:
+    """A data object written to a bundle, loaded into the variable `name`
+    in its run.py.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        data: Any,
+        serializer: Serializer,
+        path: str,
+        fingerprint: Optional[str] = None,
+        reduction: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the variable the data is loaded into.
+        data : Any
+            A DataFrame, Series, NumPy array, or an iterable of 
+            DataFrame chunks.
+        serializer : Serializer
+            Serializer used to write the data.
+        path : str
+            Path of the data file.
+        fingerprint : str | None
+            Fingerprint of the data, if computed.
+        reduction : Dict[str, Any] | None
+            Description of how the data was reduced before being
+            written, if it was.
+        """
+        self.name = name
+        self.data = data
+        self.serializer = serializer
+        self.path = path
+        self.fingerprint = fingerprint
+        self.reduction = reduction
+
+
+class Bundle:
+    """Everything written to the folder of a figure.
+    """
+
+    def __init__(
+        self,
+        figpath: str,
+        data: List[BundleData],
+        code: List[str],
+        manifest: Dict[str, Any],
+        store: Optional[ObjectStore] = None,
+        max_chunk_bytes: Optional[int] = None,
+        stats: Optional[BundleStats] = None,
+        archive: bool = False,
+        fsync: bool = True
+    ) -> None:
+        """
+        Parameters
+        ----------
+        figpath : str
+            Path to the folder in which to write the data and code.
+        data : List[BundleData]
+            Data objects to write.
+        code : List[str]
+            Lines of code to write to run.py.
+        manifest : Dict[str, Any]
+            Description of the bundle written to its manifest.
+        store : ObjectStore | None
+            If given, the data files are written to this shared store 
+            instead of to `figpath`, unless they are already stored.
+        max_chunk_bytes : int | None
+            If given, the data is streamed to its file in row chunks 
+            using at most about this much memory each.
+        stats : BundleStats | None
+            Stats to which the timings and sizes of writing the bundle
+            are added, a new one is used if not given.
+        archive : bool
+            If True, the bundle is written as a single archive, see 
+            archive.py, and the paths of the data which is not stored 
+            are the names of their members in the archive.
+        fsync : bool
+            If True, the files are synced to disk before the bundle is
+            published, so that it is complete after a power loss.
+        """
+        self.figpath = figpath
+        self.data = data
+        self.code = code
+        self.manifest = manifest
+        self.store = store
+        self.max_chunk_bytes = max_chunk_bytes
+        self.stats = stats if stats is not None else BundleStats(figpath)
+        self.archive = archive
+        self.fsync = fsync
+
+
+# Suffix of the staging folders and temporary files of bundles being written
+STAGING_SUFFIX = ".tmp"
+
+# Suffix of the folders holding previous bundles replaced by new ones
+PREVIOUS_SUFFIX = ".previous" + STAGING_SUFFIX
+
+
+def get_staging_path(path: str) -> str:
+    """Returns a unique path next to `path` at which to stage it.
+    """
+    return path.rstrip("/") + f".{uuid.uuid4().hex}{STAGING_SUFFIX}"
+
+
+def get_previous_path(figpath: str) -> str:
+    """Returns a unique path next to `figpath` to which to move the bundle
+    it holds while it is replaced, naming the process replacing it.
+    """
+    return figpath.rstrip("/") + f".{os.getpid()}-{uuid.uuid4().hex}{PREVIOUS_SUFFIX}"
+
+
+def publish_staged(stage_dir: str, figpath: str, fsync: bool = False) -> None:
+    """Publishes the bundle written to the folder `stage_dir` to `figpath`
+    by renaming the folder, which replaces all files of the bundle at once.
+
+    If figpath already holds a bundle, both folders are exchanged at once
+    on Linux, see _exchange_folders(). Elsewhere the previous bundle is 
+    first renamed aside, in between figpath does not exist. Readers hence 
+    see either bundle, or none, never a mix of both. The files which are
+    not part of the previous bundle, e.g. its figures, are then moved to 
+    the new folder. If the process dies in between, the previous bundle 
+    is left in a folder next to figpath, which is restored by the next 
+    write to figpath, see _restore_stranded().
+    """
+    _restore_stranded(figpath)
+
+    previous_dirs = []
+    while True:
+        try:
+            os.rename(stage_dir, figpath)
+            break
+        except OSError as e:
+            # figpath exists, possibly published by another writer in the meantime
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+        previous_dir = get_previous_path(figpath)
+        try:
+            if _exchange_folders(stage_dir, figpath):
+                # stage_dir holds the previous bundle
+                os.rename(stage_dir, previous_dir)
+                previous_dirs.append(previous_dir)
+                break
+            os.rename(figpath, previous_dir)
+        except FileNotFoundError:
+            # Renamed aside by another writer
+            continue
+        previous_dirs.append(previous_dir)
+
+    if fsync is True:
+        sync_folder(os.path.dirname(figpath.rstrip("/")) or ".")
+
+    for previous_dir in previous_dirs:
+        _move_other_files(previous_dir, figpath)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+
+
+# renameat2() of the C library, False if it is not available
+_renameat2: Any = None
+
+# Arguments of renameat2(), see `man 2 rename`
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def _exchange_folders(path: str, other_path: str) -> bool:
+    """Exchanges the folders `path` and `other_path` at once, using 
+    renameat2(RENAME_EXCHANGE). Returns False if it is not supported,
+    i.e. on other platforms than Linux, or by the file system.
+    """
+    global _renameat2
+    if _renameat2 is None:
+        _renameat2 = False
+        if sys.platform.startswith("linux"):
+            try:
+                # Available from glibc 2.28
+                _renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+            except (OSError, AttributeError):
+                pass
+    if _renameat2 is False:
+        return False
+
+    result = _renameat2(_AT_FDCWD, os.fsencode(path), _AT_FDCWD, os.fsencode(other_path), _RENAME_EXCHANGE)
+    if result == 0:
+        return True
+
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+        # Not supported by the kernel or the file system
+        return False
+    if error == errno.ENOENT:
+        raise FileNotFoundError(error, os.strerror(error), other_path)
+    raise OSError(error, os.strerror(error), other_path)
+
+
+def _restore_stranded(figpath: str) -> None:
+    """Restores the previous bundles left next to `figpath` by processes
+    which died while replacing them, see publish_staged(). A previous 
+    bundle is renamed back to figpath if figpath does not exist, otherwise 
+    the files which are not part of it, e.g. its figures, are moved to 
+    figpath. Bundles left by running processes are being replaced, and
+    are left to them.
+    """
+    parent_dir, prefix = os.path.split(figpath.rstrip("/"))
+    parent_dir = parent_dir or "."
+    try:
+        names = os.listdir(parent_dir)
+    except FileNotFoundError:
+        return
+
+    for name in sorted(names):
+        if not (name.startswith(prefix + ".") and name.endswith(PREVIOUS_SUFFIX)):
+            continue
+        pid = name[len(prefix) + 1:].split("-", 1)[0]
+        if not pid.isdigit() or _is_running(int(pid)):
+            continue
+
+        previous_dir = parent_dir + "/" + name
+        logger.warning("Restoring the previous bundle of %s from %s", figpath, previous_dir)
+        try:
+            os.rename(previous_dir, figpath)
+            continue
+        except FileNotFoundError:
+            # Restored by another writer
+            continue
+        except OSError as e:
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+        _move_other_files(previous_dir, figpath)
+        shutil.rmtree(previous_dir, ignore_errors=True)
+
+
+def _is_running(pid: int) -> bool:
+    """Returns whether the process `pid` is running. Processes are assumed
+    to be running where it can not be checked, i.e. on Windows.
+    """
+    if pid == os.getpid() or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running as another user
+        return True
+
+    return True
+
+
+def _move_other_files(previous_dir: str, figpath: str) -> None:
+    """Moves the files of the folder `previous_dir` which are not part of
+    the bundle it holds, which are replaced by those of the new bundle, to
+    `figpath`, unless figpath already has them.
+    """
+    bundle_names = {"run.py", MANIFEST_FILENAME}
+    manifest = read_manifest(previous_dir)
+    if manifest is not None:
+        bundle_names.update(
+            os.path.basename(data_manifest["path"]) for data_manifest in manifest.get("data", [])
+            if os.path.dirname(data_manifest.get("path", "")) == figpath.rstrip("/")
+        )
+
+    try:
+        names = os.listdir(previous_dir)
+    except FileNotFoundError:
+        # Restored by another writer, see _restore_stranded()
+        return
+
+    for name in names:
+        if name in bundle_names or os.path.lexists(figpath + "/" + name):
+            continue
+        try:
+            os.rename(previous_dir + "/" + name, figpath + "/" + name)
+        except OSError as e:
+            logger.warning("Failed to keep %s in the bundle %s: %s", name, figpath, e)
+
+
+class _DataWriter(threading.Thread):
+    """Writes one data object of a bundle on a thread of its own, see
+    _write_data_item().
+    """
+
+    def __init__(self, bundle: Bundle, bundle_data: BundleData, path: str) -> None:
+        super().__init__(name="plotis-stage")
+        self.bundle = bundle
+        self.bundle_data = bundle_data
+        self.path = path
+        self.stats: Optional[BundleStats] = None
+        self.error: Optional[BaseException] = None
+        self.is_started = False
+
+    def start(self) -> None:
+        """Starts writing the data on its thread, or writes it on the
+        calling thread if threads can not be started, i.e. while the
+        interpreter shuts down, e.g. for bundles written at exit.
+        """
+        try:
+            super().start()
+            self.is_started = True
+        except RuntimeError:
+            self.run()
+
+    def run(self) -> None:
+        try:
+            self.stats = _write_data_item(self.bundle, self.bundle_data, self.path)
+        except BaseException as e:
+            self.error = e
+
+    def result(self) -> BundleStats:
+        """Waits until the data is written and returns the stats of writing
+        it, or raises the error raised writing it.
+        """
+        if self.is_started is True:
+            self.join()
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+
+def _start_data_writers(bundle: Bundle, paths: List[str]) -> List[_DataWriter]:
+    """Starts writing the data objects of `bundle` to `paths` concurrently.
+    """
+    data_writers = [_DataWriter(bundle, bundle_data, path) for bundle_data, path in zip(bundle.data, paths)]
+    for data_writer in data_writers:
+        data_writer.start()
+    return data_writers
+
+
+def _join_data_writers(stats: BundleStats, data_writers: List[_DataWriter]) -> None:
+    """Waits for all `data_writers`, adding their stats to `stats`, then 
+    raises the first error, if any of them failed.
+    """
+    errors = []
+    for data_writer in data_writers:
+        try:
+            _add_stats(stats, data_writer.result())
+        except BaseException as e:
+            errors.append(e)
+    if len(errors) > 0:
+        raise errors[0]
+
+
+def _count_rows(chunks: Iterable[pd.DataFrame], stats: BundleStats) -> Iterator[pd.DataFrame]:
+    """Passes through `chunks`, adding their rows to `stats`.
+    """
+    for chunk in chunks:
+        stats.n_rows += len(chunk)
+        yield chunk
+
+
+def write_bundle(bundle: Bundle) -> BundleStats:
+    """Writes the data, code and manifest of `bundle` through a staging 
+    folder, see the module docstring. Returns its stats, which are 
+    reported by the caller.
+    """
+    if bundle.archive is True:
+        return _write_archive_bundle(bundle)
+
+    stats = bundle.stats
+    stage_dir = get_staging_path(bundle.figpath)
+    os.makedirs(os.path.dirname(stage_dir) or ".", exist_ok=True)
+    os.mkdir(stage_dir)
+
+    try:
+        # Data written to the shared store is not staged, see ObjectStore.put()
+        if bundle.store is not None:
+            names = []
+            paths = [bundle_data.path for bundle_data in bundle.data]
+        else:
+            names = [_get_data_name(bundle, bundle_data) for bundle_data in bundle.data]
+            paths = [stage_dir + "/" + name for name in names]
+
+        data_writers = _start_data_writers(bundle, paths)
+        try:
+            # Writing the code to file while the data is written
+            with stats.timer("write_code"):
+                logger.info("Writing context code to: %s", bundle.figpath + "/run.py")
+                with open(stage_dir + "/run.py", "w+") as fp:
+                    fp.writelines(bundle.code)
+                write_manifest(stage_dir, bundle.manifest)
+            names += ["run.py", MANIFEST_FILENAME]
+        finally:
+            _join_data_writers(stats, data_writers)
+
+        # Syncing all files at once, after they are all written,
+        # lets the file system commit them together
+        if bundle.fsync is True:
+            with stats.timer("fsync"):
+                for name in names:
+                    sync_path(stage_dir + "/" + name)
+                sync_folder(stage_dir)
+
+        stats.bytes_written += os.path.getsize(stage_dir + "/run.py")
+        with stats.timer("publish"):
+            logger.info("Publishing bundle to: %s", bundle.figpath)
+            publish_staged(stage_dir, bundle.figpath, bundle.fsync)
+    finally:
+        # Only left if the bundle failed to be written
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+    stats.status = "written"
+
+    return stats
+
+
+def _get_data_name(bundle: Bundle, bundle_data: BundleData) -> str:
+    """Returns the name of the file of `bundle_data` in the folder of `bundle`.
+    """
+    if os.path.dirname(bundle_data.path) != bundle.figpath.rstrip("/"):
+        raise ValueError(f"The data of a bundle must be written to its folder or to a store, got: {bundle_data.path}")
+    return os.path.basename(bundle_data.path)
+
+
+def _write_archive_bundle(bundle: Bundle) -> BundleStats:
+    """Writes `bundle` as a single archive, see archive.py. The data is 
+    written to temporary files first, which are then copied to the archive.
+    """
+    stats = bundle.stats
+    archive_path = get_archive_path(bundle.figpath)
+    os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix="plotis-") as tmp_dir:
+        # Data written to the shared store is not a member of the archive
+        members = []
+        if bundle.store is not None:
+            paths = [bundle_data.path for bundle_data in bundle.data]
+        else:
+            members = [(bundle_data.path, tmp_dir + "/" + bundle_data.path) for bundle_data in bundle.data]
+            paths = [path for _, path in members]
+
+        _join_data_writers(stats, _start_data_writers(bundle, paths))
+
+        with stats.timer("write_code"):
+            logger.info("Writing bundle archive to: %s", archive_path)
+            write_archive(archive_path, bundle.code, bundle.manifest, members, bundle.fsync)
+
+    stats.bytes_written += os.path.getsize(archive_path)
+    stats.status = "written"
+
+    return stats
+
+
+def _write_data_item(bundle: Bundle, bundle_data: BundleData, path: str) -> BundleStats:
+    """Writes the data of `bundle_data` to `path`, its path in the shared
+    store of `bundle`, or its staged file or archive member. Returns the 
+    stats of writing it, which the caller adds to those of the bundle, 
+    since the data objects are written concurrently.
+    """
+    stats = BundleStats(bundle.figpath)
+    data = bundle_data.data
+    if not is_chunked(data):
+        stats.n_rows += len(data)
+    else:
+        data = _count_rows(data, stats)
+
+    with stats.timer("serialize"):
+        if bundle.store is not None:
+            is_written = bundle.store.put(
+                data, 
+                path, 
+                bundle_data.serializer, 
+                bundle.max_chunk_bytes,
+                bundle.fsync
+            )
+            if is_written is True:
+                logger.info("Writing data to: %s", path)
+            else:
+                logger.info("Reusing stored data: %s", path)
+        else:
+            logger.info("Writing data to: %s", bundle_data.path)
+            write_data(bundle_data.serializer, data, path, bundle.max_chunk_bytes)
+            is_written = True
+
+    # Members are counted in the size of their archive
+    if is_written is True and (bundle.store is not None or bundle.archive is False):
+        stats.bytes_written += os.path.getsize(path)
+
+    return stats
+
+
+def _add_stats(stats: BundleStats, item_stats: BundleStats) -> None:
+    for phase, seconds in item_stats.timings.items():
+        stats.add_time(phase, seconds)
+    stats.n_rows += item_stats.n_rows
+    stats.bytes_written += item_stats.bytes_written
+
+
+class BundleWriteError(Exception):
+    """Raised at a flush when one or more bundles failed to be written
+    in the background.
+    """
+
+    def __init__(self, errors: List[Tuple[str, BaseException]]) -> None:
+        self.errors = errors
+        msg = "\n".join(f"{figpath}: {e!r}" for figpath, e in errors)
+        super().__init__(f"Failed to write {len(errors)} bundle(s):\n{msg}")
+
+
+class BundleWriter:
+    """Writes figure bundles in the background on a thread or process pool.
+
+    At most `max_pending` bundles can be queued or in progress at the same
+    time, submitting more blocks until one of them is done. Errors are
+    collected and raised by `flush()`, or reported when the interpreter
+    exits if they were never flushed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_pending: int = 8,
+        use_processes: bool = False
+    ) -> None:
+        """
+        Parameters
+        ----------
+        max_workers : int
+            Number of workers writing bundles.
+        max_pending : int
+            Maximum number of bundles queued or being written.
+        use_processes : bool
+            If True a process pool is used instead of a thread pool.
+            The data is then pickled over to the worker processes.
+        """
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+        self._errors: List[Tuple[str, BaseException]] = []
+
+        _writers.add(self)
+
+    def submit(self, bundle: Bundle) -> Future:
+        """Queues a bundle to be written by `write_bundle()`. Blocks while
+        `max_pending` bundles are already queued.
+        """
+        # Back-pressure, waits for a free slot
+        self._slots.acquire()
+        try:
+            future = self._get_executor().submit(write_bundle, bundle)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending.append(future)
+        future.add_done_callback(lambda f: self._on_done(bundle, f))
+
+        return future
+
+    def flush(self) -> None:
+        """Waits until all submitted bundles are written. Raises
+        BundleWriteError if any of them failed since the last flush.
+        """
+        with self._lock:
+            pending = list(self._pending)
+
+        for future in pending:
+            # Exceptions are collected by _on_done()
+            try:
+                future.result()
+            except BaseException:
+                pass
+
+        with self._lock:
+            errors, self._errors = self._errors, []
+
+        if len(errors) > 0:
+            raise BundleWriteError(errors)
+
+    def shutdown(self) -> None:
+        """Flushes and stops the workers.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes is True:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="plotis-writer"
+                )
+        return self._executor
+
+    def _on_done(self, bundle: Bundle, future: Future) -> None:
+        with self._lock:
+            if future in self._pending:
+                self._pending.remove(future)
+            if future.exception() is not None:
+                self._errors.append((bundle.figpath, future.exception()))
+        self._slots.release()
+
+        # The stats are returned by write_bundle(), since with a process 
+        # pool they are not collected in the stats of this process
+        if future.exception() is None:
+            if future.result() is not bundle.stats:
+                bundle.stats.update(future.result())
+        else:
+            bundle.stats.status = "failed"
+        report(bundle.stats)
+
+
+# All writers alive in the process, used by flush_all() and at exit
+_writers: "weakref.WeakSet[BundleWriter]" = weakref.WeakSet()
+
+_default_writer: Optional[BundleWriter] = None
+_default_writer_lock = threading.Lock()
+
+
+def get_default_writer() -> BundleWriter:
+    """Returns the writer shared by all PlotIs instances using
+    `asynchronous=True`.
+    """
+    global _default_writer
+    with _default_writer_lock:
+        if _default_writer is None:
+            _default_writer = BundleWriter()
+        return _default_writer
+
+
+def flush_all() -> None:
+    """Waits for all bundle writers in the process. Raises BundleWriteError
+    with the errors of all writers if any bundle failed.
+    """
+    errors = []
+    for writer in list(_writers):
+        try:
+            writer.flush()
+        except BundleWriteError as e:
+            errors += e.errors
+
+    if len(errors) > 0:
+        raise BundleWriteError(errors)
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    # Exceptions raised in atexit handlers are only printed,
+    # hence the errors are reported explicitly instead.
+    try:
+        flush_all()
+    except BundleWriteError as e:
+        logger.error("%s", e)
+    for writer in list(_writers):
+        if writer._executor is not None:
+            writer._executor.shutdown(wait=True)
@@ -110,3 +110,127 @@ def run_ok7():
     with PlotIs(figpath=mock_fig_folder1, data=mock_data):
         mock_data.plot(x="x", y="y")
         plt.savefig(output_path + "/nice_path.png")
+
+def run_ok_serializer(fig_folder, serializer):
+    """Saving data using the serializer `serializer`.
+    """
+    with PlotIs(fig_folder, mock_data, serializer=serializer):
+        mock_data.plot(x="x", y="y")
+
+def run_ok_async(fig_folder, writer):
+    """Writing the bundle in the background using `writer`.
+    """
+    with PlotIs(fig_folder, mock_data, asynchronous=writer):
+        mock_data.plot(x="x", y="y")
+
+def run_ok_multiline():
+    """Calling PlotIs with the constructor call spanning several lines.
+    """
+    with PlotIs(
+        mock_fig_folder1,  # Some comment
+        data=mock_data,
+        serializer="csv"
+    ) as pi:
+        mock_data.plot(x="x", y="y")
+
+    return pi
+
+def run_ok_store(fig_folder, store):
+    """Writing the data to the content-addressed store `store`.
+    """
+    with PlotIs(fig_folder, mock_data, store=store):
+        mock_data.plot(x="x", y="y")
+
+def run_ok_incremental(fig_folder, incremental_data, serializer="csv"):
+    """Writing the bundle only if the data or code has changed.
+    """
+    with PlotIs(fig_folder, incremental_data, serializer=serializer, incremental=True) as pi:
+        incremental_data.plot(x="x", y="y")
+
+    return pi
+
+def run_ok_chunks(fig_folder, chunks, serializer):
+    """Streaming the data given as an iterable of chunks.
+    """
+    with PlotIs(fig_folder, chunks, serializer=serializer):
+        plt.plot([1, 2], [3, 4])
+
+def run_ok_multiple_data(fig_folder, multi_df, multi_arr, multi_series, serializer):
+    """Saving several named data objects.
+    """
+    with PlotIs(fig_folder, {"multi_df": multi_df, "multi_arr": multi_arr, "multi_series": multi_series}, serializer=serializer):
+        plt.plot(multi_df["x"], multi_arr)
+        plt.plot(multi_df["x"], multi_series)
+
+def run_ok_lazy(fig_folder, lazy_df, serializer):
+    """Loading only the columns used in the context in run.py.
+    """
+    with PlotIs(fig_folder, lazy_df, serializer=serializer, lazy_load=True):
+        plt.plot(lazy_df["x"], lazy_df.y)
+
+def run_ok_outputs(fig_folder, parallel_outputs):
+    """Saving the figure in several formats and resolutions.
+    """
+    with PlotIs(fig_folder, mock_data, outputs=["png", ("png", 50), "svg", "pdf"], parallel_outputs=parallel_outputs):
+        mock_data.plot(x="x", y="y")
+
+def run_ok_reduction(fig_folder, reduce_df):
+    """Writing only the columns used in the context, downsampled.
+    """
+    with PlotIs(fig_folder, reduce_df, serializer="npz", prune_columns=True, downsample="lttb", downsample_points=100):
+        plt.plot(reduce_df.index, reduce_df["y"])
+
+def run_ok_snapshot(fig_folder, snapshot_df, snapshot_arr, writer):
+    """Writing a DataFrame and an array in the background without copying them.
+    """
+    with PlotIs(fig_folder, {"snapshot_df": snapshot_df, "snapshot_arr": snapshot_arr}, asynchronous=writer, freeze_arrays=True):
+        plt.plot(snapshot_df["x"], snapshot_arr)
+
+def run_ok_archive(fig_folder, archive_df, archive_arr, archive_series, serializer):
+    """Writing the bundle as a single archive.
+    """
+    data = {"archive_df": archive_df, "archive_arr": archive_arr, "archive_series": archive_series}
+    with PlotIs(fig_folder, data, serializer=serializer, lazy_load=True, incremental=True, archive=True) as pi:
+        plt.plot(archive_df["x"], archive_arr)
+        plt.plot(archive_df["x"], archive_series)
+
+    return pi
+
+def run_ok_registry(fig_folder, registry_df):
+    """Writing a bundle recorded in the registry.
+    """
+    with PlotIs(fig_folder, registry_df):
+        plt.plot(registry_df["x"], registry_df["y"])
+
+def run_ok_native(fig_folder, native_table, native_struct, serializer, archive):
+    """Writing an Arrow table or Polars DataFrame and a structured array as they are.
+    """
+    with PlotIs(fig_folder, {"native_table": native_table, "native_struct": native_struct}, serializer=serializer, lazy_load=True, archive=archive):
+        plt.plot(native_table["x"], native_struct["y"])
+
+def run_ok_render_cache(fig_folder, render_df, render_cache):
+    """Saving the figure through a render cache.
+    """
+    with PlotIs(fig_folder, render_df, serializer="npz", render_cache=render_cache) as pi:
+        plt.plot(render_df["x"], render_df["y"])
+    plt.close("all")
+
+    return pi
+
+def run_ok_loop(fig_folder, loop_df, serializer):
+    """Saving one figure per group in a loop.
+    """
+    for group, group_df in loop_df.groupby("group"):
+        with PlotIs(fig_folder, group_df, serializer=serializer, lazy_load=True, loop={"group": group}) as pi:
+            plt.plot(group_df["x"], group_df["y"])
+            plt.title(group)
+        plt.close()
+
+    return pi
+
+def run_error_render_cache(fig_folder, render_df, render_cache):
+    """Raising in a context saving the figure through a render cache.
+    """
+    with PlotIs(fig_folder, render_df, serializer="npz", render_cache=render_cache):
+        plt.figure()
+        raise ValueError("Failed to plot")
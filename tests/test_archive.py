@@ -0,0 +1,67 @@
+import os
+import runpy
+import zipfile
+import pytest
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from src.plotis.archive import CODE_MEMBER, read_archive_manifest
+from src.plotis.cli import find_bundles, regenerate
+from src.plotis.serializers import get_serializer
+from tests.data.sample_calling_file import run_ok_archive
+
+output_path = "tests/tmp/archive"
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet", "feather", "npz"])
+def test_archive_bundle(serializer_name: str) -> None:
+    """Tests that the archive holds uncompressed code, manifest and data,
+    and that running it loads the data straight from the archive.
+    """
+    if serializer_name in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    fig_folder = output_path + "/" + serializer_name
+    archive_df = pd.DataFrame({"x": [1.0, 2.0, 3.0], "unused": ["a", "b", "c"]}, index=[4, 5, 6])
+    archive_arr = np.array([7.0, 8.0, 9.0])
+    archive_series = pd.Series([1, 2, 3], name="s")
+    pi = run_ok_archive(fig_folder, archive_df, archive_arr, archive_series, serializer_name)
+
+    assert pi.bundle_status == "written"
+    assert not os.path.exists(fig_folder)
+    with zipfile.ZipFile(fig_folder + ".zip") as archive:
+        assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+        assert archive.namelist()[0] == CODE_MEMBER
+
+    manifest = read_archive_manifest(fig_folder + ".zip")
+    assert manifest["archive"] == fig_folder + ".zip"
+    assert manifest["outputs"] == [fig_folder + ".png"]
+    extension = get_serializer(serializer_name).extension
+    assert [data_manifest["member"] for data_manifest in manifest["data"]] == [
+        "data_archive_df" + extension,
+        "data_archive_arr.npy",
+        "data_archive_series" + extension,
+    ]
+
+    loaded = runpy.run_path(fig_folder + ".zip", run_name="__main__")
+    plt.close("all")
+    assert os.path.exists(fig_folder + ".png")
+    assert list(loaded["archive_df"].columns)[-1] == "x"
+    assert "unused" not in loaded["archive_df"].columns
+    assert loaded["archive_arr"].tolist() == [7.0, 8.0, 9.0]
+    assert loaded["archive_series"].tolist() == [1, 2, 3]
+
+    # Writing the same bundle again reuses the archive
+    pi = run_ok_archive(fig_folder, archive_df, archive_arr, archive_series, serializer_name)
+    assert pi.bundle_status == "reused"
+
+def test_regenerate_archive() -> None:
+    """Tests that the regenerate command finds and runs bundle archives.
+    """
+    fig_folder = output_path + "/regenerate/fig"
+    run_ok_archive(fig_folder, pd.DataFrame({"x": [1, 2]}), np.array([3, 4]), pd.Series([5, 6]), "csv")
+
+    assert find_bundles(output_path + "/regenerate") == [fig_folder + ".zip"]
+    assert regenerate(output_path + "/regenerate", n_workers=1) == 0
+    assert os.path.exists(fig_folder + ".png")
+    assert regenerate(output_path + "/regenerate", n_workers=1) == 0
@@ -0,0 +1,59 @@
+import os
+
+from src.plotis.cli import find_bundles, is_up_to_date, main
+from tests.data.sample_calling_file import run_ok_serializer
+
+output_path = "tests/tmp/cli"
+
+def test_regenerate_bundles() -> None:
+    """Tests regenerating the figures of all bundles under a folder, 
+    and that up to date bundles are skipped.
+    """
+    fig_folders = [output_path + "/fig1", output_path + "/nested/fig2"]
+    for fig_folder in fig_folders:
+        run_ok_serializer(fig_folder, "csv")
+
+    assert find_bundles(output_path) == fig_folders
+    assert not any(is_up_to_date(fig_folder) for fig_folder in fig_folders)
+
+    assert main(["regenerate", output_path, "-j", "2"]) == 0
+    for fig_folder in fig_folders:
+        assert os.path.exists(fig_folder + "/figure.png")
+        assert is_up_to_date(fig_folder)
+
+    mtime = os.path.getmtime(fig_folders[0] + "/figure.png")
+    assert main(["regenerate", output_path]) == 0
+    assert os.path.getmtime(fig_folders[0] + "/figure.png") == mtime
+
+def test_regenerate_failing_bundle() -> None:
+    """Tests that a failing bundle makes the command fail.
+    """
+    fig_folder = output_path + "/failing"
+    os.makedirs(fig_folder, exist_ok=True)
+    with open(fig_folder + "/run.py", "w+") as fp:
+        fp.write("raise ValueError(\"Failing bundle\")\n")
+
+    assert main(["regenerate", fig_folder, "-j", "1"]) == 1
+
+def test_regenerate_rc_params_isolated() -> None:
+    """Tests that the rcParams set by a bundle do not leak into 
+    the next bundle run by the same worker.
+    """
+    rc_path = output_path + "/linewidth.txt"
+    bundle_codes = {
+        output_path + "/rc/a": "import matplotlib.pyplot as plt\nplt.rcParams[\"lines.linewidth\"] = 10\n",
+        output_path + "/rc/b": (
+            "import matplotlib.pyplot as plt\n"
+            f"with open({rc_path!r}, \"w+\") as fp:\n"
+            "    fp.write(str(plt.rcParams[\"lines.linewidth\"]))\n"
+        ),
+    }
+    for fig_folder, code in bundle_codes.items():
+        os.makedirs(fig_folder, exist_ok=True)
+        with open(fig_folder + "/run.py", "w+") as fp:
+            fp.write(code)
+
+    assert find_bundles(output_path + "/rc") == list(bundle_codes)
+    assert main(["regenerate", output_path + "/rc", "-j", "1"]) == 0
+    with open(rc_path) as fp:
+        assert float(fp.read()) != 10
@@ -0,0 +1,62 @@
+import inspect
+
+from src.plotis.context_parser import find_with_context
+from src.plotis.source_cache import SourceFile
+from tests.data.sample_calling_file_linecount import get_last_lineno_of_context_test_func
+from tests.data.sample_calling_file import run_ok_multiline
+
+def test_find_with_context() -> None:
+    """Tests locating the outer with statement in the line count sample file.
+    """
+    with open(inspect.getabsfile(get_last_lineno_of_context_test_func), "r") as fp:
+        source_file = SourceFile("mock.py", fp.readlines())
+
+    with_context = find_with_context(source_file, 26)
+    assert with_context.header_start == 26
+    assert with_context.body_start == 27
+    assert with_context.body_end == 37
+    assert with_context.data_source == "mock_data"
+    assert with_context.figpath_source == "mock_fig_folder1"
+    assert with_context.has_nested_plotis is True
+
+    with_context = find_with_context(source_file, 30)
+    assert with_context.body_end == 34
+    assert with_context.has_nested_plotis is False
+
+    assert find_with_context(source_file, 27) is None
+
+def test_find_with_context_multiline() -> None:
+    """Tests a with statement whose constructor call spans several 
+    lines, with keyword arguments and comments.
+    """
+    lines = [
+        "with PlotIs(\n",
+        "    figpath=\"some/path\",  # A comment with PlotIs(\n",
+        "    serializer=\"npz\",\n",
+        "    data=df,\n",
+        ") as pi:\n",
+        "    # Plotting\n",
+        "    df.plot()\n",
+        "\n",
+        "x = 1\n",
+    ]
+    source_file = SourceFile("mock.py", lines)
+
+    for lineno in range(1, 6):
+        with_context = find_with_context(source_file, lineno)
+        assert with_context.body_start == 6
+        assert with_context.body_end == 7
+        assert with_context.data_source == "df"
+        assert with_context.figpath_source == "\"some/path\""
+
+def test_find_with_context_syntax_error() -> None:
+    """Tests that a file which can not be parsed gives no with statement.
+    """
+    source_file = SourceFile("mock.py", ["with PlotIs(a, b):\n", "    x = (\n"])
+    assert find_with_context(source_file, 1) is None
+
+def test_run_multiline() -> None:
+    """Tests running PlotIs with the constructor call spanning several lines.
+    """
+    pi = run_ok_multiline()
+    assert pi.context_source_lines == ["mock_data.plot(x=\"x\", y=\"y\")\n"]
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from src.plotis.fingerprint import Fingerprinter, fingerprint_data
+
+def get_test_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        data={
+            "int": np.arange(10),
+            "float": np.linspace(0, 1, 10),
+            "str": [str(ix) for ix in range(10)],
+            "cat": pd.Categorical(["a", "b"] * 5),
+        }
+    )
+
+def test_fingerprint_equal_data() -> None:
+    """Tests that equal data gives equal fingerprints.
+    """
+    assert fingerprint_data(get_test_df()) == fingerprint_data(get_test_df())
+
+def test_fingerprint_changed_data() -> None:
+    """Tests that changing values, column names, dtypes or the index
+    changes the fingerprint.
+    """
+    fingerprint = fingerprint_data(get_test_df())
+
+    changed_value = get_test_df()
+    changed_value.loc[3, "str"] = "x"
+    assert fingerprint_data(changed_value) != fingerprint
+
+    renamed = get_test_df().rename(columns={"int": "integer"})
+    assert fingerprint_data(renamed) != fingerprint
+
+    changed_dtype = get_test_df().astype({"int": np.int32})
+    assert fingerprint_data(changed_dtype) != fingerprint
+
+    changed_index = get_test_df().set_axis(range(1, 11))
+    assert fingerprint_data(changed_index) != fingerprint
+
+def test_fingerprint_no_collisions() -> None:
+    """Tests that data differing only by index names or dtypes, categories,
+    or the types of objects with the same str, has different fingerprints.
+    """
+    test_df = get_test_df()
+    assert fingerprint_data(test_df.rename_axis("time")) != fingerprint_data(test_df)
+
+    datetime_index = test_df.set_axis(pd.to_datetime(test_df.index.to_numpy(), unit="ns"))
+    assert fingerprint_data(datetime_index) != fingerprint_data(test_df)
+
+    multi_index = test_df.set_axis(pd.MultiIndex.from_arrays([test_df.index], names=["ix"]))
+    assert fingerprint_data(multi_index) != fingerprint_data(test_df.rename_axis("ix"))
+
+    reordered = test_df.assign(cat=test_df["cat"].cat.reorder_categories(["b", "a"]))
+    assert fingerprint_data(reordered) != fingerprint_data(test_df)
+
+    ordered = test_df.assign(cat=test_df["cat"].cat.as_ordered())
+    assert fingerprint_data(ordered) != fingerprint_data(test_df)
+
+    extra_category = test_df.assign(cat=test_df["cat"].cat.add_categories(["c"]))
+    assert fingerprint_data(extra_category) != fingerprint_data(test_df)
+
+    ints = pd.DataFrame(data={"x": pd.Series([1, 2], dtype=object)})
+    strs = pd.DataFrame(data={"x": pd.Series(["1", "2"], dtype=object)})
+    assert fingerprint_data(ints) != fingerprint_data(strs)
+
+def test_fingerprint_series() -> None:
+    """Tests that Series are fingerprinted apart from DataFrames with the
+    same column, since they are written and loaded differently.
+    """
+    series = pd.Series([1.0, 2.0, 3.0])
+    assert fingerprint_data(series) != fingerprint_data(series.to_frame())
+    assert fingerprint_data(series) != fingerprint_data(series.rename(1))
+    assert fingerprint_data(series.rename("x")) != fingerprint_data(series.to_frame(name="x"))
+    assert fingerprint_data(series) == fingerprint_data(pd.Series([1.0, 2.0, 3.0]))
+
+def test_fingerprint_chunks() -> None:
+    """Tests that the fingerprint does not depend on how the rows are
+    split into chunks.
+    """
+    test_df = get_test_df()
+    fingerprinter = Fingerprinter()
+    fingerprinter.update(test_df.iloc[:3])
+    fingerprinter.update(test_df.iloc[3:])
+
+    assert fingerprinter.hexdigest() == fingerprint_data(test_df)
+    assert fingerprinter.n_rows == 10
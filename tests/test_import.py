@@ -0,0 +1,31 @@
+import sys
+import subprocess
+
+def run_python(code) -> str:
+    """Runs `code` in a new interpreter from the root of the repository
+    and returns its output.
+    """
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def test_import_does_not_import_dependencies() -> None:
+    """Tests that importing the package and PlotIs does not import
+    pandas or numpy, which are only imported on first export.
+    """
+    code = (
+        "import sys\n"
+        "import src.plotis\n"
+        "from src.plotis import PlotIs\n"
+        "print(PlotIs.__name__, 'pandas' in sys.modules, 'numpy' in sys.modules)\n"
+    )
+    assert run_python(code) == "PlotIs False False"
+
+def test_lazy_module() -> None:
+    """Tests that the lazily imported modules behave as the modules.
+    """
+    import pandas as pd
+    from src.plotis._lazy import LazyModule
+
+    lazy_pd = LazyModule("pandas")
+    assert lazy_pd.DataFrame is pd.DataFrame
+    assert lazy_pd.__version__ == pd.__version__
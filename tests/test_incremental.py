@@ -0,0 +1,57 @@
+import os
+import pytest
+import pandas as pd
+
+from tests.data.sample_calling_file import run_ok_incremental
+
+output_path = "tests/tmp/incremental"
+
+def test_incremental_reuses_unchanged_bundle() -> None:
+    """Tests that a bundle is only written again when its data changes.
+    """
+    fig_folder = output_path + "/fig1"
+    test_df = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+
+    assert run_ok_incremental(fig_folder, test_df).bundle_status == "written"
+    mtime = os.path.getmtime(fig_folder + "/data.csv")
+
+    assert run_ok_incremental(fig_folder, test_df).bundle_status == "reused"
+    assert os.path.getmtime(fig_folder + "/data.csv") == mtime
+
+    test_df.loc[0, "y"] = 5
+    assert run_ok_incremental(fig_folder, test_df).bundle_status == "written"
+
+def test_incremental_rewrites_missing_files() -> None:
+    """Tests that a bundle is written again if one of its files is missing.
+    """
+    fig_folder = output_path + "/fig2"
+    test_df = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+
+    run_ok_incremental(fig_folder, test_df)
+    os.remove(fig_folder + "/data.csv")
+
+    assert run_ok_incremental(fig_folder, test_df).bundle_status == "written"
+    assert os.path.exists(fig_folder + "/data.csv")
+
+def test_incremental_rewrites_changed_index_and_categories() -> None:
+    """Tests that renaming the index or reordering categories, which leave
+    the values as they are, writes the bundle again.
+    """
+    pytest.importorskip("pyarrow")
+    fig_folder = output_path + "/fig3"
+    test_df = pd.DataFrame(data={
+        "x": [1,2,3,4], 
+        "y": [4,3,2,1], 
+        "level": pd.Categorical(["lo", "hi", "lo", "hi"], categories=["lo", "hi"]),
+    })
+    assert run_ok_incremental(fig_folder, test_df, "parquet").bundle_status == "written"
+
+    test_df = test_df.rename_axis("time")
+    assert run_ok_incremental(fig_folder, test_df, "parquet").bundle_status == "written"
+    assert pd.read_parquet(fig_folder + "/data.parquet").index.name == "time"
+
+    test_df["level"] = test_df["level"].cat.reorder_categories(["hi", "lo"])
+    assert run_ok_incremental(fig_folder, test_df, "parquet").bundle_status == "written"
+    assert pd.read_parquet(fig_folder + "/data.parquet")["level"].cat.categories.tolist() == ["hi", "lo"]
+
+    assert run_ok_incremental(fig_folder, test_df, "parquet").bundle_status == "reused"
@@ -0,0 +1,56 @@
+import os
+import logging
+
+from src.plotis.instrumentation import add_hook, get_summary, remove_hook, reset_summary
+from src.plotis.writer import BundleWriter
+from tests.data.sample_calling_file import run_ok_async, run_ok_serializer
+
+output_path = "tests/tmp/instrumentation"
+
+def test_hooks_and_summary() -> None:
+    """Tests that the hooks get the timings and sizes of each bundle, 
+    and that the summary adds them up.
+    """
+    reported = []
+    reset_summary()
+    add_hook(reported.append)
+    try:
+        run_ok_serializer(output_path + "/sync", "csv")
+        writer = BundleWriter(max_workers=1)
+        run_ok_async(output_path + "/async", writer)
+        writer.flush()
+    finally:
+        remove_hook(reported.append)
+
+    assert [stats.figpath for stats in reported] == [output_path + "/sync", output_path + "/async"]
+    for stats in reported:
+        assert stats.status == "written"
+        assert stats.n_rows == 5
+        for phase in ["enter", "stack", "source", "clean", "exit", "codegen", "serialize", "write_code"]:
+            assert stats.timings[phase] >= 0
+        assert stats.bytes_written == sum(
+            os.path.getsize(stats.figpath + "/" + file_name) for file_name in ["data.csv", "run.py"]
+        )
+
+    summary = get_summary()
+    assert summary["n_bundles"] == 2
+    assert summary["n_by_status"] == {"written": 2}
+    assert summary["n_rows"] == 10
+    assert summary["bytes_written"] == sum(stats.bytes_written for stats in reported)
+
+def test_failing_hook_is_logged(caplog) -> None:
+    """Tests that a failing hook is logged rather than failing the bundle.
+    """
+    def failing_hook(stats):
+        raise RuntimeError("metrics are down")
+
+    add_hook(failing_hook)
+    try:
+        with caplog.at_level(logging.INFO, logger="plotis"):
+            run_ok_serializer(output_path + "/failing_hook", "csv")
+    finally:
+        remove_hook(failing_hook)
+
+    assert os.path.exists(output_path + "/failing_hook/run.py")
+    assert "Writing data to: " + output_path + "/failing_hook/data.csv" in caplog.messages
+    assert any("hook" in message for message in caplog.messages)
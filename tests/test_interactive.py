@@ -0,0 +1,79 @@
+import os
+import sys
+import types
+import linecache
+
+from src.plotis.interactive import get_history_lines, get_linecache_lines
+from src.plotis.source_cache import SOURCE_CACHE, SourceCache
+
+fig_folder = "tests/tmp/interactive"
+
+CELL = [
+    "import pandas as pd\n",
+    "import matplotlib.pyplot as plt\n",
+    "from src.plotis.plotis import PlotIs\n",
+    "\n",
+    "cell_df = pd.DataFrame({\"x\": [1, 2, 3], \"y\": [3, 2, 1]})\n",
+    "for ix in range(2):\n",
+    "    with PlotIs(f\"" + fig_folder + "/fig{ix}\", cell_df):\n",
+    "        plt.plot(cell_df[\"x\"], cell_df[\"y\"])\n",
+    "    plt.close()\n",
+]
+
+def register_cell(filename, lines) -> None:
+    """Registers a cell in linecache as IPython does.
+    """
+    linecache.cache[filename] = (sum(len(line) for line in lines), None, lines, filename)
+
+def test_linecache_lines() -> None:
+    """Tests that only the lines of in memory entries are taken from
+    linecache.
+    """
+    register_cell("<ipython-input-1-0123abcd>", ["a = 1\n"])
+    linecache.cache["mock_file.py"] = (6, 1.0, ["a = 1\n"], "mock_file.py")
+    try:
+        assert get_linecache_lines("<ipython-input-1-0123abcd>") == ["a = 1\n"]
+        assert get_linecache_lines("mock_file.py") is None
+        assert get_linecache_lines("<ipython-input-2-0123abcd>") is None
+    finally:
+        del linecache.cache["<ipython-input-1-0123abcd>"]
+        del linecache.cache["mock_file.py"]
+
+def test_history_lines(monkeypatch) -> None:
+    """Tests that the lines of a cell are taken from the history of a
+    running IPython session.
+    """
+    assert get_history_lines("<ipython-input-1-0123abcd>") is None
+
+    history_manager = types.SimpleNamespace(input_hist_parsed=["", "a = 1\nb = 2"])
+    shell = types.SimpleNamespace(history_manager=history_manager)
+    ipython = types.SimpleNamespace(get_ipython=lambda: shell)
+    monkeypatch.setitem(sys.modules, "IPython", ipython)
+
+    assert get_history_lines("<ipython-input-1-0123abcd>") == ["a = 1\n", "b = 2"]
+    assert get_history_lines("<ipython-input-5-0123abcd>") is None
+    assert get_history_lines("mock_file.py") is None
+
+    cache = SourceCache()
+    source_file = cache.get("<ipython-input-1-0123abcd>")
+    assert source_file.lines == ["a = 1\n", "b = 2"]
+    assert cache.get("<ipython-input-1-0123abcd>") is source_file
+
+def test_plotis_in_cell() -> None:
+    """Tests the figures of a cell, whose source is only held in memory,
+    and that the cell is parsed once for all of them.
+    """
+    filename = "/tmp/ipykernel_0/1234567890.py"
+    register_cell(filename, CELL)
+    try:
+        exec(compile("".join(CELL), filename, "exec"), {"__name__": "__main__"})
+        source_file = SOURCE_CACHE.get(filename)
+    finally:
+        del linecache.cache[filename]
+
+    assert source_file.lines is CELL
+    for ix in range(2):
+        with open(os.path.join(fig_folder, f"fig{ix}", "run.py"), "r") as fp:
+            code = fp.read()
+        assert "plt.plot(cell_df[\"x\"], cell_df[\"y\"])\n" in code
+        assert "PlotIs" not in code
@@ -0,0 +1,31 @@
+from src.plotis.line_classes import BLANK, COMMENT, NESTED_PLOTIS, SAVEFIG, SHOW, classify_lines, get_line_classification
+from src.plotis.source_cache import SourceFile
+
+def test_classify_lines() -> None:
+    """Tests the tags, cleaned lines and counts of a classification.
+    """
+    code = [
+        "    x = 1\n",
+        "\n",
+        "    # A comment\n",
+        "    with PlotIs(path, df):\n",
+        "    plt.savefig(\"fig.png\")\n",
+        "    plt.show()",
+    ]
+    classification = classify_lines(code)
+
+    assert classification.tags == [0, BLANK, COMMENT, NESTED_PLOTIS, SAVEFIG, SHOW]
+    assert classification.cleaned_lines == ["x = 1\n", "\n", "with PlotIs(path, df):\n"]
+    assert classification.has_nested_plotis is True
+    assert classification.has_multiple_plots is False
+    assert classify_lines(["plt.show()\n", "ax.show()\n"]).has_multiple_plots is True
+
+def test_line_classification_cached() -> None:
+    """Tests that the classification of a span of a file is computed once.
+    """
+    source_file = SourceFile("file.py", ["a = 1\n", "    b = 2\n", "    # c\n"])
+    classification = get_line_classification(source_file, 2, 3)
+
+    assert classification.cleaned_lines == ["b = 2\n"]
+    assert get_line_classification(source_file, 2, 3) is classification
+    assert get_line_classification(source_file, 1, 3) is not classification
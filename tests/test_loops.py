@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import runpy
+import pytest
+import subprocess
+import numpy as np
+import pandas as pd
+
+from src.plotis.plotis import PlotIs
+from src.plotis.source_cache import SOURCE_CACHE
+from tests.data.sample_calling_file import run_ok_loop
+
+output_path = "tests/tmp/loops"
+
+loop_df = pd.DataFrame(data={
+    "group": ["a", "b", "a", "c", "b"],
+    "x": [1.0, 2.0, 3.0, 4.0, 5.0],
+    "y": [5.0, 4.0, 3.0, 2.0, 1.0],
+    "unused": [0, 0, 0, 0, 0],
+})
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet"])
+def test_loop_bundle(serializer_name) -> None:
+    """Tests that the iterations of a loop are written as one bundle, with
+    a single data file and run.py regenerating any of the iterations.
+    """
+    if serializer_name == "parquet":
+        pytest.importorskip("pyarrow")
+
+    fig_folder = f"{output_path}/{serializer_name}"
+    pi = run_ok_loop(fig_folder, loop_df, serializer_name)
+    assert pi.bundle_status == "looped"
+    assert not os.path.exists(fig_folder + "/run.py")
+    PlotIs.flush()
+
+    assert sorted(os.listdir(fig_folder)) == ["data." + serializer_name, "manifest.json", "run.py"]
+    with open(fig_folder + "/manifest.json", "r") as fp:
+        manifest = json.load(fp)
+    assert manifest["iterations"] == [{"group": "a"}, {"group": "b"}, {"group": "c"}]
+
+    namespace = runpy.run_path(fig_folder + "/run.py", init_globals={"ITERATIONS": [1]})
+    assert namespace["group"] == "b"
+    assert namespace["group_df"]["x"].tolist() == [2.0, 5.0]
+    assert "unused" not in namespace["group_df"].columns
+    assert os.path.exists(fig_folder + "/figure_1.png")
+    assert not os.path.exists(fig_folder + "/figure_0.png")
+
+    runpy.run_path(fig_folder + "/run.py")
+    assert all(os.path.exists(path) for path in manifest["outputs"])
+
+def test_loop_run_from_command_line() -> None:
+    """Tests regenerating the iterations given on the command line.
+    """
+    fig_folder = output_path + "/command_line"
+    run_ok_loop(fig_folder, loop_df, "csv")
+    PlotIs.flush()
+
+    env = {**os.environ, "MPLBACKEND": "Agg"}
+    subprocess.run([sys.executable, fig_folder + "/run.py", "0", "2"], check=True, env=env)
+    assert os.path.exists(fig_folder + "/figure_0.png")
+    assert not os.path.exists(fig_folder + "/figure_1.png")
+    assert os.path.exists(fig_folder + "/figure_2.png")
+
+def test_loop_reuses_context(monkeypatch) -> None:
+    """Tests that only the first iteration reads the calling file, and
+    that starting the loop over writes the previous bundle.
+    """
+    fig_folder = output_path + "/reuse"
+    n_reads = []
+    get = SOURCE_CACHE.get
+    monkeypatch.setattr(SOURCE_CACHE, "get", lambda filename: n_reads.append(filename) or get(filename))
+
+    run_ok_loop(fig_folder, loop_df.iloc[:1], "csv")
+    n_first_reads = len(n_reads)
+    PlotIs.flush()
+
+    n_reads.clear()
+    run_ok_loop(fig_folder, loop_df, "csv")
+    assert len(n_reads) == n_first_reads
+
+    run_ok_loop(fig_folder, loop_df, "csv")
+    assert os.path.exists(fig_folder + "/run.py")
+    PlotIs.flush()
+
+    with open(fig_folder + "/manifest.json", "r") as fp:
+        assert len(json.load(fp)["iterations"]) == 3
+
+def test_loop_params() -> None:
+    """Tests that NumPy scalars are accepted as parameters, and that
+    invalid parameters and options are rejected.
+    """
+    pi = PlotIs("mock", loop_df, loop={"group": np.int64(3)})
+    assert pi.loop == {"group": 3}
+
+    with pytest.raises(ValueError):
+        PlotIs("mock", loop_df, loop={"not valid": 1})
+    with pytest.raises(ValueError):
+        PlotIs("mock", loop_df, loop={"group": object()})
+    with pytest.raises(ValueError):
+        PlotIs("mock", loop_df, loop={"group": 1}, incremental=True)
@@ -0,0 +1,41 @@
+import os
+import runpy
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.plotis.plotis import PlotIs
+from tests.data.sample_calling_file import run_ok_multiple_data
+
+output_path = "tests/tmp/multiple_data"
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet"])
+def test_multiple_data(serializer_name: str) -> None:
+    """Tests that each named data object is written in its own file 
+    and loaded into its own variable by run.py.
+    """
+    if serializer_name == "parquet":
+        pytest.importorskip("pyarrow")
+
+    fig_folder = output_path + "/" + serializer_name
+    multi_df = pd.DataFrame(data={"x": [1.0, 2.0, 3.0, 4.0]})
+    multi_arr = np.array([4, 3, 2, 1])
+    multi_series = pd.Series([0.5, 1.5, 2.5, 3.5], name="s")
+    run_ok_multiple_data(fig_folder, multi_df, multi_arr, multi_series, serializer_name)
+
+    assert os.path.exists(fig_folder + "/data_multi_arr.npy")
+    assert os.path.exists(fig_folder + f"/data_multi_df.{serializer_name}")
+    assert os.path.exists(fig_folder + f"/data_multi_series.{serializer_name}")
+
+    namespace = runpy.run_path(fig_folder + "/run.py")
+    np.testing.assert_array_equal(namespace["multi_arr"], multi_arr)
+    assert namespace["multi_df"]["x"].tolist() == multi_df["x"].tolist()
+    assert namespace["multi_series"].tolist() == multi_series.tolist()
+    assert namespace["multi_series"].name == "s"
+
+def test_invalid_data_name() -> None:
+    """Tests that data names which are not valid variable names are rejected.
+    """
+    pi = PlotIs("mock", {"not valid": np.arange(3)})
+    with pytest.raises(ValueError):
+        pi._get_bundle_data()
@@ -0,0 +1,82 @@
+import os
+import runpy
+import pytest
+import numpy as np
+
+from src.plotis.fingerprint import fingerprint_data
+from src.plotis.serializers import get_column_names, is_chunked
+from tests.data.sample_calling_file import run_ok_native
+
+output_path = "tests/tmp/native_data"
+
+native_struct = np.array([(1, 2.5), (2, 3.5), (3, 4.5)], dtype=[("x", "i8"), ("y", "f8")])
+
+def run_bundle(fig_folder, archive) -> dict:
+    """Runs the code of the bundle written to `fig_folder`.
+    """
+    if archive is True:
+        return runpy.run_path(fig_folder + ".zip")
+    return runpy.run_path(fig_folder + "/run.py")
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet", "feather", "npz"])
+@pytest.mark.parametrize("archive", [False, True])
+def test_arrow_table(serializer_name, archive) -> None:
+    """Tests that Arrow tables are written by pyarrow and loaded back as
+    Arrow tables, only with the columns used in the context.
+    """
+    pa = pytest.importorskip("pyarrow")
+    fig_folder = f"{output_path}/arrow_{serializer_name}_{archive}"
+    native_table = pa.table({"x": [1.0, 2.0, 3.0], "unused": ["a", "b", "c"]})
+    run_ok_native(fig_folder, native_table, native_struct, serializer_name, archive)
+
+    extension = "feather" if serializer_name == "npz" else serializer_name
+    if archive is False:
+        assert os.path.exists(f"{fig_folder}/data_native_table.{extension}")
+    with open(f"{fig_folder}.zip" if archive else f"{fig_folder}/run.py", "rb") as fp:
+        assert b"import polars" not in fp.read()
+
+    namespace = run_bundle(fig_folder, archive)
+    assert isinstance(namespace["native_table"], pa.Table)
+    assert namespace["native_table"].column_names == ["x"]
+    assert namespace["native_table"]["x"].to_pylist() == [1.0, 2.0, 3.0]
+    assert namespace["native_struct"].dtype == native_struct.dtype
+    np.testing.assert_array_equal(namespace["native_struct"], native_struct)
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet", "feather"])
+def test_polars_frame(serializer_name) -> None:
+    """Tests that Polars DataFrames are written by Polars and loaded back
+    as Polars DataFrames.
+    """
+    pl = pytest.importorskip("polars")
+    fig_folder = f"{output_path}/polars_{serializer_name}"
+    native_table = pl.DataFrame({"x": [1.0, 2.0, 3.0], "unused": ["a", "b", "c"]})
+    run_ok_native(fig_folder, native_table, native_struct, serializer_name, False)
+
+    namespace = run_bundle(fig_folder, False)
+    assert isinstance(namespace["native_table"], pl.DataFrame)
+    assert namespace["native_table"].columns == ["x"]
+    assert namespace["native_table"]["x"].to_list() == [1.0, 2.0, 3.0]
+
+def test_arrow_fingerprint() -> None:
+    """Tests that Arrow tables are fingerprinted by their values, including
+    slices sharing the buffers of a table.
+    """
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"x": [1, 2, 3, 4], "s": ["a", "b", "c", "d"]})
+
+    assert fingerprint_data(table) == fingerprint_data(pa.table({"x": [1, 2, 3, 4], "s": ["a", "b", "c", "d"]}))
+    assert fingerprint_data(table) != fingerprint_data(pa.table({"x": [1, 2, 3, 5], "s": ["a", "b", "c", "d"]}))
+    assert fingerprint_data(table.slice(0, 2)) != fingerprint_data(table.slice(2, 2))
+
+def test_native_data_is_not_chunked() -> None:
+    """Tests that tables of other libraries are written at once rather 
+    than as iterables of chunks.
+    """
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table({"x": [1, 2]})
+
+    assert is_chunked(table) is False
+    assert is_chunked(native_struct) is False
+    assert is_chunked(iter([])) is True
+    assert get_column_names(table) == ["x"]
+    assert get_column_names(native_struct) is None
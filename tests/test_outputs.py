@@ -0,0 +1,36 @@
+import os
+import runpy
+import pytest
+import matplotlib.pyplot as plt
+
+from src.plotis.outputs import get_output_path, normalize_outputs
+from tests.data.sample_calling_file import run_ok_outputs
+
+output_path = "tests/tmp/outputs"
+
+def test_normalize_outputs() -> None:
+    """Tests the accepted ways of giving outputs.
+    """
+    assert normalize_outputs(None) == [("png", None)]
+    assert normalize_outputs("SVG") == [("svg", None)]
+    assert normalize_outputs(["png", ("png", 300), ".pdf", "png"]) == [("png", None), ("png", 300), ("pdf", None)]
+    assert get_output_path("fig", "png", 300) == "fig/figure_300dpi.png"
+
+    with pytest.raises(ValueError):
+        normalize_outputs([])
+    with pytest.raises(ValueError):
+        normalize_outputs([("png", 0)])
+
+@pytest.mark.parametrize("parallel_outputs", [False, True])
+def test_multiple_outputs(parallel_outputs: bool) -> None:
+    """Tests that run.py saves the figure in all outputs.
+    """
+    fig_folder = output_path + "/" + ("parallel" if parallel_outputs else "sequential")
+    run_ok_outputs(fig_folder, parallel_outputs)
+
+    runpy.run_path(fig_folder + "/run.py")
+    plt.close("all")
+
+    for file_name in ["figure.png", "figure_50dpi.png", "figure.svg", "figure.pdf"]:
+        assert os.path.getsize(fig_folder + "/" + file_name) > 0
+    assert os.path.getsize(fig_folder + "/figure_50dpi.png") < os.path.getsize(fig_folder + "/figure.png")
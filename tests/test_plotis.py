@@ -110,3 +110,16 @@ def test_savfig_show_in_context() -> None:
         run_ok7()
     except Exception as e:
         pytest.fail(f"Unexpected error: {e}")
+
+def test_get_calling_frame() -> None:
+    """Tests that the calling frame lookup returns the file and line 
+    of the caller of the method calling it.
+    """
+    def method_calling_get_calling_frame():
+        return PlotIs._get_calling_frame()
+
+    calling_lineno = inspect.currentframe().f_lineno + 1
+    filename, lineno = method_calling_get_calling_frame()
+
+    assert filename == __file__
+    assert lineno == calling_lineno
@@ -0,0 +1,72 @@
+import runpy
+import numpy as np
+import pandas as pd
+
+from src.plotis.manifest import read_manifest
+from src.plotis.reduction import lttb_indices, minmax_indices, reduce_data
+from tests.data.sample_calling_file import run_ok_reduction
+
+output_path = "tests/tmp/reduction"
+
+def test_lttb_indices() -> None:
+    """Tests that LTTB keeps the requested number of points,
+    including the end points and a spike.
+    """
+    x = np.arange(10000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[1234] = 10.0
+
+    indices = lttb_indices(x, y, 200)
+    assert len(indices) == 200
+    assert indices[0] == 0 and indices[-1] == 9999
+    assert np.all(np.diff(indices) > 0)
+    assert 1234 in indices
+    np.testing.assert_array_equal(lttb_indices(x[:50], y[:50], 200), np.arange(50))
+
+def test_minmax_indices() -> None:
+    """Tests that min/max downsampling keeps the extremes of each bucket.
+    """
+    y = np.random.default_rng(0).normal(size=10000)
+    y[10] = np.nan
+
+    indices = minmax_indices(np.arange(10000, dtype=np.float64), y, 100)
+    assert len(indices) <= 102
+    assert np.nanargmin(y) in indices and np.nanargmax(y) in indices
+
+def test_reduce_data() -> None:
+    """Tests pruning and downsampling a DataFrame, and the description
+    of what was reduced.
+    """
+    df = pd.DataFrame({"x": np.arange(5000.0), "y": np.arange(5000.0) ** 2, "label": "a"})
+    code = ["plt.plot(df.x, df[\"y\"])\n"]
+
+    reduced, reduction = reduce_data(df, "df", code, prune_columns=True, downsample="minmax", downsample_points=100)
+    assert list(reduced.columns) == ["x", "y"]
+    assert reduction["dropped_columns"] == ["label"]
+    assert reduction["downsample"]["rows_before"] == 5000
+    assert reduction["downsample"]["rows_after"] == len(reduced) < 300
+
+    assert reduce_data(df, "df", ["df.plot()\n"], prune_columns=True) == (df, None)
+
+    # The columns plotted by DataFrame methods are not all named
+    assert reduce_data(df, "df", ["df.plot(x=\"x\")\n"], prune_columns=True) == (df, None)
+    assert reduce_data(df, "df", ["plt.plot(df[\"x\"], df[ycol])\n"], prune_columns=True) == (df, None)
+
+def test_reduction_bundle() -> None:
+    """Tests that the bundle holds the reduced data and that the
+    manifest records the reduction.
+    """
+    fig_folder = output_path + "/lttb"
+    reduce_df = pd.DataFrame({"y": np.cos(np.arange(20000) / 100), "unused": 1.0})
+    run_ok_reduction(fig_folder, reduce_df)
+
+    loaded_df = runpy.run_path(fig_folder + "/run.py")["reduce_df"]
+    assert list(loaded_df.columns) == ["y"]
+    assert len(loaded_df) == 100
+    assert loaded_df.index[0] == 0 and loaded_df.index[-1] == 19999
+
+    reduction = read_manifest(fig_folder)["data"][0]["reduction"]
+    assert reduction == {
+        "dropped_columns": ["unused"],
+        "downsample": {"method": "lttb", "points": 100, "rows_before": 20000, "rows_after": 100},
+    }
@@ -0,0 +1,59 @@
+import runpy
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.plotis.references import get_referenced_columns
+from tests.data.sample_calling_file import run_ok_lazy
+
+output_path = "tests/tmp/references"
+
+def test_referenced_columns() -> None:
+    """Tests detecting columns referred to by indexing, attributes 
+    and string literals.
+    """
+    code = [
+        "df[\"b\"] = df.a * 2\n",
+        "plt.plot(df.index, df['c'], df[\"b\"])\n",
+        "plt.title(\"d\")  # \"e\"\n",
+    ]
+    columns = ["a", "b", "c", "d", "e", "f"]
+
+    assert get_referenced_columns(code, "df", columns) == ["a", "b", "c", "d"]
+
+def test_referenced_columns_whole_frame() -> None:
+    """Tests that all columns are assumed to be used when the DataFrame
+    is used as a whole, or no columns are found.
+    """
+    columns = ["a", "b"]
+
+    assert get_referenced_columns(["sns.lineplot(data=df, x=\"a\")\n"], "df", columns) is None
+    assert get_referenced_columns(["df.plot()\n"], "df", columns) is None
+    assert get_referenced_columns(["df.plot(x=\"a\")\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(df.a, df.mean())\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(df[\"a\"], df.iloc[:, 1])\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(df[\"a\"], df[col])\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(df[\"a\"], df[f\"b{1}\"])\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(df[\"a\"], df[\"b\" + str(1)])\n"], "df", columns) is None
+    assert get_referenced_columns(["plt.plot(*df[[\"a\", \"b\"]].values.T)\n"], "df", columns) == ["a", "b"]
+    assert get_referenced_columns(["df2.plot(x=\"a\")\n"], "df", [0, "a"]) is None
+
+@pytest.mark.parametrize("serializer_name", ["csv", "parquet", "feather", "npz"])
+def test_lazy_load(serializer_name: str) -> None:
+    """Tests that run.py only loads the columns used in the context.
+    """
+    if serializer_name in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    fig_folder = output_path + "/" + serializer_name
+    lazy_df = pd.DataFrame(
+        data={"x": [1.0, 2.0, 3.0], "y": [3, 2, 1], "z": ["a", "b", "c"]},
+        index=pd.Index([5, 6, 7])
+    )
+    run_ok_lazy(fig_folder, lazy_df, serializer_name)
+
+    loaded_df = runpy.run_path(fig_folder + "/run.py")["lazy_df"]
+    assert list(loaded_df.columns) == ["x", "y"]
+    assert loaded_df["y"].tolist() == [3, 2, 1]
+    if serializer_name != "csv":
+        np.testing.assert_array_equal(loaded_df.index, [5, 6, 7])
@@ -0,0 +1,89 @@
+import os
+import pytest
+import pandas as pd
+
+from src.plotis.fingerprint import fingerprint_data
+from src.plotis.registry import REGISTRY, disable_registry, enable_registry, flush_registry, read_index
+from src.plotis.writer import BundleWriter
+from tests.data.sample_calling_file import run_ok_async, run_ok_chunks, run_ok_loop, run_ok_registry
+
+output_path = "tests/tmp/registry"
+
+@pytest.mark.parametrize("index_name", ["index.jsonl", "index.sqlite"])
+def test_registry_index(index_name: str) -> None:
+    """Tests that the bundles written while the registry is enabled are
+    written to the index when flushed, including those written in the 
+    background.
+    """
+    os.makedirs(output_path, exist_ok=True)
+    index_path = output_path + "/" + index_name
+    registry_df = pd.DataFrame({"x": [1, 2, 3], "y": [4, 5, 6]})
+
+    enable_registry(index_path)
+    try:
+        run_ok_registry(output_path + "/fig_0", registry_df)
+        run_ok_async(output_path + "/fig_1", BundleWriter(max_workers=1))
+        assert [entry["figpath"] for entry in REGISTRY.get_entries()] == [output_path + "/fig_0", output_path + "/fig_1"]
+        assert flush_registry() == 2
+    finally:
+        disable_registry()
+        REGISTRY.index_path = None
+
+    # Bundles written while disabled are not registered
+    run_ok_registry(output_path + "/fig_2", registry_df)
+    assert REGISTRY.get_entries() == []
+
+    entries = read_index(index_path)
+    assert [entry["figpath"] for entry in entries] == [output_path + "/fig_0", output_path + "/fig_1"]
+    entry = entries[0]
+    assert entry["source_file"].endswith("sample_calling_file.py")
+    assert entry["context_end"] == entry["context_start"]
+    assert entry["archive"] is False
+    assert entry["status"] == "written" and entries[1]["status"] == "written"
+    assert entry["n_rows"] == 3
+    assert entry["bytes_written"] > 0
+    assert entry["timings"]["serialize"] > 0
+    assert entry["data"][0]["fingerprint"] == fingerprint_data(registry_df)
+    assert entry["outputs"] == [output_path + "/fig_0/figure.png"]
+
+def test_registry_chunks() -> None:
+    """Tests that data given in chunks is registered without being
+    fingerprinted, since it can only be read once.
+    """
+    fig_folder = output_path + "/chunks"
+    chunks = (pd.DataFrame({"x": [ix, ix + 1]}) for ix in range(0, 6, 2))
+
+    enable_registry(output_path + "/chunks.jsonl")
+    try:
+        run_ok_chunks(fig_folder, chunks, "csv")
+        entries = REGISTRY.get_entries()
+        flush_registry()
+    finally:
+        disable_registry()
+        REGISTRY.index_path = None
+
+    assert len(pd.read_csv(fig_folder + "/data.csv")) == 6
+    assert [data_entry["fingerprint"] for data_entry in entries[0]["data"]] == [None]
+
+def test_registry_loop() -> None:
+    """Tests that a loop bundle is registered once, when it is written
+    by flushing the registry.
+    """
+    fig_folder = output_path + "/loop"
+    index_path = output_path + "/loop.jsonl"
+    loop_df = pd.DataFrame({"group": ["a", "b", "a"], "x": [1.0, 2.0, 3.0], "y": [3.0, 2.0, 1.0]})
+
+    enable_registry(index_path)
+    try:
+        run_ok_loop(fig_folder, loop_df, "csv")
+        assert flush_registry() == 1
+    finally:
+        disable_registry()
+        REGISTRY.index_path = None
+
+    entry = read_index(index_path)[0]
+    assert entry["figpath"] == fig_folder
+    assert entry["status"] == "written"
+    assert entry["source_file"].endswith("sample_calling_file.py")
+    assert entry["outputs"] == [fig_folder + "/figure_0.png", fig_folder + "/figure_1.png"]
+    assert os.path.exists(fig_folder + "/run.py")
@@ -0,0 +1,140 @@
+import os
+import pytest
+import logging
+import matplotlib
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from src.plotis.cli import main
+from src.plotis.render_cache import RenderCache, get_rc_hash, get_render_keys
+from tests.data.sample_calling_file import run_error_render_cache, run_ok_render_cache
+
+output_path = "tests/tmp/render_cache"
+
+def test_render_cache_in_with_block(caplog) -> None:
+    """Tests that the figure is rendered without being cached, and copied
+    from the cache, once regenerated into it, while the data does not change.
+    """
+    cache = RenderCache(output_path + "/cache")
+    render_df = pd.DataFrame(data={"x": [1.0, 2.0, 3.0], "y": [3.0, 1.0, 2.0]})
+
+    pi = run_ok_render_cache(output_path + "/fig1", render_df, cache)
+    assert os.path.exists(output_path + "/fig1/figure.png")
+    assert "render" in pi.stats.timings
+    assert len(cache._get_entries()) == 0
+
+    assert main(["regenerate", output_path + "/fig1", "-j", "1", "--force", "--render-cache", cache.root]) == 0
+    assert len(cache._get_entries()) == 1
+
+    with caplog.at_level(logging.INFO, logger="plotis"):
+        run_ok_render_cache(output_path + "/fig2", render_df, cache)
+    assert "Reusing cached figures" in caplog.text
+    with open(output_path + "/fig1/figure.png", "rb") as fp1, open(output_path + "/fig2/figure.png", "rb") as fp2:
+        assert fp1.read() == fp2.read()
+
+    render_df.loc[0, "y"] = 0.0
+    run_ok_render_cache(output_path + "/fig3", render_df, cache)
+    assert os.path.exists(output_path + "/fig3/figure.png")
+    assert len(cache._get_entries()) == 1
+
+def test_render_cache_context_raises() -> None:
+    """Tests that nothing is rendered or cached when the context raises.
+    """
+    cache = RenderCache(output_path + "/raise_cache")
+    render_df = pd.DataFrame(data={"x": [1.0, 2.0, 3.0], "y": [3.0, 1.0, 2.0]})
+
+    with pytest.raises(ValueError):
+        run_error_render_cache(output_path + "/raise", render_df, cache)
+    plt.close("all")
+
+    assert not os.path.exists(output_path + "/raise/figure.png")
+    assert len(cache._get_entries()) == 0
+
+def test_render_keys() -> None:
+    """Tests that the keys depend on the rcParams and the data, and that
+    bundles without fingerprints are not cached.
+    """
+    manifest = {
+        "context_hash": "abc",
+        "data": [{"name": "df", "serializer": "csv", "fingerprint": "123"}],
+        "outputs": ["fig/figure.png", "fig/figure.svg"],
+        "output_formats": [["png", None], ["svg", None]],
+    }
+    rc_hash = get_rc_hash()
+    keys = get_render_keys(manifest, rc_hash)
+    assert len(set(keys)) == 2
+
+    with matplotlib.rc_context({"lines.linewidth": 10}):
+        assert get_rc_hash() != rc_hash
+
+    changed_manifest = {**manifest, "data": [{"name": "df", "serializer": "csv", "fingerprint": "456"}]}
+    assert get_render_keys(changed_manifest, rc_hash)[0] != keys[0]
+
+    manifest["data"][0]["fingerprint"] = None
+    assert get_render_keys(manifest, rc_hash) is None
+
+def test_render_cache_eviction() -> None:
+    """Tests that the least recently used figures are evicted first.
+    """
+    cache = RenderCache(output_path + "/eviction", max_bytes=250)
+    os.makedirs(output_path, exist_ok=True)
+    figure_path = output_path + "/figure.png"
+    with open(figure_path, "wb") as fp:
+        fp.write(b"0" * 100)
+
+    for ix, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, figure_path)
+        os.utime(cache.get_path(key, figure_path), (ix, ix))
+    # Using the oldest figure makes it the most recently used
+    assert cache.fetch("aa1", output_path + "/fetched.png")
+
+    assert cache.evict() == 1
+    assert os.path.exists(cache.get_path("aa1", figure_path))
+    assert not os.path.exists(cache.get_path("bb2", figure_path))
+    assert cache.get_size() == 200
+
+def test_render_cache_scanned_on_eviction(monkeypatch) -> None:
+    """Tests that adding figures scans the cache once, and then only when
+    its estimated size exceeds the bound.
+    """
+    cache = RenderCache(output_path + "/scans", max_bytes=1000)
+    os.makedirs(output_path, exist_ok=True)
+    figure_path = output_path + "/scanned.png"
+    with open(figure_path, "wb") as fp:
+        fp.write(b"0" * 100)
+
+    n_scans = 0
+    get_entries = cache._get_entries
+    def counting_get_entries():
+        nonlocal n_scans
+        n_scans += 1
+        return get_entries()
+    monkeypatch.setattr(cache, "_get_entries", counting_get_entries)
+
+    manifest = {"context_hash": "123", "data": [], "output_formats": [["png", 100]], "outputs": [figure_path]}
+    for ix in range(10):
+        cache.put_outputs({**manifest, "context_hash": str(ix)}, "rc")
+    assert n_scans == 1
+    assert cache.get_size() == 1000
+    n_scans = 0
+
+    cache.put_outputs({**manifest, "context_hash": "10"}, "rc")
+    assert n_scans == 1
+    assert cache.get_size() <= 900
+
+def test_regenerate_with_render_cache(capsys) -> None:
+    """Tests that regenerating copies the cached figures rather than
+    running the bundle.
+    """
+    cache_root = output_path + "/regenerate_cache"
+    fig_folder = output_path + "/regenerate/fig"
+    render_df = pd.DataFrame(data={"x": [1.0, 2.0, 3.0], "y": [1.0, 2.0, 1.0]})
+    run_ok_render_cache(fig_folder, render_df, None)
+
+    assert main(["regenerate", fig_folder, "-j", "1", "--render-cache", cache_root]) == 0
+    assert "(cached)" not in capsys.readouterr().out
+
+    os.remove(fig_folder + "/figure.png")
+    assert main(["regenerate", fig_folder, "-j", "1", "--render-cache", cache_root]) == 0
+    assert "(cached)" in capsys.readouterr().out
+    assert os.path.exists(fig_folder + "/figure.png")
@@ -0,0 +1,172 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.plotis.plotis import PlotIs
+from src.plotis.serializers import SERIALIZERS, NpzSerializer, get_serializer, iter_row_chunks, write_data
+from tests.data.sample_calling_file import run_ok_chunks, run_ok_serializer
+
+output_path = "tests/tmp/serializers"
+
+def get_test_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        data={
+            "int": np.arange(4, dtype=np.int32),
+            "float": [0.5, 1.5, np.nan, 3.5],
+            "bool": [True, False, True, True],
+            "str": ["a", "b", "c", "d"],
+            "cat": pd.Categorical(["x", "y", "x", "y"]),
+            "time": pd.date_range("2024-01-01", periods=4, freq="h"),
+        },
+        index=pd.Index([10, 20, 30, 40])
+    )
+
+def load_with_generated_code(serializer_name: str, path: str) -> pd.DataFrame:
+    """Runs the import and load code generated by the serializer and 
+    returns the loaded data.
+    """
+    serializer = get_serializer(serializer_name)
+    code = ["import pandas as pd\n"]
+    code += serializer.get_import_code()
+    code += serializer.get_load_code("loaded_df", path)
+
+    namespace = {}
+    exec("".join(code), namespace)
+    return namespace["loaded_df"]
+
+def get_indexed_test_df() -> pd.DataFrame:
+    """Returns data with an ordered categorical whose categories are not
+    sorted, and a named MultiIndex.
+    """
+    test_df = get_test_df()
+    test_df["ordered"] = pd.Categorical(["lo", "hi", "lo", "hi"], categories=["lo", "hi"], ordered=True)
+    test_df.index = pd.MultiIndex.from_arrays(
+        [pd.Index([10, 20, 30, 40]), pd.date_range("2024-01-01", periods=4, freq="D")],
+        names=["id", "day"]
+    )
+    return test_df
+
+@pytest.mark.parametrize("serializer_name", ["parquet", "feather", "npz"])
+@pytest.mark.parametrize("get_df", [get_test_df, get_indexed_test_df])
+def test_binary_serializers_keep_dtypes(serializer_name: str, get_df, tmp_path) -> None:
+    """Tests that writing and loading data with the binary serializers
+    gives back the exact same data, dtypes and index.
+    """
+    if serializer_name in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    test_df = get_df()
+    serializer = get_serializer(serializer_name)
+    path = str(tmp_path / ("data" + serializer.extension))
+    serializer.write(test_df, path)
+
+    loaded_df = load_with_generated_code(serializer_name, path)
+    pd.testing.assert_frame_equal(loaded_df, test_df)
+
+def test_npz_serializer_duplicate_columns(tmp_path) -> None:
+    """Tests that the npz serializer rejects duplicate column names
+    rather than merging them.
+    """
+    test_df = pd.DataFrame([[1, 2]], columns=["x", "x"])
+    with pytest.raises(ValueError):
+        get_serializer("npz").write(test_df, str(tmp_path / "data.npz"))
+
+def test_csv_serializer_round_trip(tmp_path) -> None:
+    """Tests that the csv serializer writes data that can be loaded
+    by its own load code.
+    """
+    test_df = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+    path = str(tmp_path / "data.csv")
+    get_serializer("csv").write(test_df, path)
+
+    loaded_df = load_with_generated_code("csv", path)
+    assert loaded_df["x"].tolist() == [1,2,3,4]
+    assert loaded_df["y"].tolist() == [4,3,2,1]
+
+def test_unknown_serializer() -> None:
+    """Tests that an unknown serializer name raises an error.
+    """
+    with pytest.raises(ValueError):
+        get_serializer("xlsx")
+
+@pytest.mark.parametrize("serializer_name", list(SERIALIZERS))
+def test_run_with_serializer(serializer_name: str) -> None:
+    """Tests that PlotIs writes the data file and load code 
+    matching the chosen serializer.
+    """
+    if serializer_name in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    fig_folder = output_path + "/" + serializer_name
+    run_ok_serializer(fig_folder, serializer_name)
+
+    extension = SERIALIZERS[serializer_name].extension
+    with open(fig_folder + "/run.py", "r") as fp:
+        code = fp.read()
+    assert f"{fig_folder}/data{extension}" in code
+
+@pytest.mark.parametrize("serializer_name", ["parquet", "feather", "npz"])
+def test_chunked_write_keeps_data(serializer_name: str, tmp_path) -> None:
+    """Tests that writing data in row chunks gives the same data as 
+    writing it all at once.
+    """
+    if serializer_name in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    test_df = get_test_df()
+    serializer = get_serializer(serializer_name)
+    path = str(tmp_path / ("data" + serializer.extension))
+    write_data(serializer, test_df, path, max_chunk_bytes=1)
+
+    loaded_df = load_with_generated_code(serializer_name, path)
+    pd.testing.assert_frame_equal(loaded_df, test_df, check_index_type=False)
+
+def test_chunked_csv_write(tmp_path) -> None:
+    """Tests that the csv serializer only writes the header once.
+    """
+    test_df = pd.DataFrame(data={"x": [1,2,3,4], "y": [4,3,2,1]})
+    path = str(tmp_path / "data.csv")
+    write_data(get_serializer("csv"), test_df, path, max_chunk_bytes=1)
+
+    loaded_df = load_with_generated_code("csv", path)
+    assert loaded_df["x"].tolist() == [1,2,3,4]
+
+def test_iter_row_chunks() -> None:
+    """Tests splitting a DataFrame in chunks bounded by memory.
+    """
+    test_df = pd.DataFrame(data={"x": np.arange(100, dtype=np.int64)}, index=np.arange(100))
+
+    # Each row uses 16 bytes, 8 for the column and 8 for the index
+    chunks = list(iter_row_chunks(test_df, max_chunk_bytes=16 * 30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+
+    assert len(list(iter_row_chunks(test_df))) == 1
+
+def test_npz_written_at_once(monkeypatch, tmp_path) -> None:
+    """Tests that the npz serializer, which can not stream, writes the data
+    at once rather than concatenating its chunks, and rejects data given 
+    as chunks.
+    """
+    def write_chunks(self, chunks, path) -> None:
+        raise AssertionError("The chunks are concatenated")
+    monkeypatch.setattr(NpzSerializer, "write_chunks", write_chunks)
+
+    test_df = get_test_df()
+    path = str(tmp_path / "data.npz")
+    write_data(get_serializer("npz"), test_df, path, max_chunk_bytes=1)
+    pd.testing.assert_frame_equal(load_with_generated_code("npz", path), test_df)
+
+    with pytest.raises(ValueError):
+        PlotIs("mock", iter([test_df]), serializer="npz")
+
+def test_run_with_chunk_generator() -> None:
+    """Tests giving PlotIs the data as a generator of chunks.
+    """
+    pytest.importorskip("pyarrow")
+
+    fig_folder = output_path + "/chunks"
+    test_df = get_test_df()
+    chunks = (test_df.iloc[start:start + 3] for start in range(0, len(test_df), 3))
+    run_ok_chunks(fig_folder, chunks, "parquet")
+
+    pd.testing.assert_frame_equal(pd.read_parquet(fig_folder + "/data.parquet"), test_df, check_index_type=False)
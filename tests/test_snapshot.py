@@ -0,0 +1,68 @@
+import runpy
+import threading
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.plotis.snapshot import is_copy_on_write_enabled, snapshot
+from src.plotis.writer import BundleWriter
+from tests.data.sample_calling_file import run_ok_snapshot
+
+output_path = "tests/tmp/snapshot"
+
+def test_snapshot_frame() -> None:
+    """Tests that a snapshot is unaffected by later changes, and shares
+    memory with the original under copy-on-write.
+    """
+    df = pd.DataFrame({"x": np.arange(5.0)})
+    df_snapshot, unfreeze = snapshot(df)
+    assert unfreeze is None
+    if is_copy_on_write_enabled():
+        assert np.shares_memory(df["x"].to_numpy(), df_snapshot["x"].to_numpy())
+
+    df.loc[0, "x"] = 99.0
+    df["x"] += 1
+    assert df_snapshot["x"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_snapshot_array() -> None:
+    """Tests that arrays are copied, or frozen until released.
+    """
+    arr = np.arange(3)
+    arr_snapshot, unfreeze = snapshot(arr)
+    arr[0] = 10
+    assert arr_snapshot[0] == 0 and unfreeze is None
+
+    arr_snapshot, unfreeze = snapshot(arr, freeze_arrays=True)
+    assert arr_snapshot is arr
+    with pytest.raises(ValueError):
+        arr[0] = 20
+    unfreeze()
+    arr[0] = 20
+
+    # Views can be changed through their base, hence they are copied
+    view_snapshot, unfreeze = snapshot(arr[1:], freeze_arrays=True)
+    assert unfreeze is None and not np.shares_memory(view_snapshot, arr)
+
+def test_async_snapshot() -> None:
+    """Tests that changes made after the context while the bundle is being
+    written in the background do not end up in the bundle.
+    """
+    fig_folder = output_path + "/async"
+    event = threading.Event()
+    writer = BundleWriter(max_workers=1)
+    snapshot_df = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+    snapshot_arr = np.array([4.0, 5.0, 6.0])
+
+    # Blocking the writer so that the bundle is still pending
+    writer._get_executor().submit(event.wait, 5)
+    run_ok_snapshot(fig_folder, snapshot_df, snapshot_arr, writer)
+    snapshot_df.loc[0, "x"] = 100.0
+    with pytest.raises(ValueError):
+        snapshot_arr[0] = 100.0
+    event.set()
+    writer.flush()
+
+    assert snapshot_arr.flags.writeable
+    loaded = runpy.run_path(fig_folder + "/run.py")
+    assert loaded["snapshot_df"]["x"].tolist() == [1.0, 2.0, 3.0]
+    assert loaded["snapshot_arr"].tolist() == [4.0, 5.0, 6.0]
@@ -0,0 +1,65 @@
+import os
+
+from src.plotis.source_cache import SourceCache, SourceFile
+
+def write_source(path, lines) -> None:
+    with open(path, "w+") as fp:
+        fp.writelines(lines)
+
+def test_source_file_context_ends() -> None:
+    """Tests the precomputed context boundaries, including that 
+    empty lines do not end a context.
+    """
+    lines = [
+        "def f():\n",
+        "    with x:\n",
+        "        a = 1\n",
+        "\n",
+        "        b = 2\n",
+        "    c = 3\n",
+        "d = 4\n",
+    ]
+    source_file = SourceFile("mock.py", lines)
+
+    assert source_file.get_last_lineno_of_context(3) == 5
+    assert source_file.get_last_lineno_of_context(2) == 6
+    assert source_file.get_last_lineno_of_context(4) == 6
+    assert source_file.get_last_lineno_of_context(7) == 7
+
+def test_source_cache_reuses_file(tmp_path) -> None:
+    """Tests that an unchanged file is only read once.
+    """
+    path = str(tmp_path / "source.py")
+    write_source(path, ["a = 1\n"])
+    cache = SourceCache()
+
+    assert cache.get(path) is cache.get(path)
+
+def test_source_cache_invalidated_on_change(tmp_path) -> None:
+    """Tests that a changed file is read again.
+    """
+    path = str(tmp_path / "source.py")
+    write_source(path, ["a = 1\n"])
+    cache = SourceCache()
+    first = cache.get(path)
+
+    write_source(path, ["a = 1\n", "b = 2\n"])
+    second = cache.get(path)
+
+    assert second is not first
+    assert second.lines == ["a = 1\n", "b = 2\n"]
+
+def test_source_cache_size_bound(tmp_path) -> None:
+    """Tests that the least recently used files are evicted when the
+    cache is full.
+    """
+    paths = [str(tmp_path / f"source{ix}.py") for ix in range(3)]
+    for path in paths:
+        write_source(path, ["a = 1\n"])
+    cache = SourceCache(max_bytes=2 * os.path.getsize(paths[0]))
+
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[2])
+
+    assert cache.get(paths[0]) is not first
@@ -0,0 +1,50 @@
+import os
+import json
+import pandas as pd
+
+from src.plotis import store as store_module
+from src.plotis.serializers import CsvSerializer
+from src.plotis.store import ObjectStore
+from tests.data.sample_calling_file import run_ok_store
+
+output_path = "tests/tmp/store"
+
+def test_store_shared_between_bundles() -> None:
+    """Tests that bundles with the same data share one data file in
+    the store, referred to from their run.py and manifest.
+    """
+    store = ObjectStore(output_path + "/objects")
+    run_ok_store(output_path + "/fig1", store)
+    run_ok_store(output_path + "/fig2", store)
+
+    object_paths = []
+    for fig in ["fig1", "fig2"]:
+        assert not os.path.exists(output_path + f"/{fig}/data.csv")
+
+        with open(output_path + f"/{fig}/manifest.json", "r") as fp:
+            manifest = json.load(fp)
+        object_path = manifest["data"][0]["path"]
+        object_paths.append(object_path)
+
+        with open(output_path + f"/{fig}/run.py", "r") as fp:
+            assert object_path in fp.read()
+
+    assert object_paths[0] == object_paths[1]
+    assert os.path.exists(object_paths[0])
+    assert object_paths[0].startswith(output_path + "/objects/")
+
+def test_store_put_fsync(monkeypatch) -> None:
+    """Tests that stored data is synced to disk, with its folder,
+    if requested.
+    """
+    synced = []
+    monkeypatch.setattr(store_module, "sync_path", lambda path: synced.append(("file", path)))
+    monkeypatch.setattr(store_module, "sync_folder", lambda path: synced.append(("folder", path)))
+
+    store = ObjectStore(output_path + "/fsync")
+    object_path = store.get_object_path("abc", CsvSerializer())
+    assert store.put(pd.DataFrame(data={"x": [1,2]}), object_path, CsvSerializer(), fsync=True)
+
+    assert [kind for kind, _ in synced] == ["file", "folder"]
+    assert synced[0][1].endswith(".tmp")
+    assert synced[1][1] == os.path.dirname(object_path)
@@ -0,0 +1,201 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import pytest
+import pandas as pd
+
+from src.plotis import writer as writer_module
+from src.plotis.plotis import PlotIs
+from src.plotis.serializers import CsvSerializer, NpzSerializer
+from src.plotis.writer import PREVIOUS_SUFFIX, STAGING_SUFFIX, Bundle, BundleData, BundleWriter, BundleWriteError, write_bundle
+from tests.data.sample_calling_file import run_ok_async
+
+output_path = "tests/tmp/writer"
+
+class FailingSerializer(CsvSerializer):
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        raise OSError("disk full")
+
+class SlowSerializer(CsvSerializer):
+    def __init__(self, event: threading.Event) -> None:
+        super().__init__()
+        self.event = event
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        self.event.wait(timeout=5)
+        super().write(data, path)
+
+def test_async_run_written_after_flush() -> None:
+    """Tests that a bundle written in the background exists after
+    a flush.
+    """
+    fig_folder = output_path + "/async1"
+    writer = BundleWriter(max_workers=1)
+    run_ok_async(fig_folder, writer)
+    writer.flush()
+
+    assert os.path.exists(fig_folder + "/data.csv")
+    assert os.path.exists(fig_folder + "/run.py")
+
+def test_async_run_default_writer() -> None:
+    """Tests writing with the shared writer and the PlotIs barrier.
+    """
+    fig_folder = output_path + "/async2"
+    run_ok_async(fig_folder, True)
+    PlotIs.wait_all()
+
+    assert os.path.exists(fig_folder + "/run.py")
+
+def test_async_errors_raised_at_flush() -> None:
+    """Tests that an error in the background is raised by flush().
+    """
+    writer = BundleWriter(max_workers=1)
+    test_df = pd.DataFrame(data={"x": [1,2,3,4]})
+    writer.submit(Bundle(output_path + "/async3", [BundleData("test_df", test_df, FailingSerializer(), output_path + "/async3/data.csv")], [], {}))
+
+    with pytest.raises(BundleWriteError) as e_info:
+        writer.flush()
+    assert len(e_info.value.errors) == 1
+
+    # Errors are only reported once
+    writer.flush()
+
+def test_async_back_pressure() -> None:
+    """Tests that submitting blocks when max_pending bundles are 
+    in progress.
+    """
+    event = threading.Event()
+    writer = BundleWriter(max_workers=1, max_pending=1)
+    test_df = pd.DataFrame(data={"x": [1,2,3,4]})
+    serializer = SlowSerializer(event)
+    writer.submit(Bundle(output_path + "/async4", [BundleData("test_df", test_df, serializer, output_path + "/async4/data.csv")], [], {}))
+
+    submitted = threading.Event()
+    def submit_second() -> None:
+        writer.submit(Bundle(output_path + "/async5", [BundleData("test_df", test_df, serializer, output_path + "/async5/data.csv")], [], {}))
+        submitted.set()
+    thread = threading.Thread(target=submit_second)
+    thread.start()
+
+    time.sleep(0.1)
+    assert not submitted.is_set()
+
+    event.set()
+    thread.join(timeout=5)
+    assert submitted.is_set()
+    writer.shutdown()
+
+def make_bundle(figpath: str, test_df: pd.DataFrame, serializer: CsvSerializer = CsvSerializer()) -> Bundle:
+    return Bundle(
+        figpath,
+        [BundleData("test_df", test_df, serializer, figpath + "/data.csv")],
+        ["print(len(test_df))\n"],
+        {"rows": len(test_df), "data": [{"name": "test_df", "path": figpath + "/data.csv"}]}
+    )
+
+@pytest.mark.parametrize("exchange", [True, False])
+def test_write_publishes_bundle(monkeypatch, exchange: bool) -> None:
+    """Tests that a bundle is published to a new folder, and over the
+    files of an existing one, leaving no staging folders behind, 
+    whether folders can be exchanged at once or not.
+    """
+    if not exchange:
+        monkeypatch.setattr(writer_module, "_renameat2", False)
+    fig_folder = output_path + f"/publish_{exchange}"
+    stats = write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1,2,3]})))
+    assert sorted(os.listdir(fig_folder)) == ["data.csv", "manifest.json", "run.py"]
+    assert stats.n_rows == 3
+    assert "fsync" in stats.timings and "publish" in stats.timings
+
+    # Files which are not part of the bundle are kept
+    with open(fig_folder + "/figure.png", "w") as fp:
+        fp.write("")
+    write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1,2,3,4]})))
+    assert len(pd.read_csv(fig_folder + "/data.csv")) == 4
+    assert os.path.exists(fig_folder + "/figure.png")
+
+    # The files of the previous bundle are replaced as a whole
+    test_df = pd.DataFrame(data={"x": [1,2]})
+    write_bundle(Bundle(fig_folder, [BundleData("test_df", test_df, NpzSerializer(), fig_folder + "/data.npz")], [], {}))
+    assert sorted(os.listdir(fig_folder)) == ["data.npz", "figure.png", "manifest.json", "run.py"]
+
+    assert not any(name.endswith(STAGING_SUFFIX) for name in os.listdir(output_path))
+
+def test_write_failure_leaves_no_bundle() -> None:
+    """Tests that a bundle failing to be written is not published.
+    """
+    fig_folder = output_path + "/torn"
+    with pytest.raises(OSError):
+        write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1,2,3]}), FailingSerializer()))
+
+    assert not os.path.exists(fig_folder)
+    assert not any(name.startswith("torn") for name in os.listdir(output_path))
+
+def test_write_restores_stranded_bundle() -> None:
+    """Tests that a previous bundle left aside by a process which died 
+    while replacing it is restored by the next write.
+    """
+    fig_folder = output_path + "/stranded"
+    write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1,2,3]})))
+    with open(fig_folder + "/figure.png", "w") as fp:
+        fp.write("")
+
+    # Pid of a process which is not running anymore
+    process = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    stranded_dir = fig_folder + f".{process.stdout.strip()}-0{PREVIOUS_SUFFIX}"
+    os.rename(fig_folder, stranded_dir)
+
+    write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1,2]})))
+    assert sorted(os.listdir(fig_folder)) == ["data.csv", "figure.png", "manifest.json", "run.py"]
+    assert len(pd.read_csv(fig_folder + "/data.csv")) == 2
+    assert not os.path.exists(stranded_dir)
+
+    # Previous bundles of running processes are left to them
+    running_dir = fig_folder + f".{os.getppid()}-0{PREVIOUS_SUFFIX}"
+    os.makedirs(running_dir)
+    write_bundle(make_bundle(fig_folder, pd.DataFrame(data={"x": [1]})))
+    assert os.path.exists(running_dir)
+
+def test_write_concurrent_producers() -> None:
+    """Tests that threads writing bundles to the same folders all publish
+    complete bundles.
+    """
+    root = output_path + "/concurrent"
+    def produce(ix: int) -> None:
+        test_df = pd.DataFrame(data={"x": range(ix % 4 + 1)})
+        write_bundle(make_bundle(root + f"/fig{ix % 4}", test_df))
+
+    threads = [threading.Thread(target=produce, args=(ix,)) for ix in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert sorted(os.listdir(root)) == ["fig0", "fig1", "fig2", "fig3"]
+    for ix in range(4):
+        with open(root + f"/fig{ix}/manifest.json", "r") as fp:
+            assert '"rows": %d' % (ix + 1) in fp.read()
+        assert len(pd.read_csv(root + f"/fig{ix}/data.csv")) == ix + 1
+
+def test_bundles_written_at_exit() -> None:
+    """Tests that loop bundles and bundles queued in the background are
+    written when the process exits without flushing.
+    """
+    fig_folder = os.path.abspath(output_path + "/exit")
+    script = "\n".join([
+        "import pandas as pd",
+        "from tests.data.sample_calling_file import run_ok_async, run_ok_loop",
+        "loop_df = pd.DataFrame({\"group\": [\"a\", \"b\"], \"x\": [1.0, 2.0], \"y\": [2.0, 1.0]})",
+        f"run_ok_loop(\"{fig_folder}/loop\", loop_df, \"csv\")",
+        f"for ix in range(6): run_ok_async(\"{fig_folder}/async\" + str(ix), True)",
+    ])
+    env = {**os.environ, "MPLBACKEND": "Agg"}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    assert os.path.exists(fig_folder + "/loop/run.py")
+    for ix in range(6):
+        assert os.path.exists(fig_folder + f"/async{ix}/run.py")
+    assert "Failed" not in result.stderr